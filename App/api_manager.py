@@ -1,75 +1,253 @@
 import os
-import json
+import time
+import atexit
+import threading
 from pathlib import Path
+from .quota_ledger import QuotaLedger, LedgerBusyError, key_id_for, pool_id_for
+from .config_store import get_config_store
+from .client_pool import offline_backend
+from .scheduler import PriorityScheduler, load_scheduler_settings
+
+OFFLINE_LIMITS = {"requests_per_minute": 10 ** 9, "tokens_per_minute": 10 ** 12, "requests_per_day": 10 ** 9}
+# How long a pick waits before retrying when another process holds the shared ledger
+LEDGER_BUSY_RETRY_SECONDS = 0.02
+# The saved rotation position only tells the next start where to begin; write it at most this often
+INDEX_SAVE_DELAY_SECONDS = 2.0
+
+
+class QuotaExhaustedError(Exception):
+    """No key has quota headroom within the allowed queueing time"""
 
 
 class APIKeyManager:
     def __init__(self, base_dir):
         self.base_dir = Path(base_dir)
-        self.config_path = self.base_dir / "App" / "config" / "config.json"
-        self.api_keys_path = self.base_dir / "api_keys.txt"
+        self.store = get_config_store(self.base_dir)
+        self.config_path = self.store.config_path
+        self.api_keys_path = self.store.api_keys_path
         self.api_keys = []
         self.current_index = 0
+        self.last_index = 0
+        self.key_ids = {}
+        self.pool_id = None
+        self.quota_limits = {}
+        # Keys are handed out from several threads (parallel context summaries, workers)
+        self.lock = threading.Lock()
+        self.save_lock = threading.Lock()
+        self.save_timer = None
+        # A pending index save would die with its daemon timer; write it at interpreter exit instead
+        atexit.register(self.flush_index)
         self.load_api_keys()
         self.load_config()
+        self.ledger = self.create_ledger()
+        self.scheduler = PriorityScheduler(load_scheduler_settings(self.base_dir))
+        # Edits to api_keys.txt or config.json take effect without a restart
+        self.store.subscribe(self.on_files_changed)
     
     def load_api_keys(self):
-        if not self.api_keys_path.exists():
-            raise FileNotFoundError(f"File api_keys.txt tidak ditemukan di {self.api_keys_path}!")
-        
         try:
-            with open(self.api_keys_path, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
-                self.api_keys = [line.strip() for line in lines if line.strip() and not line.strip().startswith('#')]
-                
-            if not self.api_keys:
-                raise ValueError("File api_keys.txt kosong atau tidak berisi API key yang valid!")
-                
-            print(f"Loaded {len(self.api_keys)} API keys from {self.api_keys_path}")
-            
+            api_keys = self.store.get_api_keys(reload=True)
+        except FileNotFoundError:
+            raise
         except Exception as e:
             raise ValueError(f"Gagal membaca file api_keys.txt: {str(e)}")
+        self.apply_api_keys(api_keys)
+
+    def apply_api_keys(self, api_keys):
+        if not api_keys:
+            raise ValueError("File api_keys.txt kosong atau tidak berisi API key yang valid!")
+        key_ids = {key: key_id_for(key) for key in api_keys}
+        # Swap the list in one step; requests that already hold a key keep using it
+        with self.lock:
+            self.api_keys = api_keys
+            self.key_ids = key_ids
+            self.pool_id = pool_id_for([key_ids[key] for key in api_keys])
+            if self.current_index >= len(api_keys):
+                self.current_index = 0
+        print(f"Loaded {len(api_keys)} API keys from {self.api_keys_path}")
     
     def load_config(self):
-        if self.config_path.exists():
-            try:
-                with open(self.config_path, 'r', encoding='utf-8') as f:
-                    config = json.load(f)
-                    loaded_index = config.get('current_api_key_index', 0)
-                    if 0 <= loaded_index < len(self.api_keys):
-                        self.current_index = loaded_index
-                    else:
-                        self.current_index = 0
-            except (json.JSONDecodeError, KeyError, ValueError):
-                self.current_index = 0
+        self.quota_limits = self.store.get_section('quota')
+        loaded_index = self.store.get_int('current_api_key_index', 0)
+        if 0 <= loaded_index < len(self.api_keys):
+            self.current_index = loaded_index
         else:
             self.current_index = 0
+
+    def create_ledger(self):
+        limits = dict(self.quota_limits)
+        shared = limits.get("share_across_processes", True)
+        if offline_backend():
+            # Multi-process tests point mock runs at their own ledger file, with the configured limits
+            test_ledger = os.environ.get("PROMANIS_MOCK_LEDGER", "")
+            if test_ledger:
+                return QuotaLedger(test_ledger, limits, shared=shared)
+            # Mock and replayed responses cost nothing; keep their counts out of the real ledger
+            return QuotaLedger(":memory:", dict(limits, **OFFLINE_LIMITS))
+        return QuotaLedger(self.config_path.parent / "quota_ledger.sqlite3", limits, shared=shared)
+
+    def on_files_changed(self, name):
+        if name == 'api_keys':
+            try:
+                self.apply_api_keys(self.store.get_api_keys())
+            except ValueError as e:
+                print(f"Warning: keeping previous API keys: {str(e)}")
+        elif name == 'config':
+            self.quota_limits = self.store.get_section('quota')
+            limits = dict(self.quota_limits)
+            if self.ledger.db_path == ":memory:":
+                limits.update(OFFLINE_LIMITS)
+            self.ledger.update_limits(limits)
+            self.scheduler.settings.update(load_scheduler_settings(self.base_dir))
     
     def save_config(self):
         try:
-            os.makedirs(self.config_path.parent, exist_ok=True)
-            with open(self.config_path, 'w', encoding='utf-8') as f:
-                json.dump({'current_api_key_index': self.current_index}, f, indent=4)
+            self.store.update(current_api_key_index=self.current_index)
         except Exception as e:
             print(f"Warning: Failed to save config: {str(e)}")
+
+    def schedule_index_save(self):
+        """Persist current_index shortly after a pick, on a timer thread instead of under the pick locks"""
+        with self.save_lock:
+            if self.save_timer is not None:
+                return
+            self.save_timer = threading.Timer(INDEX_SAVE_DELAY_SECONDS, self.flush_index)
+            self.save_timer.daemon = True
+            self.save_timer.start()
+
+    def flush_index(self):
+        with self.save_lock:
+            timer, self.save_timer = self.save_timer, None
+        if timer is None:
+            return
+        timer.cancel()
+        self.save_config()
     
+    def peek_key(self):
+        """The key the next acquire_key() call tries first, without reserving quota on it"""
+        with self.lock:
+            if not self.api_keys:
+                raise ValueError("Tidak ada API key yang tersedia!")
+            index = self.current_index
+            if self.ledger.shared:
+                # Other processes move the shared rotation; the local index is only as fresh as our last pick
+                index = self.ledger.rotation(self.pool_id, index)
+            return self.api_keys[index % len(self.api_keys)].strip()
+
     def get_next_api_key(self):
+        return self.acquire_key()
+
+    def acquire_key(self, projected_tokens=0, max_wait_seconds=None, priority="interactive"):
+        """Next key in rotation that projects to have quota headroom.
+
+        Keys without headroom are skipped; when none has any, the caller waits for the
+        earliest window to reopen (up to max_queue_wait_seconds, or the caller's own
+        deadline if sooner) instead of hitting a 429. Waiting callers are served by
+        priority class (see PriorityScheduler), not by who polls first.
+        """
+        max_wait = self.ledger.limits["max_queue_wait_seconds"]
+        if max_wait_seconds is not None:
+            max_wait = min(max_wait, max_wait_seconds)
+        deadline = time.monotonic() + max_wait
+        ticket = self.scheduler.enter(priority)
+        admitted = False
+        try:
+            with self.scheduler.condition:
+                while True:
+                    if self.scheduler.is_next(ticket):
+                        busy = False
+                        try:
+                            with self.lock:
+                                key, wait = self.select_key_locked(projected_tokens, self.scheduler.reserve_share(ticket))
+                        except LedgerBusyError:
+                            # Another process is picking; retry shortly with the condition released
+                            key, wait, busy = None, LEDGER_BUSY_RETRY_SECONDS, True
+                        if key:
+                            admitted = True
+                            return key
+                        if time.monotonic() + wait > deadline:
+                            break
+                        if not busy:
+                            print(f"All keys at quota limit, waiting {wait:.1f}s for headroom...")
+                    else:
+                        # Someone ahead is picking; they notify when done
+                        wait = 1.0
+                        if time.monotonic() >= deadline:
+                            break
+                    self.scheduler.condition.wait(min(wait, 1.0, max(0.0, deadline - time.monotonic())) + 0.01)
+        finally:
+            self.scheduler.leave(ticket, admitted)
+        wait = self.quota_wait_seconds(projected_tokens, priority)
+        raise QuotaExhaustedError(
+            f"Semua API key mencapai batas kuota. Coba lagi dalam {int(wait) + 1} detik."
+        )
+
+    def select_key_locked(self, projected_tokens, reserve_share=0.0):
         if not self.api_keys:
             raise ValueError("Tidak ada API key yang tersedia!")
-        
-        if self.current_index >= len(self.api_keys):
-            self.current_index = 0
-        
-        current_key = self.api_keys[self.current_index]
-        
-        if not current_key or current_key.strip() == "":
-            raise ValueError(f"API key pada index {self.current_index} kosong atau tidak valid!")
-        
-        print(f"Using API key index: {self.current_index}")
-        self.current_index = (self.current_index + 1) % len(self.api_keys)
-        self.save_config()
-        
-        return current_key.strip()
+
+        # One short transaction per pick; with a shared ledger other processes wait for it to commit
+        with self.ledger.transaction():
+            if self.ledger.shared:
+                self.current_index = self.ledger.rotation(self.pool_id, self.current_index)
+            if self.current_index >= len(self.api_keys):
+                self.current_index = 0
+
+            shortest_wait = None
+            for offset in range(len(self.api_keys)):
+                index = (self.current_index + offset) % len(self.api_keys)
+                current_key = self.api_keys[index]
+                if not current_key or current_key.strip() == "":
+                    raise ValueError(f"API key pada index {index} kosong atau tidak valid!")
+                key_id = self.key_ids[current_key]
+                wait = self.ledger.wait_seconds(key_id, projected_tokens, reserve_share=reserve_share)
+                if wait > 0:
+                    shortest_wait = wait if shortest_wait is None else min(shortest_wait, wait)
+                    continue
+                self.ledger.reserve(key_id, projected_tokens)
+                print(f"Using API key index: {index}")
+                self.last_index = index
+                self.current_index = (index + 1) % len(self.api_keys)
+                if self.ledger.shared:
+                    self.ledger.set_rotation(self.pool_id, self.current_index)
+                elif not offline_backend():
+                    # Mock and replay runs must not move the real config's rotation
+                    self.schedule_index_save()
+                return current_key.strip(), 0.0
+            return None, shortest_wait
+
+    def report_usage(self, api_key, actual_tokens, projected_tokens=0):
+        key_id = self.key_ids.get(api_key) or key_id_for(api_key)
+        self.ledger.commit(key_id, actual_tokens, projected_tokens)
+
+    def report_rate_limited(self, api_key):
+        key_id = self.key_ids.get(api_key) or key_id_for(api_key)
+        self.ledger.mark_rate_limited(key_id)
+
+    def report_deadline_hit(self, api_key):
+        key_id = self.key_ids.get(api_key) or key_id_for(api_key)
+        self.ledger.record_deadline_hit(key_id)
+
+    def quota_wait_seconds(self, projected_tokens=0, priority="interactive"):
+        """0 when some key could take a request of this class now, otherwise seconds until the first one can"""
+        with self.lock:
+            key_ids = [self.key_ids[key] for key in self.api_keys]
+        reserve_share = self.scheduler.class_reserve_share(priority)
+        if self.ledger.shared:
+            self.ledger.refresh()
+        waits = [self.ledger.wait_seconds(key_id, projected_tokens, reserve_share=reserve_share) for key_id in key_ids]
+        return min(waits) if waits else 0.0
+
+    def queue_stats(self):
+        """Per priority class: waiting now, admitted, gave up, and queue-wait times"""
+        return self.scheduler.snapshot()
+
+    def key_usage(self):
+        with self.lock:
+            key_ids = [self.key_ids[key] for key in self.api_keys]
+        if self.ledger.shared:
+            self.ledger.refresh()
+        return [self.ledger.snapshot(key_id) for key_id in key_ids]
     
     def get_total_keys(self):
         return len(self.api_keys)
@@ -77,3 +255,5 @@ class APIKeyManager:
     def reset_index(self):
         self.current_index = 0
         self.save_config()
+        if self.ledger.shared:
+            self.ledger.set_rotation(self.pool_id, 0)
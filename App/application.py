@@ -1,17 +1,22 @@
 import sys
 import os
+import time
 from pathlib import Path
 from PySide6.QtWidgets import QApplication, QMessageBox
 from PySide6.QtGui import QIcon
-import qtawesome as qta
+from .startup_profiler import StartupProfiler
 from .main_window import PromanisMainWindow
+from .diagnostics import start_tracing_from_env
+from .warmup import start_warmup
 
 
 class PromanisApp:
-    def __init__(self, base_dir):
+    def __init__(self, base_dir, startup_mode="deferred", process_start=None):
         self.base_dir = base_dir
         self.app = None
         self.window = None
+        self.startup_mode = startup_mode
+        self.profiler = StartupProfiler(process_start if process_start is not None else time.perf_counter(), startup_mode)
 
     def set_windows_app_user_model_id(self, app_id):
         # Set Windows AppUserModelID for correct taskbar icon grouping
@@ -22,21 +27,26 @@ class PromanisApp:
             pass
 
     def initialize_app(self):
+        start_tracing_from_env()
         self.set_windows_app_user_model_id("mudrikam.promanis.wand")
         self.app = QApplication(sys.argv)
+        self.profiler.mark("qapplication")
         # Set wand.ico as the main application icon (taskbar & window)
         icon_path = os.path.join(self.base_dir, "App", "wand.ico")
         if os.path.exists(icon_path):
             self.app.setWindowIcon(QIcon(icon_path))
         else:
+            import qtawesome as qta
             self.app.setWindowIcon(qta.icon('fa5s.magic'))
         try:
-            self.window = PromanisMainWindow(self.base_dir)
+            deferred = self.startup_mode == "deferred"
+            self.window = PromanisMainWindow(self.base_dir, deferred_startup=deferred, profiler=self.profiler)
             # Set window icon explicitly for main window
             if os.path.exists(icon_path):
                 self.window.setWindowIcon(QIcon(icon_path))
-            else:
-                self.window.setWindowIcon(qta.icon('fa5s.magic'))
+            self.profiler.mark("window_built")
+            # Connect to Gemini while the user is still typing the first prompt
+            self.profiler.on_first_interaction(self.start_warmup)
             return True
         except FileNotFoundError as e:
             QMessageBox.critical(None, "Error", str(e))
@@ -45,9 +55,17 @@ class PromanisApp:
             QMessageBox.critical(None, "Error", f"Terjadi kesalahan: {str(e)}")
             return False
 
+    def start_warmup(self):
+        start_warmup(self.window.api_manager, self.profiler)
+
     def run(self):
         if self.initialize_app():
+            self.profiler.watch(self.window)
             self.window.show()
-            return self.app.exec()
+            exit_code = self.app.exec()
+            # Refinements the closed window left running must end before their QThreads are destroyed
+            from .gemini_worker import wait_for_detached_workers
+            wait_for_detached_workers()
+            return exit_code
         else:
             return 1
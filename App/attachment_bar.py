@@ -0,0 +1,111 @@
+from pathlib import Path
+from PySide6.QtWidgets import QWidget, QHBoxLayout, QFrame, QLabel, QToolButton
+from PySide6.QtCore import Qt, Signal, QObject, QEvent
+from .context_files import ContextAttachment, is_supported_file
+
+
+class AttachmentChip(QFrame):
+    remove_requested = Signal(object)
+
+    def __init__(self, attachment, parent=None):
+        super().__init__(parent)
+        self.attachment = attachment
+        self.setStyleSheet("""
+            QFrame {
+                background-color: rgba(25,118,210,0.10);
+                border-radius: 10px;
+            }
+        """)
+        layout = QHBoxLayout(self)
+        layout.setContentsMargins(8, 2, 4, 2)
+        layout.setSpacing(4)
+        label = QLabel(attachment.describe())
+        label.setToolTip(f"{attachment.path}\nEncoding: {attachment.encoding}")
+        layout.addWidget(label)
+        remove_button = QToolButton()
+        remove_button.setText("×")
+        remove_button.setAutoRaise(True)
+        remove_button.clicked.connect(lambda: self.remove_requested.emit(self.attachment))
+        layout.addWidget(remove_button)
+
+
+class AttachmentBar(QWidget):
+    """Compact row of attached context files; only metadata is read, never the file contents"""
+    changed = Signal()
+    rejected = Signal(str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.attachments = []
+        self.chip_layout = QHBoxLayout(self)
+        self.chip_layout.setContentsMargins(0, 0, 0, 0)
+        self.chip_layout.setSpacing(6)
+        self.chip_layout.addStretch()
+        self.setVisible(False)
+
+    def add_paths(self, paths):
+        known = {str(attachment.path) for attachment in self.attachments}
+        for path in paths:
+            if str(Path(path)) in known:
+                continue
+            if not is_supported_file(path):
+                self.rejected.emit(path)
+                continue
+            try:
+                attachment = ContextAttachment(path)
+            except OSError:
+                self.rejected.emit(path)
+                continue
+            self.attachments.append(attachment)
+            chip = AttachmentChip(attachment)
+            chip.remove_requested.connect(self.remove_attachment)
+            self.chip_layout.insertWidget(self.chip_layout.count() - 1, chip)
+        self.refresh()
+
+    def remove_attachment(self, attachment):
+        for index in range(self.chip_layout.count()):
+            widget = self.chip_layout.itemAt(index).widget()
+            if isinstance(widget, AttachmentChip) and widget.attachment is attachment:
+                widget.deleteLater()
+                break
+        if attachment in self.attachments:
+            self.attachments.remove(attachment)
+        self.refresh()
+
+    def clear(self):
+        for attachment in list(self.attachments):
+            self.remove_attachment(attachment)
+
+    def paths(self):
+        return [str(attachment.path) for attachment in self.attachments]
+
+    def refresh(self):
+        self.setVisible(bool(self.attachments))
+        self.changed.emit()
+
+
+class FileDropFilter(QObject):
+    """Turns local files dropped on a text widget into attachments instead of pasted paths"""
+
+    def __init__(self, attachment_bar, parent=None):
+        super().__init__(parent)
+        self.attachment_bar = attachment_bar
+
+    def local_paths(self, event):
+        mime = event.mimeData()
+        if not mime.hasUrls():
+            return []
+        return [url.toLocalFile() for url in mime.urls() if url.isLocalFile()]
+
+    def eventFilter(self, watched, event):
+        if event.type() in (QEvent.DragEnter, QEvent.DragMove):
+            if self.local_paths(event):
+                event.acceptProposedAction()
+                return True
+        elif event.type() == QEvent.Drop:
+            paths = self.local_paths(event)
+            if paths:
+                self.attachment_bar.add_paths(paths)
+                event.acceptProposedAction()
+                return True
+        return False
@@ -0,0 +1,96 @@
+import sys
+import json
+import argparse
+from pathlib import Path
+from .job_queue import JobStore, BatchRunner, DEFAULT_JOB_SETTINGS, default_jobs_path, read_prompts_file
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="main.py --batch", description="Durable batch refinement jobs")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    create = commands.add_parser("create", help="Create a job from a .txt (one prompt per line) or .jsonl file")
+    create.add_argument("prompts_file")
+    create.add_argument("--name", default="")
+    for field in ("language", "scope", "type", "detail", "format"):
+        create.add_argument(f"--{field}", default=DEFAULT_JOB_SETTINGS[field])
+    create.add_argument("--compress", type=int, default=0, help="Compress each prompt to at most N tokens")
+    create.add_argument("--pack", type=int, default=1, help="Send up to N prompts per request (items with their own context are sent alone)")
+    create.add_argument("--context-file", default="", help="Context shared by every item")
+    create.add_argument("--run", action="store_true", help="Start processing right away")
+    create.add_argument("--concurrency", type=int, default=None)
+
+    run = commands.add_parser("run", help="Run or resume a job; finished items are skipped")
+    run.add_argument("job_id", type=int)
+    run.add_argument("--concurrency", type=int, default=None)
+    run.add_argument("--retry-failed", action="store_true")
+
+    commands.add_parser("list", help="Show all jobs and their progress")
+
+    export = commands.add_parser("export", help="Write results as JSON lines")
+    export.add_argument("job_id", type=int)
+    export.add_argument("--output", default="", help="Output file (default: stdout)")
+    return parser
+
+
+def format_progress(progress):
+    return (f"{progress['done']}/{progress['total']} done, {progress['failed']} failed, "
+            f"{progress['pending'] + progress['in_flight']} remaining")
+
+
+def run_job(base_dir, store, job_id, concurrency, retry_failed=False):
+    from .api_manager import APIKeyManager
+    if retry_failed:
+        store.retry_failed(job_id)
+    runner = BatchRunner(APIKeyManager(base_dir), store, job_id, concurrency,
+                         on_progress=lambda progress: print(f"Job {job_id}: {format_progress(progress)}", file=sys.stderr))
+    try:
+        progress = runner.run()
+    except KeyboardInterrupt:
+        print(f"Job {job_id} paused; resume with: python main.py --batch run {job_id}", file=sys.stderr)
+        return 130
+    print(f"Job {job_id} finished: {format_progress(progress)}")
+    if runner.stats["accepted"]:
+        print(f"{runner.stats['refine_calls'] / runner.stats['accepted']:.2f} API calls per accepted result")
+    return 0 if progress["failed"] == 0 else 1
+
+
+def run_cli(base_dir, argv):
+    args = build_parser().parse_args(argv)
+    store = JobStore(default_jobs_path(base_dir))
+    try:
+        if args.command == "create":
+            items = read_prompts_file(args.prompts_file)
+            if not items:
+                print("No prompts found in the file")
+                return 2
+            settings = {field: getattr(args, field) for field in ("language", "scope", "type", "detail", "format", "compress")}
+            settings["pack_size"] = args.pack
+            if args.context_file:
+                settings["context"] = Path(args.context_file).read_text(encoding="utf-8")
+            job_id = store.create_job(args.name or Path(args.prompts_file).name, items, settings)
+            print(f"Created job {job_id} with {len(items)} items")
+            if args.run:
+                return run_job(base_dir, store, job_id, args.concurrency)
+            return 0
+        if args.command == "run":
+            store.job(args.job_id)
+            return run_job(base_dir, store, args.job_id, args.concurrency, args.retry_failed)
+        if args.command == "list":
+            for job in store.list_jobs():
+                print(f"{job['id']:>4}  {job['name']:<30} {format_progress(job['progress'])}")
+            return 0
+        if args.command == "export":
+            lines = [json.dumps(row, ensure_ascii=False) for row in store.results(args.job_id)]
+            if args.output:
+                Path(args.output).write_text("\n".join(lines) + "\n", encoding="utf-8")
+                print(f"Wrote {len(lines)} items to {args.output}")
+            else:
+                print("\n".join(lines))
+            return 0
+    except (KeyError, FileNotFoundError, ValueError) as e:
+        print(f"Error: {str(e)}")
+        return 1
+    finally:
+        store.close()
+    return 0
@@ -0,0 +1,235 @@
+from PySide6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QTextEdit, QLineEdit, QPushButton,
+                               QMessageBox, QTableWidget, QTableWidgetItem, QAbstractItemView, QFileDialog,
+                               QProgressBar, QGroupBox, QSpinBox)
+from PySide6.QtCore import QThread, Signal
+import qtawesome as qta
+import json
+from pathlib import Path
+from .job_queue import JobStore, BatchRunner, default_jobs_path, read_prompts_file
+
+
+class BatchJobThread(QThread):
+    progress = Signal(dict)
+    job_finished = Signal(dict)
+    error = Signal(str)
+
+    def __init__(self, api_manager, store, job_id, parent=None):
+        super().__init__(parent)
+        self.job_id = job_id
+        self.runner = BatchRunner(api_manager, store, job_id, on_progress=self.progress.emit)
+
+    def run(self):
+        try:
+            self.job_finished.emit(self.runner.run())
+        except Exception as e:
+            self.error.emit(str(e))
+
+    def pause(self):
+        self.runner.stop()
+
+    def stop(self):
+        # gemini_worker.stop_workers: cut the running items off; recover() requeues them on the next run
+        self.runner.cancel()
+
+
+class BatchDialog(QDialog):
+    """Create batch jobs from the current settings and run, pause or resume them"""
+
+    def __init__(self, api_manager, parent=None, settings=None, language="English"):
+        super().__init__(parent)
+        self.api_manager = api_manager
+        self.settings = dict(settings or {}, language=language)
+        self.store = JobStore(default_jobs_path(api_manager.base_dir))
+        self.job_thread = None
+        self.init_ui()
+        self.refresh_jobs()
+
+    def init_ui(self):
+        self.setWindowTitle("Batch Jobs")
+        self.setGeometry(220, 220, 760, 600)
+        layout = QVBoxLayout(self)
+
+        create_group = QGroupBox("New Job")
+        create_layout = QVBoxLayout(create_group)
+        summary = ", ".join(f"{key}: {value}" for key, value in self.settings.items())
+        settings_label = QLabel(f"Uses the current settings ({summary})")
+        settings_label.setWordWrap(True)
+        settings_label.setStyleSheet("color: #666;")
+        create_layout.addWidget(settings_label)
+        self.name_edit = QLineEdit()
+        self.name_edit.setPlaceholderText("Job name")
+        create_layout.addWidget(self.name_edit)
+        self.prompts_edit = QTextEdit()
+        self.prompts_edit.setPlaceholderText("One prompt per line...")
+        self.prompts_edit.setMinimumHeight(120)
+        create_layout.addWidget(self.prompts_edit)
+        create_buttons = QHBoxLayout()
+        load_button = QPushButton("Load File...")
+        load_button.setIcon(qta.icon('fa6s.folder-open'))
+        load_button.clicked.connect(self.load_prompts_file)
+        create_buttons.addWidget(load_button)
+        create_buttons.addStretch()
+        create_buttons.addWidget(QLabel("Prompts per request:"))
+        self.pack_spin = QSpinBox()
+        self.pack_spin.setRange(1, 16)
+        self.pack_spin.setToolTip("Send several short prompts in one request to save quota; prompts the packed answer misses are retried alone")
+        create_buttons.addWidget(self.pack_spin)
+        create_button = QPushButton("Create Job")
+        create_button.setIcon(qta.icon('fa6s.plus'))
+        create_button.clicked.connect(self.create_job)
+        create_buttons.addWidget(create_button)
+        create_layout.addLayout(create_buttons)
+        layout.addWidget(create_group)
+
+        self.jobs_table = QTableWidget(0, 3)
+        self.jobs_table.setHorizontalHeaderLabels(["ID", "Name", "Progress"])
+        self.jobs_table.horizontalHeader().setStretchLastSection(True)
+        self.jobs_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.jobs_table.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.jobs_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        layout.addWidget(self.jobs_table)
+
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setVisible(False)
+        layout.addWidget(self.progress_bar)
+
+        buttons = QHBoxLayout()
+        self.run_button = QPushButton("Start / Resume")
+        self.run_button.setIcon(qta.icon('fa6s.play'))
+        self.run_button.clicked.connect(self.run_selected)
+        buttons.addWidget(self.run_button)
+        self.pause_button = QPushButton("Pause")
+        self.pause_button.setIcon(qta.icon('fa6s.pause'))
+        self.pause_button.setEnabled(False)
+        self.pause_button.clicked.connect(self.pause)
+        buttons.addWidget(self.pause_button)
+        retry_button = QPushButton("Retry Failed")
+        retry_button.setIcon(qta.icon('fa6s.rotate'))
+        retry_button.clicked.connect(self.retry_failed)
+        buttons.addWidget(retry_button)
+        export_button = QPushButton("Export...")
+        export_button.setIcon(qta.icon('fa6s.file-export'))
+        export_button.clicked.connect(self.export_selected)
+        buttons.addWidget(export_button)
+        buttons.addStretch()
+        close_button = QPushButton("Close")
+        close_button.clicked.connect(self.close)
+        buttons.addWidget(close_button)
+        layout.addLayout(buttons)
+
+    def refresh_jobs(self):
+        selected = self.selected_job_id()
+        jobs = self.store.list_jobs()
+        self.jobs_table.setRowCount(len(jobs))
+        for row, job in enumerate(jobs):
+            progress = job["progress"]
+            text = (f"{progress['done']}/{progress['total']} done, {progress['failed']} failed, "
+                    f"{progress['pending'] + progress['in_flight']} remaining")
+            for column, value in enumerate((str(job["id"]), job["name"], text)):
+                self.jobs_table.setItem(row, column, QTableWidgetItem(value))
+            if job["id"] == selected:
+                self.jobs_table.selectRow(row)
+
+    def selected_job_id(self):
+        row = self.jobs_table.currentRow()
+        item = self.jobs_table.item(row, 0) if row >= 0 else None
+        return int(item.text()) if item else None
+
+    def load_prompts_file(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Load Prompts", "", "Prompt files (*.txt *.jsonl)")
+        if not path:
+            return
+        try:
+            items = read_prompts_file(path)
+        except Exception as e:
+            QMessageBox.warning(self, "Warning", f"Could not read {path}: {str(e)}")
+            return
+        self.prompts_edit.setPlainText("\n".join(item["prompt"].replace("\n", " ") for item in items))
+        if not self.name_edit.text().strip():
+            self.name_edit.setText(Path(path).name)
+
+    def create_job(self):
+        prompts = [line.strip() for line in self.prompts_edit.toPlainText().splitlines() if line.strip()]
+        if not prompts:
+            QMessageBox.warning(self, "Warning", "Please enter at least one prompt.")
+            return
+        name = self.name_edit.text().strip() or f"{len(prompts)} prompts"
+        self.store.create_job(name, [{"prompt": prompt} for prompt in prompts], dict(self.settings, pack_size=self.pack_spin.value()))
+        self.prompts_edit.clear()
+        self.name_edit.clear()
+        self.refresh_jobs()
+        self.jobs_table.selectRow(0)
+
+    def run_selected(self):
+        job_id = self.selected_job_id()
+        if job_id is None or self.job_thread is not None:
+            return
+        self.job_thread = BatchJobThread(self.api_manager, self.store, job_id, self)
+        self.job_thread.progress.connect(self.on_progress)
+        self.job_thread.job_finished.connect(self.on_job_finished)
+        self.job_thread.error.connect(self.on_job_error)
+        self.job_thread.finished.connect(self.on_thread_finished)
+        self.on_progress(self.store.progress(job_id))
+        self.progress_bar.setVisible(True)
+        self.run_button.setEnabled(False)
+        self.pause_button.setEnabled(True)
+        self.job_thread.start()
+
+    def pause(self):
+        if self.job_thread:
+            # In-flight items finish and are checkpointed; nothing new is claimed
+            self.job_thread.pause()
+            self.pause_button.setEnabled(False)
+
+    def on_progress(self, progress):
+        self.progress_bar.setMaximum(max(1, progress["total"]))
+        self.progress_bar.setValue(progress["done"] + progress["failed"])
+        self.refresh_jobs()
+
+    def on_job_finished(self, progress):
+        self.on_progress(progress)
+
+    def on_job_error(self, message):
+        QMessageBox.critical(self, "Error", f"Batch job stopped: {message}")
+
+    def on_thread_finished(self):
+        self.job_thread.deleteLater()
+        self.job_thread = None
+        self.run_button.setEnabled(True)
+        self.pause_button.setEnabled(False)
+        self.refresh_jobs()
+
+    def retry_failed(self):
+        job_id = self.selected_job_id()
+        if job_id is not None:
+            self.store.retry_failed(job_id)
+            self.refresh_jobs()
+
+    def export_selected(self):
+        job_id = self.selected_job_id()
+        if job_id is None:
+            return
+        path, _ = QFileDialog.getSaveFileName(self, "Export Results", f"job_{job_id}.jsonl", "JSON Lines (*.jsonl)")
+        if not path:
+            return
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                for row in self.store.results(job_id):
+                    f.write(json.dumps(row, ensure_ascii=False) + "\n")
+        except Exception as e:
+            QMessageBox.warning(self, "Warning", f"Failed to export: {str(e)}")
+
+    def done(self, result):
+        # Close, Esc and the window's close button all end here
+        if self.job_thread is None:
+            self.store.close()
+        else:
+            # The dialog and its store are going away; nothing the thread still emits is for them
+            for signal in (self.job_thread.progress, self.job_thread.job_finished, self.job_thread.error, self.job_thread.finished):
+                signal.disconnect()
+            from .gemini_worker import stop_workers
+            if stop_workers([self.job_thread]):
+                self.store.close()
+            # Otherwise the detached thread still checkpoints; the store's connection closes with it
+            self.job_thread = None
+        super().done(result)
@@ -0,0 +1,148 @@
+import os
+import re
+import json
+import hashlib
+import threading
+from .config_store import write_atomic
+
+# Everything from the per-request session marker on is random, so it is left out of the match key
+SESSION_MARKER = re.compile(r"\n\nSESSION_RESET_CONTEXT:.*\Z", re.DOTALL)
+SYSTEM_LANGUAGE = re.compile(r"MUST be written entirely in ([A-Za-z ]+?)\.")
+SYSTEM_SETTINGS = re.compile(r"Current Settings - Language: ([^,]+), Scope: ([^,]+), Type: ([^,]+), Detail: ([^.]+)\.")
+
+
+def cassette_enabled():
+    return os.environ.get("PROMANIS_BACKEND", "").lower() == "cassette"
+
+
+def cassette_settings():
+    return {
+        "path": os.environ.get("PROMANIS_CASSETTE", "Benchmarks/cassettes/default.json"),
+        "mode": os.environ.get("PROMANIS_CASSETTE_MODE", "replay").lower(),
+    }
+
+
+def stable_instruction(system_instruction):
+    return SESSION_MARKER.sub("", system_instruction or "")
+
+
+def exact_key(model, system_instruction, contents):
+    raw = json.dumps([model, stable_instruction(system_instruction), contents], ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def loose_key(model, system_instruction, contents):
+    """Matches a recording even after the instruction text changed, as long as prompt and settings are the same"""
+    settings = SYSTEM_SETTINGS.search(system_instruction or "")
+    if settings:
+        # Language, scope, type and detail: a Simple answer must never stand in for a Complex one
+        described = list(settings.groups())
+    else:
+        match = SYSTEM_LANGUAGE.search(system_instruction or "")
+        described = [match.group(1) if match else "English"]
+    raw = json.dumps([model, *described, contents], ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class CassetteUsage:
+    def __init__(self, prompt_tokens, output_tokens):
+        self.prompt_token_count = prompt_tokens
+        self.candidates_token_count = output_tokens
+        self.total_token_count = prompt_tokens + output_tokens
+
+
+class CassetteResponse:
+    def __init__(self, text, prompt_tokens, output_tokens, exact):
+        self.text = text
+        self.usage_metadata = CassetteUsage(prompt_tokens, output_tokens)
+        self.cassette_exact = exact
+
+
+class Cassette:
+    """Recorded Gemini responses in one JSON file, shared by every client in the process"""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.loose = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f).get("entries", {})
+        for key, entry in self.entries.items():
+            self.loose.setdefault(entry["loose_key"], key)
+
+    def lookup(self, model, system_instruction, contents):
+        with self.lock:
+            entry = self.entries.get(exact_key(model, system_instruction, contents))
+            if entry is not None:
+                return entry, True
+            key = self.loose.get(loose_key(model, system_instruction, contents))
+            return (self.entries[key], False) if key else (None, False)
+
+    def record(self, model, system_instruction, contents, response):
+        usage = getattr(response, "usage_metadata", None)
+        key = exact_key(model, system_instruction, contents)
+        entry = {
+            "loose_key": loose_key(model, system_instruction, contents),
+            "instruction_chars": len(stable_instruction(system_instruction)),
+            "text": response.text,
+            "prompt_tokens": getattr(usage, "prompt_token_count", 0) or 0,
+            "output_tokens": getattr(usage, "candidates_token_count", 0) or 0,
+        }
+        with self.lock:
+            self.entries[key] = entry
+            self.loose[entry["loose_key"]] = key
+            write_atomic(self.path, json.dumps({"entries": self.entries}, indent=1, ensure_ascii=False))
+
+
+_cassettes = {}
+_cassettes_lock = threading.Lock()
+
+
+def get_cassette(path):
+    with _cassettes_lock:
+        cassette = _cassettes.get(path)
+        if cassette is None:
+            cassette = Cassette(path)
+            _cassettes[path] = cassette
+        return cassette
+
+
+class CassetteModels:
+    def __init__(self, client):
+        self.client = client
+
+    def generate_content(self, model, contents, config=None):
+        system_instruction = getattr(config, "system_instruction", "") or ""
+        cassette = self.client.cassette
+        if self.client.mode == "record":
+            response = self.client.live().models.generate_content(model=model, contents=contents, config=config)
+            cassette.record(model, system_instruction, contents, response)
+            return response
+        entry, exact = cassette.lookup(model, system_instruction, contents)
+        if entry is None:
+            raise Exception(f"Cassette miss for prompt {str(contents)[:60]!r}; record it with PROMANIS_CASSETTE_MODE=record")
+        prompt_tokens = entry["prompt_tokens"]
+        if not exact:
+            # The instruction changed since recording: shift the input count by the size difference
+            prompt_tokens += (len(stable_instruction(system_instruction)) - entry["instruction_chars"]) // 4
+        return CassetteResponse(entry["text"], max(1, prompt_tokens), entry["output_tokens"], exact)
+
+
+class CassetteClient:
+    """Replays (or records) real Gemini responses so benchmarks are repeatable and free"""
+
+    def __init__(self, api_key=None, **kwargs):
+        settings = cassette_settings()
+        self.api_key = api_key
+        self.mode = settings["mode"]
+        self.cassette = get_cassette(settings["path"])
+        self.live_client = None
+        self.models = CassetteModels(self)
+
+    def live(self):
+        if self.live_client is None:
+            from google import genai
+            self.live_client = genai.Client(api_key=self.api_key)
+        return self.live_client
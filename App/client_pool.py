@@ -0,0 +1,37 @@
+import threading
+from .mock_backend import MockClient, mock_enabled
+from .cassette_backend import CassetteClient, cassette_enabled, cassette_settings
+
+_clients = {}
+_lock = threading.Lock()
+
+
+def get_client(api_key):
+    """One reusable client per API key, so connections are kept alive across requests and threads"""
+    with _lock:
+        client = _clients.get(api_key)
+        if client is None:
+            if mock_enabled():
+                client = MockClient(api_key=api_key)
+            elif cassette_enabled():
+                client = CassetteClient(api_key=api_key)
+            else:
+                from google import genai
+                client = genai.Client(api_key=api_key)
+            _clients[api_key] = client
+        return client
+
+
+def client_count():
+    with _lock:
+        return len(_clients)
+
+
+def clear_clients():
+    with _lock:
+        _clients.clear()
+
+
+def offline_backend():
+    """True when no request reaches the real API, so quota accounting does not apply"""
+    return mock_enabled() or (cassette_enabled() and cassette_settings()["mode"] != "record")
@@ -0,0 +1,204 @@
+import os
+import json
+import copy
+import tempfile
+import threading
+from pathlib import Path
+
+WATCH_INTERVAL_SECONDS = 1.0
+
+
+def file_signature(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def parse_api_keys(text):
+    return [line.strip() for line in text.splitlines() if line.strip() and not line.strip().startswith('#')]
+
+
+def write_atomic(path, text):
+    """Write to a temp file in the same directory and swap it in, so readers never see a half-written file"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=str(path.parent))
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except Exception:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+class ConfigStore:
+    """Single owner of App/config/config.json and api_keys.txt.
+
+    Each file is parsed once and served from memory; writes go through atomic replaces.
+    A background thread polls both files and notifies subscribers when they change on disk.
+    """
+
+    def __init__(self, base_dir, watch_interval=WATCH_INTERVAL_SECONDS):
+        self.base_dir = Path(base_dir)
+        self.config_path = self.base_dir / "App" / "config" / "config.json"
+        self.api_keys_path = self.base_dir / "api_keys.txt"
+        self.watch_interval = watch_interval
+        self.lock = threading.RLock()
+        self.config = None
+        self.config_signature = None
+        self.api_keys = None
+        self.api_keys_signature = None
+        self.listeners = []
+        self.watcher = None
+        self.stop_event = threading.Event()
+
+    # --- config.json ------------------------------------------------------------------------
+
+    def load_config_locked(self):
+        signature = file_signature(self.config_path)
+        config = {}
+        if signature is not None:
+            try:
+                with open(self.config_path, "r", encoding="utf-8") as f:
+                    loaded = json.load(f)
+                if isinstance(loaded, dict):
+                    config = loaded
+            except (OSError, ValueError) as e:
+                print(f"Warning: Failed to read config: {str(e)}")
+                # Keep serving the last good copy while the file is being edited
+                if self.config is not None:
+                    config = self.config
+        self.config = config
+        self.config_signature = signature
+
+    def get(self, key, default=None):
+        with self.lock:
+            if self.config is None:
+                self.load_config_locked()
+            value = self.config.get(key, default)
+        return copy.deepcopy(value)
+
+    def get_section(self, name, defaults=None):
+        """A dict section merged over defaults; non-dict values in the file are ignored"""
+        section = dict(defaults or {})
+        value = self.get(name)
+        if isinstance(value, dict):
+            section.update(value)
+        return section
+
+    def get_int(self, key, default=0):
+        value = self.get(key, default)
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return default
+
+    def update(self, **values):
+        """Merge top-level keys into config.json and write it atomically"""
+        with self.lock:
+            if self.config is None:
+                self.load_config_locked()
+            config = dict(self.config)
+            config.update(values)
+            write_atomic(self.config_path, json.dumps(config, indent=4, ensure_ascii=False))
+            self.config = config
+            self.config_signature = file_signature(self.config_path)
+
+    # --- api_keys.txt -----------------------------------------------------------------------
+
+    def load_api_keys_locked(self):
+        if not self.api_keys_path.exists():
+            raise FileNotFoundError(f"File api_keys.txt tidak ditemukan di {self.api_keys_path}!")
+        signature = file_signature(self.api_keys_path)
+        with open(self.api_keys_path, "r", encoding="utf-8") as f:
+            self.api_keys = parse_api_keys(f.read())
+        self.api_keys_signature = signature
+
+    def get_api_keys(self, reload=False):
+        with self.lock:
+            if self.api_keys is None or reload:
+                self.load_api_keys_locked()
+            return list(self.api_keys)
+
+    def read_api_keys_text(self):
+        with open(self.api_keys_path, "r", encoding="utf-8") as f:
+            return f.read()
+
+    def write_api_keys(self, text):
+        with self.lock:
+            write_atomic(self.api_keys_path, text)
+            self.api_keys = parse_api_keys(text)
+            self.api_keys_signature = file_signature(self.api_keys_path)
+        self.notify("api_keys")
+
+    # --- watching ---------------------------------------------------------------------------
+
+    def subscribe(self, callback):
+        """callback(name) is called with "config" or "api_keys" after a file changed on disk"""
+        with self.lock:
+            self.listeners.append(callback)
+            if self.watcher is None:
+                self.watcher = threading.Thread(target=self.watch, name="promanis-config-watch", daemon=True)
+                self.watcher.start()
+
+    def unsubscribe(self, callback):
+        with self.lock:
+            if callback in self.listeners:
+                self.listeners.remove(callback)
+
+    def notify(self, name):
+        with self.lock:
+            listeners = list(self.listeners)
+        for callback in listeners:
+            try:
+                callback(name)
+            except Exception as e:
+                print(f"Warning: config listener failed: {str(e)}")
+
+    def check_for_changes(self):
+        changed = []
+        with self.lock:
+            if self.config is not None and file_signature(self.config_path) != self.config_signature:
+                self.load_config_locked()
+                changed.append("config")
+            if self.api_keys is not None and file_signature(self.api_keys_path) != self.api_keys_signature:
+                try:
+                    self.load_api_keys_locked()
+                    changed.append("api_keys")
+                except (OSError, ValueError) as e:
+                    # Keep the previous keys and only warn once per change
+                    self.api_keys_signature = file_signature(self.api_keys_path)
+                    print(f"Warning: Failed to reload api_keys.txt: {str(e)}")
+        for name in changed:
+            self.notify(name)
+        return changed
+
+    def watch(self):
+        while not self.stop_event.wait(self.watch_interval):
+            self.check_for_changes()
+
+    def stop(self):
+        self.stop_event.set()
+
+
+stores = {}
+stores_lock = threading.Lock()
+
+
+def get_config_store(base_dir):
+    """One store per project directory, shared by the UI, the workers and the service"""
+    key = str(Path(base_dir).resolve())
+    with stores_lock:
+        store = stores.get(key)
+        if store is None:
+            store = ConfigStore(base_dir)
+            stores[key] = store
+        return store
@@ -0,0 +1,140 @@
+import os
+import mmap
+import codecs
+from pathlib import Path
+from .context_pipeline import CHARS_PER_TOKEN, estimate_tokens, extractive_summary
+
+SUPPORTED_EXTENSIONS = {
+    ".txt", ".md", ".markdown", ".rst", ".csv", ".tsv", ".log",
+    ".py", ".js", ".ts", ".tsx", ".jsx", ".java", ".kt", ".c", ".h", ".cpp", ".hpp", ".cs", ".go", ".rs",
+    ".rb", ".php", ".swift", ".sql", ".sh", ".bat", ".ps1", ".html", ".css", ".json", ".yaml", ".yml",
+    ".xml", ".toml", ".ini", ".cfg",
+}
+BLOCK_SIZE = 1024 * 1024
+SAMPLE_SIZE = 64 * 1024
+WINDOW_TOKENS = 4000
+
+BOMS = (
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+
+def is_supported_file(path):
+    return Path(path).suffix.lower() in SUPPORTED_EXTENSIONS
+
+
+def detect_encoding(sample):
+    """BOM first, then strict UTF-8, then the Windows code page most text editors here save with"""
+    for bom, encoding in BOMS:
+        if sample.startswith(bom):
+            return encoding
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(sample, final=False)
+        return "utf-8"
+    except UnicodeDecodeError:
+        pass
+    try:
+        sample.decode("cp1252")
+        return "cp1252"
+    except UnicodeDecodeError:
+        return "latin-1"
+
+
+def format_size(size_bytes):
+    size = float(size_bytes)
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+class ContextAttachment:
+    """A context file that is never loaded whole: reads go through mmap in fixed-size blocks"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.name = self.path.name
+        self.size_bytes = self.path.stat().st_size
+        with open(self.path, "rb") as f:
+            self.encoding = detect_encoding(f.read(SAMPLE_SIZE))
+        bytes_per_char = 2 if self.encoding == "utf-16" else 1
+        self.estimated_tokens = (self.size_bytes // bytes_per_char + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+    def describe(self):
+        return f"{self.name} · {format_size(self.size_bytes)} · ~{self.estimated_tokens:,} tok"
+
+    def iter_text(self, block_size=BLOCK_SIZE):
+        if self.size_bytes == 0:
+            return
+        decoder = codecs.getincrementaldecoder(self.encoding)(errors="replace")
+        with open(self.path, "rb") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                for offset in range(0, len(mapped), block_size):
+                    text = decoder.decode(mapped[offset:offset + block_size])
+                    if text:
+                        yield text.replace("\r\n", "\n")
+        tail = decoder.decode(b"", final=True)
+        if tail:
+            yield tail
+
+    def read_all(self):
+        return "".join(self.iter_text())
+
+    def read_within_budget(self, budget_tokens, query=""):
+        """Stream the file in windows and keep a proportional extract of each, so memory stays bounded"""
+        if self.estimated_tokens <= budget_tokens:
+            return self.read_all().strip()
+        window_chars = WINDOW_TOKENS * CHARS_PER_TOKEN
+        windows = max(1, self.estimated_tokens // WINDOW_TOKENS)
+        per_window_budget = max(16, budget_tokens // windows)
+        extracts = []
+        pending = ""
+        for block in self.iter_text():
+            pending += block
+            while len(pending) >= window_chars:
+                # Cut at a line break so sentences are not split across windows
+                cut = pending.rfind("\n", 0, window_chars)
+                cut = cut if cut > window_chars // 2 else window_chars
+                extracts.append(extractive_summary(pending[:cut], per_window_budget, query))
+                pending = pending[cut:]
+        if pending.strip():
+            extracts.append(extractive_summary(pending, per_window_budget, query))
+        merged = "\n".join(extract for extract in extracts if extract.strip())
+        return extractive_summary(merged, budget_tokens, query)
+
+
+def load_attachments(paths):
+    attachments = []
+    for path in paths:
+        try:
+            if os.path.isfile(path) and is_supported_file(path):
+                attachments.append(ContextAttachment(path))
+        except OSError as e:
+            print(f"Warning: cannot read attachment {path}: {str(e)}")
+    return attachments
+
+
+def combine_context(context_text, attachments, budget_tokens, threshold_tokens, query=""):
+    """Typed context plus attachment excerpts; when the total exceeds the threshold every source gets a budget share by size"""
+    context_text = (context_text or "").strip()
+    if not attachments:
+        return context_text
+    typed_tokens = estimate_tokens(context_text)
+    total_tokens = typed_tokens + sum(attachment.estimated_tokens for attachment in attachments)
+    over_threshold = total_tokens > threshold_tokens
+    parts = []
+    if context_text:
+        if over_threshold:
+            context_text = extractive_summary(context_text, max(32, budget_tokens * typed_tokens // total_tokens), query)
+        parts.append(context_text)
+    for attachment in attachments:
+        if over_threshold:
+            share = max(32, budget_tokens * attachment.estimated_tokens // total_tokens)
+            excerpt = attachment.read_within_budget(share, query)
+        else:
+            excerpt = attachment.read_all().strip()
+        if excerpt:
+            parts.append(f"[File: {attachment.name}]\n{excerpt}")
+    return "\n\n".join(parts)
@@ -0,0 +1,213 @@
+import re
+import time
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from .config_store import get_config_store
+from .client_pool import get_client
+from .deadlines import Deadline, load_deadlines, http_options, is_timeout_error, is_rate_limit_error
+
+# Gemini averages roughly four characters per token for English and Indonesian prose
+CHARS_PER_TOKEN = 4
+DEFAULT_CONTEXT_SETTINGS = {
+    "threshold_tokens": 2000,
+    "budget_tokens": 1500,
+    "chunk_tokens": 1500,
+    "mode": "extractive",
+    "model": "gemini-2.0-flash",
+}
+
+PARAGRAPH_SPLIT = re.compile(r"\n\s*\n")
+SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+|\n+")
+WORD = re.compile(r"\w+", re.UNICODE)
+STOPWORDS = frozenset(
+    "a an the and or but if then of to in on at for with by from as is are was were be been it this that these those "
+    "you your we our they their i he she his her its not no do does did can could should would will shall may might "
+    "yang dan di ke dari untuk dengan pada adalah ini itu atau juga tidak akan dalam oleh sebagai karena jika maka "
+    "saya kamu anda kami kita mereka ia dia sudah belum bisa dapat harus ada".split()
+)
+
+SUMMARY_INSTRUCTION = (
+    "You condense reference material for a prompt-writing assistant. "
+    "Rewrite the given text as a dense list of facts, names, numbers, requirements and constraints. "
+    "Keep the original language. Drop filler, repetition and formatting. "
+    "Do not add anything that is not in the text. Stay under {budget} tokens."
+)
+
+
+def load_context_settings(base_dir):
+    return get_config_store(base_dir).get_section("context", DEFAULT_CONTEXT_SETTINGS)
+
+
+def estimate_tokens(text):
+    if not text:
+        return 0
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def split_sentences(text):
+    return [sentence.strip() for sentence in SENTENCE_SPLIT.split(text) if sentence.strip()]
+
+
+def chunk_text(text, chunk_tokens):
+    """Split on paragraph boundaries, falling back to sentences for oversized paragraphs"""
+    max_chars = max(1, chunk_tokens) * CHARS_PER_TOKEN
+    chunks = []
+    current = []
+    current_len = 0
+    for paragraph in PARAGRAPH_SPLIT.split(text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        pieces = [paragraph] if len(paragraph) <= max_chars else split_sentences(paragraph)
+        for piece in pieces:
+            while len(piece) > max_chars:
+                if current:
+                    chunks.append("\n\n".join(current))
+                    current, current_len = [], 0
+                chunks.append(piece[:max_chars])
+                piece = piece[max_chars:]
+            if current and current_len + len(piece) + 2 > max_chars:
+                chunks.append("\n\n".join(current))
+                current, current_len = [], 0
+            current.append(piece)
+            current_len += len(piece) + 2
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+def content_words(text):
+    return [word for word in WORD.findall(text.lower()) if word not in STOPWORDS and len(word) > 2]
+
+
+def extractive_summary(text, budget_tokens, query=""):
+    """Keep the highest-scoring sentences (term frequency plus overlap with the prompt) in original order"""
+    if estimate_tokens(text) <= budget_tokens:
+        return text
+    sentences = split_sentences(text)
+    if not sentences:
+        return text[:budget_tokens * CHARS_PER_TOKEN]
+    frequencies = Counter(content_words(text))
+    query_words = set(content_words(query))
+    scored = []
+    for index, sentence in enumerate(sentences):
+        words = content_words(sentence)
+        if not words:
+            continue
+        score = sum(frequencies[word] for word in words) / (len(words) ** 0.5)
+        score += 3.0 * sum(1 for word in set(words) if word in query_words)
+        scored.append((score, index))
+    budget_chars = budget_tokens * CHARS_PER_TOKEN
+    selected = []
+    used = 0
+    for score, index in sorted(scored, reverse=True):
+        length = len(sentences[index]) + 1
+        if used + length > budget_chars:
+            continue
+        selected.append(index)
+        used += length
+    if not selected and scored:
+        # Every sentence is longer than the budget: keep the best one, truncated
+        best_index = max(scored)[1]
+        return sentences[best_index][:budget_chars]
+    return "\n".join(sentences[index] for index in sorted(selected))
+
+
+class ContextPipeline:
+    """Measures the optional context and condenses it when it is above the token threshold.
+
+    mode "extractive" runs entirely locally. mode "map_reduce" summarizes every chunk with a
+    parallel Gemini call (one key per call) and merges the results, falling back to local
+    extraction for any chunk whose call fails, or that would start after the caller's deadline
+    ran out or stop_requested was set.
+    """
+
+    def __init__(self, api_manager=None, settings=None, priority="interactive", deadline=None, stop_requested=None):
+        self.api_manager = api_manager
+        self.priority = priority
+        # The refinement's own Deadline, so condensing counts against its overall budget
+        self.deadline = deadline
+        self.stop_requested = stop_requested or threading.Event()
+        self.settings = dict(DEFAULT_CONTEXT_SETTINGS)
+        if settings:
+            self.settings.update(settings)
+        self.stats = {}
+
+    def prepare(self, context_text, prompt_text="", attachments=None):
+        started = time.perf_counter()
+        context_text = (context_text or "").strip()
+        if attachments:
+            from .context_files import combine_context
+            context_text = combine_context(
+                context_text, attachments, self.settings["budget_tokens"], self.settings["threshold_tokens"], prompt_text
+            )
+        original_tokens = estimate_tokens(context_text)
+        self.stats = {"original_tokens": original_tokens, "final_tokens": original_tokens, "chunks": 0, "mode": "none"}
+        if original_tokens <= self.settings["threshold_tokens"]:
+            return context_text
+
+        budget = self.settings["budget_tokens"]
+        chunks = chunk_text(context_text, self.settings["chunk_tokens"])
+        per_chunk_budget = max(32, budget // max(1, len(chunks)))
+        mode = self.settings["mode"]
+        if mode == "map_reduce" and self.api_manager is not None:
+            summaries = self.map_chunks(chunks, per_chunk_budget, prompt_text)
+        else:
+            mode = "extractive"
+            summaries = [extractive_summary(chunk, per_chunk_budget, prompt_text) for chunk in chunks]
+        merged = "\n\n".join(summary for summary in summaries if summary.strip())
+        # Reduce step: the merged summaries still have to fit the overall budget
+        merged = extractive_summary(merged, budget, prompt_text)
+
+        self.stats.update({
+            "final_tokens": estimate_tokens(merged),
+            "chunks": len(chunks),
+            "mode": mode,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000.0, 1),
+        })
+        print(f"Context condensed ({mode}): {original_tokens} -> {self.stats['final_tokens']} tokens in {len(chunks)} chunks")
+        return merged
+
+    def map_chunks(self, chunks, per_chunk_budget, prompt_text):
+        if self.deadline is None:
+            deadlines = load_deadlines(self.api_manager.base_dir)
+            self.deadline = Deadline(deadlines["overall_seconds"], deadlines["attempt_seconds"])
+        max_workers = max(1, min(len(chunks), self.api_manager.get_total_keys()))
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="promanis-context") as pool:
+            futures = [pool.submit(self.summarize_chunk, chunk, per_chunk_budget, prompt_text) for chunk in chunks]
+            return [future.result() for future in futures]
+
+    def summarize_chunk(self, chunk, budget_tokens, prompt_text):
+        if self.deadline.expired() or self.stop_requested.is_set():
+            return extractive_summary(chunk, budget_tokens, prompt_text)
+        api_key = None
+        try:
+            from google.genai import types
+            instruction = SUMMARY_INSTRUCTION.format(budget=budget_tokens)
+            if prompt_text:
+                instruction += f"\nPrioritize information relevant to this request: {prompt_text[:500]}"
+            projected_tokens = estimate_tokens(instruction + chunk) + budget_tokens
+            api_key = self.api_manager.acquire_key(projected_tokens, max_wait_seconds=self.deadline.remaining(), priority=self.priority)
+            response = get_client(api_key).models.generate_content(
+                model=self.settings["model"],
+                config=types.GenerateContentConfig(
+                    system_instruction=instruction,
+                    http_options=http_options(self.deadline.attempt_timeout())
+                ),
+                contents=chunk
+            )
+            usage = getattr(response, "usage_metadata", None)
+            total = getattr(usage, "total_token_count", None) if usage else None
+            if total:
+                self.api_manager.report_usage(api_key, total, projected_tokens)
+            if response and getattr(response, "text", None) and response.text.strip():
+                return response.text.strip()
+        except Exception as e:
+            error_message = str(e)
+            if api_key and is_timeout_error(e):
+                self.api_manager.report_deadline_hit(api_key)
+            elif api_key and is_rate_limit_error(e):
+                self.api_manager.report_rate_limited(api_key)
+            print(f"Chunk summary failed, using local extraction: {error_message}")
+        return extractive_summary(chunk, budget_tokens, prompt_text)
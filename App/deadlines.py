@@ -0,0 +1,64 @@
+import time
+from .config_store import get_config_store
+
+DEFAULT_DEADLINES = {
+    # One HTTP call; enforced by the SDK's transport, so a hung connection is dropped (0 = no per-call limit)
+    "attempt_seconds": 30,
+    # Everything for one refinement: attempts, quota waits and retry sleeps
+    "overall_seconds": 90,
+    # A packed request returns several prompts, so it gets longer per attempt (0 = no limit)
+    "packed_attempt_seconds": 90,
+}
+
+
+def load_deadlines(base_dir):
+    return get_config_store(base_dir).get_section("deadlines", DEFAULT_DEADLINES)
+
+
+def http_options(seconds):
+    """Per-request transport timeout for GenerateContentConfig (the SDK takes milliseconds).
+
+    0, None or an unlimited budget mean no timeout; the config then leaves the client's own in place.
+    """
+    if not seconds or seconds == float("inf"):
+        return None
+    from google.genai import types
+    return types.HttpOptions(timeout=max(1, int(seconds * 1000)))
+
+
+def is_timeout_error(error):
+    """httpx, aiohttp, socket and mock timeouts all carry 'Timeout' in a class name"""
+    return isinstance(error, TimeoutError) or any("Timeout" in cls.__name__ for cls in type(error).__mro__)
+
+
+def is_rate_limit_error(error):
+    """A 429 from Gemini: the key is out of quota for now, so the caller rolls to another one"""
+    message = str(error)
+    return "429" in message or "RESOURCE_EXHAUSTED" in message or "RATE_LIMIT_EXCEEDED" in message
+
+
+class Deadline:
+    """Overall time budget for one refinement; hands out what is left to each attempt"""
+
+    def __init__(self, overall_seconds, attempt_seconds):
+        self.attempt_seconds = attempt_seconds
+        self.overall_seconds = overall_seconds
+        self.started = time.monotonic()
+        self.expires = time.monotonic() + overall_seconds if overall_seconds else None
+
+    def remaining(self):
+        if self.expires is None:
+            return float("inf")
+        return max(0.0, self.expires - time.monotonic())
+
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    def expired(self):
+        return self.remaining() <= 0
+
+    def attempt_timeout(self):
+        remaining = self.remaining()
+        timeout = min(self.attempt_seconds, remaining) if self.attempt_seconds else remaining
+        # A spent budget still gets the shortest real timeout, never "no timeout"
+        return max(0.001, timeout)
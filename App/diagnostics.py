@@ -0,0 +1,75 @@
+import os
+import gc
+import sys
+import time
+import threading
+import tracemalloc
+
+# Classes whose live instance count should stay flat however long the app runs
+TRACKED_CLASSES = ("PromptRefinementWorker", "APITestWorker", "BatchJobThread", "SettingsDialog", "BatchDialog")
+
+
+def start_tracing_from_env():
+    """PROMANIS_TRACEMALLOC=<frames> turns on allocation tracing from launch"""
+    frames = os.environ.get("PROMANIS_TRACEMALLOC", "")
+    if frames and not tracemalloc.is_tracing():
+        tracemalloc.start(int(frames) if frames.isdigit() else 1)
+
+
+def count_objects(class_names=TRACKED_CLASSES):
+    counts = dict.fromkeys(class_names, 0)
+    for obj in gc.get_objects():
+        name = type(obj).__name__
+        if name in counts:
+            counts[name] += 1
+    return counts
+
+
+def resident_memory_bytes():
+    try:
+        if sys.platform.startswith("linux"):
+            import resource
+            with open("/proc/self/statm", "r") as f:
+                return int(f.read().split()[1]) * resource.getpagesize()
+        if sys.platform == "win32":
+            import ctypes
+            from ctypes import wintypes
+
+            class ProcessMemoryCounters(ctypes.Structure):
+                _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                            ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                            ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                            ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                            ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+
+            counters = ProcessMemoryCounters()
+            counters.cb = ctypes.sizeof(counters)
+            process = ctypes.windll.kernel32.GetCurrentProcess()
+            if ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+                return counters.WorkingSetSize
+        else:
+            import resource
+            # macOS reports the peak in bytes; close enough for trend lines
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    except Exception:
+        pass
+    return None
+
+
+def collect_diagnostics(extra=None):
+    threads = threading.enumerate()
+    report = {
+        "time": time.time(),
+        "threads": len(threads),
+        "thread_names": sorted(thread.name for thread in threads),
+        "objects": count_objects(),
+        "gc_objects": len(gc.get_objects()),
+        "rss_bytes": resident_memory_bytes(),
+        "tracemalloc": None,
+    }
+    if tracemalloc.is_tracing():
+        current, peak = tracemalloc.get_traced_memory()
+        report["tracemalloc"] = {"current_bytes": current, "peak_bytes": peak}
+    if extra:
+        report.update(extra)
+    return report
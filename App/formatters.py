@@ -0,0 +1,102 @@
+import re
+
+# Patterns are compiled once at import; formatting runs in the worker thread for every result
+ESCAPED_NEWLINE = re.compile(r"\\n")
+SINGLE_ASTERISK_BULLET = re.compile(r"(?<!\*)\* (?!\*)")
+BOLD = re.compile(r"\*\*(.*?)\*\*")
+LINE_BULLET = re.compile(r"^[ \t]*(?:[-*•]|\d+[.)])[ \t]+", re.MULTILINE)
+SECTION_LABEL = re.compile(r"^[ \t]*\[?[A-Z][A-Za-z /&-]{1,30}\]?:[ \t]*", re.MULTILINE)
+MARKDOWN_HEADING = re.compile(r"^[ \t]*#{1,6}[ \t]+", re.MULTILINE)
+EXTRA_BLANK_LINES = re.compile(r"\n{3,}")
+WHITESPACE_RUN = re.compile(r"[ \t]+")
+TRAILING_PUNCTUATION = re.compile(r"[\s,;.]+$")
+
+
+def unescape_newlines(text):
+    return ESCAPED_NEWLINE.sub("\n", text)
+
+
+def bullets_to_dots(text):
+    return SINGLE_ASTERISK_BULLET.sub("• ", text)
+
+
+def bullets_to_dashes(text):
+    return SINGLE_ASTERISK_BULLET.sub("- ", text)
+
+
+def bold_to_upper(text):
+    return BOLD.sub(lambda m: m.group(1).upper(), text)
+
+
+def strip_emphasis(text):
+    return BOLD.sub(r"\1", text)
+
+
+def strip_headings(text):
+    return MARKDOWN_HEADING.sub("", text)
+
+
+def collapse_blank_lines(text):
+    return EXTRA_BLANK_LINES.sub("\n\n", text).strip()
+
+
+def keyword_line(text):
+    """Image models (Midjourney, Stable Diffusion) work best with one comma-separated line of descriptors"""
+    text = SECTION_LABEL.sub("", LINE_BULLET.sub("", text))
+    parts = []
+    for line in text.split("\n"):
+        line = TRAILING_PUNCTUATION.sub("", WHITESPACE_RUN.sub(" ", line).strip())
+        if line:
+            parts.append(line)
+    return ", ".join(parts)
+
+
+def flowing_paragraphs(text):
+    """Video models (Sora, Runway, Pika) expect prose: bullets are merged into sentences per paragraph"""
+    text = SECTION_LABEL.sub("", LINE_BULLET.sub("", text))
+    paragraphs = []
+    for block in text.split("\n\n"):
+        sentences = []
+        for line in block.split("\n"):
+            line = WHITESPACE_RUN.sub(" ", line).strip()
+            if not line:
+                continue
+            line = line[0].upper() + line[1:]
+            if line[-1] not in ".!?":
+                line += "."
+            sentences.append(line)
+        if sentences:
+            paragraphs.append(" ".join(sentences))
+    return "\n\n".join(paragraphs)
+
+
+OUTPUT_PROFILES = {
+    "bullets": (unescape_newlines, bullets_to_dots, bold_to_upper),
+    "plain": (unescape_newlines, strip_emphasis, bullets_to_dashes, strip_headings, collapse_blank_lines),
+    "markdown": (unescape_newlines,),
+    "image": (unescape_newlines, strip_emphasis, strip_headings, keyword_line),
+    "video": (unescape_newlines, strip_emphasis, strip_headings, flowing_paragraphs),
+}
+
+DEFAULT_PROFILE = "bullets"
+
+# "auto" picks the model-specific style from the canonical prompt type
+AUTO_PROFILE_BY_TYPE = {
+    "Image Generation": "image",
+    "Video Generation": "video",
+    "Video+Audio Generation": "video",
+}
+
+
+def resolve_profile(profile, prompt_type=None):
+    if profile == "auto":
+        return AUTO_PROFILE_BY_TYPE.get(prompt_type, DEFAULT_PROFILE)
+    return profile if profile in OUTPUT_PROFILES else DEFAULT_PROFILE
+
+
+def format_output(text, profile=DEFAULT_PROFILE, prompt_type=None):
+    if not text or not isinstance(text, str):
+        return text
+    for step in OUTPUT_PROFILES[resolve_profile(profile, prompt_type)]:
+        text = step(text)
+    return text
@@ -0,0 +1,147 @@
+import re
+import json
+import difflib
+from .refiner import PromptRefiner, RefinementError
+from .formatters import format_output
+from .context_pipeline import split_sentences, estimate_tokens
+from .config_store import get_config_store
+
+DEFAULT_INCREMENTAL = {
+    "enabled": True,
+    # Above this share of changed characters in the raw prompt, a full refinement is cheaper and better
+    "max_changed_ratio": 0.4,
+}
+# Request fields that must be unchanged for the previous result to be a valid base
+BASE_FIELDS = ("context", "language", "scope", "type", "detail", "format", "compress", "attachments")
+
+INCREMENTAL_CLAUSE = (
+    "\n\nINCREMENTAL UPDATE (overrides the output format above): The input holds PREVIOUS_REFINED_PROMPT, which "
+    "you produced earlier from a raw prompt, and RAW_PROMPT_CHANGES, the sentences the user has since removed (-) "
+    "and added (+). Update the refined prompt so it reflects the changes and still follows every rule above, "
+    "changing as little as possible. Return ONLY a JSON object of exact text replacements: "
+    "{\"edits\": [{\"find\": \"<text copied exactly from PREVIOUS_REFINED_PROMPT>\", \"replace\": \"<new text>\"}]}. "
+    "Each find must occur exactly once in PREVIOUS_REFINED_PROMPT; use an empty replace to delete. "
+    "If the change affects most of the prompt, return {\"refined_prompt\": \"...\"} with the full new version instead."
+)
+
+
+class PatchError(RefinementError):
+    """The model's edits do not apply to the previous result; the caller falls back to a full refinement"""
+
+
+def load_incremental_settings(base_dir):
+    return get_config_store(base_dir).get_section("incremental", DEFAULT_INCREMENTAL)
+
+
+def prompt_changes(old_prompt, new_prompt):
+    """Sentence-level diff as '- removed' / '+ added' lines, and the share of characters that changed"""
+    old_sentences, new_sentences = split_sentences(old_prompt), split_sentences(new_prompt)
+    lines, changed = [], 0
+    matcher = difflib.SequenceMatcher(a=old_sentences, b=new_sentences, autojunk=False)
+    for tag, old_start, old_end, new_start, new_end in matcher.get_opcodes():
+        if tag == "equal":
+            continue
+        for sentence in old_sentences[old_start:old_end]:
+            lines.append(f"- {sentence}")
+            changed += len(sentence)
+        for sentence in new_sentences[new_start:new_end]:
+            lines.append(f"+ {sentence}")
+            changed += len(sentence)
+    # Removed plus added characters over both versions: 0 for no change, 1 for a complete rewrite
+    total = max(len(old_prompt) + len(new_prompt), 1)
+    return "\n".join(lines), min(1.0, changed / total)
+
+
+def comparable(value):
+    # Attachments are a tuple in a live request and a list once the session was saved as JSON
+    return list(value) if isinstance(value, tuple) else value
+
+
+def incremental_base(base, request, settings):
+    """(previous refined text, changes) when the previous result can be patched into this request, else None"""
+    if not settings.get("enabled", True) or not base or not base.get("refined"):
+        return None
+    previous = base.get("request", {})
+    if request.get("bilingual") or any(comparable(previous.get(field)) != comparable(request.get(field)) for field in BASE_FIELDS):
+        return None
+    if previous.get("prompt", "").strip() == request["prompt"].strip():
+        return None
+    changes, ratio = prompt_changes(previous.get("prompt", ""), request["prompt"])
+    if not changes or ratio > settings["max_changed_ratio"]:
+        return None
+    return base["refined"], changes
+
+
+def apply_edits(text, edits):
+    """Apply find/replace edits in order; every find must match exactly once"""
+    for edit in edits:
+        if not isinstance(edit, dict) or not isinstance(edit.get("find"), str) or not edit["find"]:
+            raise PatchError(f"Malformed edit: {edit!r}")
+        find = edit["find"].replace("\\n", "\n")
+        replace = str(edit.get("replace") or "").replace("\\n", "\n")
+        count = text.count(find)
+        if count != 1:
+            raise PatchError(f"Edit target found {count} times: {find[:60]!r}")
+        text = text.replace(find, replace, 1)
+    return text
+
+
+class IncrementalRefiner(PromptRefiner):
+    """Updates a previous refinement after a small raw-prompt edit instead of regenerating it.
+
+    The model only sees the previous refined prompt and the changed sentences and answers with
+    find/replace edits, which are applied locally. If the edits do not apply cleanly, refine()
+    runs a normal full refinement instead.
+    """
+
+    def __init__(self, api_manager, prompt_text, previous_refined, changes, **options):
+        super().__init__(api_manager, prompt_text, **options)
+        self.previous_refined = previous_refined
+        self.changes = changes
+        self.settings = load_incremental_settings(api_manager.base_dir)
+        self.mode = "incremental"
+
+    def build_request(self, context_text, output_budget):
+        if self.mismatch_text or self.revision_problems:
+            return super().build_request(context_text, output_budget)
+        system_instruction, type_en, detail_en, output_limit = self.build_system_instruction(context_text, output_budget)
+        contents = f"PREVIOUS_REFINED_PROMPT:\n{self.previous_refined}\n\nRAW_PROMPT_CHANGES:\n{self.changes}"
+        # The normal cap stays in place so a full-rewrite answer still fits; edits only use a fraction of it
+        return system_instruction + INCREMENTAL_CLAUSE, contents, type_en, detail_en, output_limit
+
+    def expected_output(self, detail_en, output_limit):
+        expected = estimate_tokens(self.changes) * 3 + 32
+        return min(expected, output_limit) if output_limit else expected
+
+    def parse_result(self, text, type_en, final):
+        try:
+            parsed = json.loads(re.sub(r"^```(?:json)?\s*|\s*```$", "", text.strip()))
+        except ValueError:
+            parsed = None
+        if isinstance(parsed, dict) and isinstance(parsed.get("edits"), list):
+            refined_text = apply_edits(self.previous_refined, parsed["edits"])
+            print(f"Applied {len(parsed['edits'])} incremental edits")
+            self.refined_text = refined_text
+            return format_output(refined_text, self.output_profile, type_en)
+        # The model chose a full rewrite (or wrapped it differently); the normal parser handles that
+        if not self.revision_problems:
+            self.mode = "rewrite"
+        return super().parse_result(text, type_en, final)
+
+    def refine(self):
+        try:
+            return super().refine()
+        except PatchError as e:
+            print(f"Incremental update did not apply ({str(e)}), running a full refinement")
+            self.mode = "full"
+            refiner = PromptRefiner(
+                self.api_manager, self.prompt_text, self.language, self.context_text, self.scope, self.detail_level,
+                self.prompt_type, output_profile=self.output_profile, attachments=self.attachments,
+                compress_tokens=self.compress_tokens, priority=self.priority, review=self.review_enabled
+            )
+            refiner.max_retries = self.max_retries
+            refiner.stop_requested = self.stop_requested
+            result = refiner.refine()
+            self.refined_text = refiner.refined_text
+            self.calls += refiner.calls
+            return result
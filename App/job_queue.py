@@ -0,0 +1,403 @@
+import json
+import time
+import sqlite3
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from .formatters import DEFAULT_PROFILE
+
+PENDING = "pending"
+IN_FLIGHT = "in_flight"
+DONE = "done"
+FAILED = "failed"
+
+DEFAULT_JOB_SETTINGS = {
+    "language": "English",
+    "scope": "General",
+    "type": "Text Generation",
+    "detail": "Detailed",
+    "format": DEFAULT_PROFILE,
+    "context": "",
+    # Non-zero: compress every result to at most this many tokens
+    "compress": 0,
+    # Above 1: send up to this many context-free items in one request (see App/packing.py)
+    "pack_size": 1,
+}
+MAX_ITEM_ATTEMPTS = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    settings TEXT NOT NULL,
+    created REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS items (
+    job_id INTEGER NOT NULL,
+    item_index INTEGER NOT NULL,
+    prompt TEXT NOT NULL,
+    context TEXT NOT NULL DEFAULT '',
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    solo INTEGER NOT NULL DEFAULT 0,
+    updated REAL NOT NULL,
+    PRIMARY KEY (job_id, item_index)
+);
+CREATE INDEX IF NOT EXISTS items_state ON items (job_id, state, item_index);
+"""
+
+
+def default_jobs_path(base_dir):
+    return Path(base_dir) / "App" / "config" / "jobs.sqlite3"
+
+
+def read_prompts_file(path):
+    """One prompt per line for .txt; .jsonl lines may be strings or {"prompt", "context"} objects"""
+    path = Path(path)
+    items = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if path.suffix.lower() == ".jsonl":
+                entry = json.loads(line)
+                if isinstance(entry, str):
+                    entry = {"prompt": entry}
+                items.append({"prompt": str(entry.get("prompt", "")), "context": str(entry.get("context", "") or "")})
+            else:
+                items.append({"prompt": line, "context": ""})
+    return [item for item in items if item["prompt"].strip()]
+
+
+class JobStore:
+    """Batch jobs and their items in SQLite; every state change is committed immediately as a checkpoint"""
+
+    def __init__(self, db_path):
+        self.db_path = str(db_path)
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+        columns = {row[1] for row in self.connection.execute("PRAGMA table_info(items)")}
+        if "solo" not in columns:
+            # Stores created before packing existed
+            self.connection.execute("ALTER TABLE items ADD COLUMN solo INTEGER NOT NULL DEFAULT 0")
+
+    def create_job(self, name, items, settings=None):
+        job_settings = dict(DEFAULT_JOB_SETTINGS)
+        job_settings.update(settings or {})
+        now = time.time()
+        with self.lock:
+            self.connection.execute("BEGIN")
+            try:
+                cursor = self.connection.execute(
+                    "INSERT INTO jobs (name, settings, created) VALUES (?, ?, ?)",
+                    (name, json.dumps(job_settings, ensure_ascii=False), now)
+                )
+                job_id = cursor.lastrowid
+                self.connection.executemany(
+                    "INSERT INTO items (job_id, item_index, prompt, context, updated) VALUES (?, ?, ?, ?, ?)",
+                    [(job_id, index, item["prompt"], item.get("context", ""), now) for index, item in enumerate(items)]
+                )
+                self.connection.execute("COMMIT")
+            except Exception:
+                self.connection.execute("ROLLBACK")
+                raise
+        return job_id
+
+    def job(self, job_id):
+        with self.lock:
+            row = self.connection.execute("SELECT id, name, settings, created FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            raise KeyError(f"Job {job_id} not found")
+        return {"id": row[0], "name": row[1], "settings": json.loads(row[2]), "created": row[3]}
+
+    def list_jobs(self):
+        with self.lock:
+            rows = self.connection.execute("SELECT id FROM jobs ORDER BY id DESC").fetchall()
+        return [dict(self.job(row[0]), progress=self.progress(row[0])) for row in rows]
+
+    def progress(self, job_id):
+        counts = {PENDING: 0, IN_FLIGHT: 0, DONE: 0, FAILED: 0}
+        with self.lock:
+            for state, count in self.connection.execute(
+                    "SELECT state, COUNT(*) FROM items WHERE job_id = ? GROUP BY state", (job_id,)):
+                counts[state] = count
+        counts["total"] = sum(counts.values())
+        return counts
+
+    def recover(self, job_id):
+        """Items left in flight by a crash, sleep or kill go back to pending; done items are untouched"""
+        with self.lock:
+            cursor = self.connection.execute(
+                "UPDATE items SET state = ?, updated = ? WHERE job_id = ? AND state = ?",
+                (PENDING, time.time(), job_id, IN_FLIGHT)
+            )
+        return cursor.rowcount
+
+    def retry_failed(self, job_id):
+        with self.lock:
+            cursor = self.connection.execute(
+                "UPDATE items SET state = ?, attempts = 0, error = NULL, updated = ? WHERE job_id = ? AND state = ?",
+                (PENDING, time.time(), job_id, FAILED)
+            )
+        return cursor.rowcount
+
+    def claim_next(self, job_id):
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT item_index, prompt, context FROM items WHERE job_id = ? AND state = ? ORDER BY item_index LIMIT 1",
+                (job_id, PENDING)
+            ).fetchone()
+            if row is None:
+                return None
+            self.connection.execute(
+                "UPDATE items SET state = ?, attempts = attempts + 1, updated = ? WHERE job_id = ? AND item_index = ?",
+                (IN_FLIGHT, time.time(), job_id, row[0])
+            )
+        return {"index": row[0], "prompt": row[1], "context": row[2]}
+
+    def claim_pack(self, job_id, size):
+        """Up to size pending items that may share a request: no per-item context and not split out before"""
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT item_index, prompt, context FROM items WHERE job_id = ? AND state = ? AND solo = 0 AND context = '' "
+                "ORDER BY item_index LIMIT ?",
+                (job_id, PENDING, size)
+            ).fetchall()
+            now = time.time()
+            self.connection.executemany(
+                "UPDATE items SET state = ?, attempts = attempts + 1, updated = ? WHERE job_id = ? AND item_index = ?",
+                [(IN_FLIGHT, now, job_id, row[0]) for row in rows]
+            )
+        return [{"index": row[0], "prompt": row[1], "context": row[2]} for row in rows]
+
+    def complete(self, job_id, index, result):
+        """Idempotent: a result is written once and never overwritten by a late duplicate"""
+        with self.lock:
+            cursor = self.connection.execute(
+                "UPDATE items SET state = ?, result = ?, error = NULL, updated = ? "
+                "WHERE job_id = ? AND item_index = ? AND state != ?",
+                (DONE, result, time.time(), job_id, index, DONE)
+            )
+        return cursor.rowcount == 1
+
+    def fail(self, job_id, index, error, retryable=True, max_attempts=MAX_ITEM_ATTEMPTS):
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT attempts FROM items WHERE job_id = ? AND item_index = ? AND state = ?",
+                (job_id, index, IN_FLIGHT)
+            ).fetchone()
+            if row is None:
+                return
+            state = PENDING if retryable and row[0] < max_attempts else FAILED
+            self.connection.execute(
+                "UPDATE items SET state = ?, error = ?, updated = ? WHERE job_id = ? AND item_index = ?",
+                (state, error, time.time(), job_id, index)
+            )
+
+    def release(self, job_id, index):
+        """Put an item back without counting the attempt (quota wait, pause)"""
+        with self.lock:
+            self.connection.execute(
+                "UPDATE items SET state = ?, attempts = MAX(0, attempts - 1), updated = ? "
+                "WHERE job_id = ? AND item_index = ? AND state = ?",
+                (PENDING, time.time(), job_id, index, IN_FLIGHT)
+            )
+
+    def release_solo(self, job_id, index, error):
+        """An item a packed response dropped or mangled goes back to be refined on its own; the attempt is not counted"""
+        with self.lock:
+            self.connection.execute(
+                "UPDATE items SET state = ?, solo = 1, error = ?, attempts = MAX(0, attempts - 1), updated = ? "
+                "WHERE job_id = ? AND item_index = ? AND state = ?",
+                (PENDING, error, time.time(), job_id, index, IN_FLIGHT)
+            )
+
+    def results(self, job_id):
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT item_index, prompt, state, result, error FROM items WHERE job_id = ? ORDER BY item_index",
+                (job_id,)
+            ).fetchall()
+        return [{"index": r[0], "prompt": r[1], "state": r[2], "result": r[3], "error": r[4]} for r in rows]
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+
+class BatchRunner:
+    """Drives a job through PromptRefinementWorker.refine until no pending items are left or stop() is called.
+
+    Pacing comes from the key manager's quota ledger: runners only claim an item when some
+    key has headroom, so a long job slows down to the quota instead of burning retries.
+    stop() lets in-flight items finish; cancel() also stops their refiners and leaves the items
+    in flight, for recover() to requeue on the next run.
+    """
+
+    def __init__(self, api_manager, store, job_id, concurrency=None, on_progress=None):
+        self.api_manager = api_manager
+        self.store = store
+        self.job_id = job_id
+        self.concurrency = concurrency or max(1, api_manager.get_total_keys())
+        self.on_progress = on_progress
+        self.stop_event = threading.Event()
+        self.cancelled = False
+        # Refiners currently inside refine(), so cancel() can stop them
+        self.running = set()
+        self.pack_size = 1
+        self.stats_lock = threading.Lock()
+        self.stats = {"packed_requests": 0, "packed_items": 0, "split_items": 0, "refine_calls": 0, "accepted": 0}
+
+    def stop(self):
+        self.stop_event.set()
+
+    def cancel(self):
+        with self.stats_lock:
+            self.cancelled = True
+            for refiner in self.running:
+                refiner.stop()
+        self.stop()
+
+    def run_refiner(self, refiner):
+        with self.stats_lock:
+            if self.cancelled:
+                refiner.stop()
+            self.running.add(refiner)
+        try:
+            return refiner.refine()
+        finally:
+            with self.stats_lock:
+                self.running.discard(refiner)
+
+    def wait_for_quota(self, projected_tokens):
+        while not self.stop_event.is_set():
+            wait = self.api_manager.quota_wait_seconds(projected_tokens, priority="batch")
+            if wait <= 0:
+                return True
+            self.stop_event.wait(min(wait, 5.0))
+        return False
+
+    def process(self, item, settings):
+        from .refiner import PromptRefiner, RefinementError
+        from .api_manager import QuotaExhaustedError
+        refiner = PromptRefiner(
+            self.api_manager, item["prompt"], settings["language"], item["context"] or settings["context"],
+            settings["scope"], settings["detail"], settings["type"], output_profile=settings["format"],
+            compress_tokens=settings.get("compress", 0), priority="batch"
+        )
+        try:
+            result = self.run_refiner(refiner)
+        except RefinementError as e:
+            if self.cancelled:
+                return
+            if isinstance(e.__cause__, QuotaExhaustedError):
+                self.store.release(self.job_id, item["index"])
+            else:
+                self.store.fail(self.job_id, item["index"], str(e))
+            return
+        except Exception as e:
+            self.store.fail(self.job_id, item["index"], f"Unexpected error: {str(e)}")
+            return
+        self.count(refine_calls=refiner.calls, accepted=1)
+        self.store.complete(self.job_id, item["index"], result)
+
+    def count(self, **increments):
+        with self.stats_lock:
+            for name, value in increments.items():
+                self.stats[name] += value
+
+    def process_pack(self, items, settings):
+        from .packing import PackedRefinement
+        from .refiner import RefinementError
+        from .api_manager import QuotaExhaustedError
+        packed = PackedRefinement(
+            self.api_manager, [(item["index"], item["prompt"]) for item in items], settings["language"], settings["context"],
+            settings["scope"], settings["detail"], settings["type"], output_profile=settings["format"],
+            compress_tokens=settings.get("compress", 0)
+        )
+        self.count(packed_requests=1, packed_items=len(items))
+        try:
+            results, failures = self.run_refiner(packed)
+        except RefinementError as e:
+            if self.cancelled:
+                return
+            for item in items:
+                if isinstance(e.__cause__, QuotaExhaustedError):
+                    self.store.release(self.job_id, item["index"])
+                else:
+                    self.store.fail(self.job_id, item["index"], str(e))
+            return
+        except Exception as e:
+            for item in items:
+                self.store.fail(self.job_id, item["index"], f"Unexpected error: {str(e)}")
+            return
+        for item in items:
+            key = str(item["index"])
+            if key in results:
+                self.store.complete(self.job_id, item["index"], results[key])
+            else:
+                self.store.release_solo(self.job_id, item["index"], failures.get(key, "Missing from packed response"))
+        if failures:
+            self.count(split_items=len(failures))
+            print(f"Job {self.job_id}: {len(failures)} of {len(items)} packed items will be retried on their own")
+
+    def claim(self):
+        if self.pack_size > 1:
+            items = self.store.claim_pack(self.job_id, self.pack_size)
+            if items:
+                return items
+        item = self.store.claim_next(self.job_id)
+        return [item] if item else []
+
+    def work(self, settings):
+        while not self.stop_event.is_set():
+            if not self.wait_for_quota(0):
+                return
+            items = self.claim()
+            if not items:
+                return
+            if self.stop_event.is_set():
+                for item in items:
+                    self.store.release(self.job_id, item["index"])
+                return
+            if len(items) > 1:
+                self.process_pack(items, settings)
+            else:
+                self.process(items[0], settings)
+            if self.on_progress:
+                self.on_progress(self.store.progress(self.job_id))
+
+    def effective_pack_size(self, settings):
+        requested = int(settings.get("pack_size", 1) or 1)
+        if requested <= 1:
+            return 1
+        from .packing import pack_capacity
+        from .output_budget import load_output_budget, output_token_limit
+        item_limit = output_token_limit(load_output_budget(self.api_manager.base_dir), settings["detail"], settings["type"],
+                                        settings.get("compress", 0))
+        return pack_capacity(item_limit, requested)
+
+    def run(self):
+        settings = dict(DEFAULT_JOB_SETTINGS)
+        settings.update(self.store.job(self.job_id)["settings"])
+        self.pack_size = self.effective_pack_size(settings)
+        recovered = self.store.recover(self.job_id)
+        if recovered:
+            print(f"Job {self.job_id}: {recovered} interrupted items will be retried")
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="promanis-batch") as executor:
+            futures = [executor.submit(self.work, settings) for _ in range(self.concurrency)]
+            try:
+                for future in futures:
+                    future.result()
+            except BaseException:
+                # Ctrl+C or a crash: let in-flight items finish and checkpoint, claim nothing new
+                self.stop()
+                raise
+        return self.store.progress(self.job_id)
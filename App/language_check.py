@@ -0,0 +1,106 @@
+import re
+import math
+from collections import Counter
+
+WORD = re.compile(r"[a-z]+")
+STOPWORDS = {
+    "English": {"the", "and", "of", "to", "a", "in", "is", "for", "with", "that", "on", "be", "as", "are", "this",
+                "it", "your", "an", "by", "or", "from", "should", "each", "will", "you", "at", "what", "how"},
+    "Bahasa Indonesia": {"yang", "dan", "di", "ke", "dari", "untuk", "dengan", "ini", "itu", "pada", "adalah", "dalam",
+                         "tidak", "akan", "atau", "juga", "anda", "setiap", "oleh", "sebagai", "harus", "agar", "bisa",
+                         "secara", "tentang", "saya", "kamu"},
+}
+
+# Most frequent character trigrams ("_" marks a word edge) in a few hundred words of refined prompts
+# per language, most frequent first. Scores assume Zipf-distributed trigram frequencies over these ranks.
+TRIGRAM_PROFILES = {
+    "English": (
+    "_th the he_ _a_ _an nd_ and ing _co ng_ er_ on_ _ex ed_ _wi st_ th_ exp _sh ion _re _in _to at_ le_ _of of_ _fo "
+    "sho tio _st pla es_ _pr for use wit ith al_ ent an_ _be ts_ hat _fi ver ect in_ re_ to_ tha ry_ hou lan _ma est "
+    "res ly_ xpe eri _wh ain te_ rea ate ic_ ted pro con ut_ _li com ple out or_ nt_ den ow_ one ne_ ll_ _en xpl ns_ "
+    "ead ge_ int _ne eve ort rt_ mpl _le igh is_ cti ter _su se_ en_ _ho her be_ are per nce _so war who ho_ _cl lea "
+    "ear ers rs_ ke_ ite ds_ _ca cal _ea nts as_ ble ass gra _bu _us oul uld ld_ ude de_ hor ati pec _de _pl ial _wa "
+    "ty_ _qu ang str ist _mo oun ill ous _he ere rst _is ons eng lis ien enc gin ine lai ngs gs_ ner ali _wr wri rit "
+    "_sc tes age eac ach ch_ _as eat mat ssu sum der _ha lib ibr bra rar ary inc nat ep_ omp exa xam cte _ou ess _hi "
+    "olo _ab abo bou nth ove nin ria act ity mai _di _gr et_ all _wo _sm sto ton din ran _on ks_ fin how nte sta hei "
+    "eir ir_ fir irs _ev ery _te ica _po mon ont ffe ake wil _we cau aus ize ze_ ure ngl gli ish sh_ _yo you _ar sof "
+    "oft nee thi cle nne tho hon scr cri ile _av era ume col olu rin nea tly tte _ta tab abl me_ ade ogr ram min has "
+    "sed _pa nda ore ans nsw swe wer ncl clu lud ana ste ode amp cre tai ail les son"
+    ),
+    "Bahasa Indonesia": (
+    "an_ ang ng_ kan _pe _ya _se _da yan _me ah_ eng _ke nga dan _te men ela ngk gan ing ter ran per ri_ _di lah gka "
+    "emb aka ala aha at_ ama _de pem nya ya_ ara is_ _ba asa _be den _bu ap_ eri na_ lam ada las ung ata ari uk_ pen "
+    "_ma jel as_ mba ntu har _re ana tan _ti _in kat ber da_ mem eti _ha tuk ngg nda uka ban dal bah una man emu bua "
+    "_ra ta_ set iap ka_ ema mah ar_ gun aru _un unt ren ma_ _ak ert bun elu _ja am_ sa_ _ka ora sin nak ak_ erp uat "
+    "dar tia _ko ena _ta bel _su si_ _si _le kel enc nca han aan rta ita seb ut_ apa eba tin ga_ _pr _tu uli lis awa "
+    "has ind esi sia ia_ amp enj nje ask ska tu_ _je pad ula un_ _an ent rap ami sar ggu ust tak _pa pan us_ lan can "
+    "aja tas buk tam sed ik_ ser ika _sa wa_ erb aik ers any ila bag pro dak tul sel uh_ jaw wab aba seo eor ur_ rpe "
+    "kep epa la_ bac aca ca_ itu tun asi tab pi_ sud uda ham mi_ das ram eta tap pus sta and rus san ont lua uar laj "
+    "jar rin ene ten nta _fo osi sis ini ni_ aku uan gia mbu uta di_ akh khi hir _gu erh rha mat ist sti ebu esa nan "
+    "tah mas but abu _na _ru rum uma _ce cer rba bat gar udu bar sla end muk ekn kny ket _mi ngi gin dap tek ink nka "
+    "_ju il_ ai_ al_ tid ida rek ian ruh _ad era ses esu atu mul atl tla hon ngh rat"
+    ),
+}
+# Fewer trigrams than this and the text is too short to call
+MIN_TRIGRAMS = 20
+# Average log-likelihood margin per trigram needed before a text counts as another language
+MIN_MARGIN = 0.15
+
+_models = {}
+
+
+def language_purity(text, language):
+    """Share of stopword hits that belong to the target language (None when the text has none)"""
+    counts = {name: 0 for name in STOPWORDS}
+    for word in WORD.findall(text.lower()):
+        for name, words in STOPWORDS.items():
+            if word in words:
+                counts[name] += 1
+    total = sum(counts.values())
+    if not total:
+        return None
+    return counts.get(language, 0) / total
+
+
+def trigrams(text):
+    counts = Counter()
+    for word in WORD.findall(text.lower()):
+        padded = f"_{word}_"
+        for index in range(len(padded) - 2):
+            counts[padded[index:index + 3]] += 1
+    return counts
+
+
+def models():
+    """Log-probability per trigram and for unseen trigrams, built once from the ranked profiles"""
+    if not _models:
+        for language, profile in TRIGRAM_PROFILES.items():
+            ranked = profile.split()
+            norm = sum(1.0 / (rank + 1) for rank in range(len(ranked) * 2))
+            weights = {gram: math.log(1.0 / ((rank + 1) * norm)) for rank, gram in enumerate(ranked)}
+            _models[language] = (weights, math.log(1.0 / (len(ranked) * 2 * norm)))
+    return _models
+
+
+def identify_language(text):
+    """(language, margin): the best-scoring profile and its per-trigram lead over the runner-up.
+
+    Returns (None, 0.0) when the text has too few letters to tell.
+    """
+    counts = trigrams(text)
+    total = sum(counts.values())
+    if total < MIN_TRIGRAMS:
+        return None, 0.0
+    scores = []
+    for language, (weights, unseen) in models().items():
+        scores.append((sum(count * weights.get(gram, unseen) for gram, count in counts.items()) / total, language))
+    scores.sort(reverse=True)
+    return scores[0][1], scores[0][0] - scores[1][0]
+
+
+def matches_language(text, language, min_margin=MIN_MARGIN):
+    """False only on a clear mismatch; short text and languages without a profile always pass"""
+    if language not in TRIGRAM_PROFILES:
+        return True
+    detected, margin = identify_language(text)
+    return detected is None or detected == language or margin < min_margin
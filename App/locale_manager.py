@@ -0,0 +1,114 @@
+import json
+import threading
+from pathlib import Path
+
+LOCALES_DIR = Path(__file__).parent / "locales"
+DEFAULT_LANGUAGE = "English"
+OPTION_CATEGORIES = ("scope", "type", "detail", "format")
+
+
+class Locale:
+    """One language catalog: UI strings, option labels and compiled prompt fragments.
+
+    Missing UI strings and prompt fragments fall back to the English catalog, so a
+    new target language only needs a JSON file with a name (and ideally option labels).
+    """
+
+    def __init__(self, data, fallback=None):
+        self.code = data.get("code", "")
+        self.name = data.get("name", self.code)
+        self.order = data.get("order", 100)
+        self.fallback = fallback
+        self.ui = dict(fallback.ui) if fallback else {}
+        self.ui.update(data.get("ui", {}))
+        self.options = {}
+        self.reverse_options = {}
+        for category in OPTION_CATEGORIES:
+            labels = dict(fallback.options.get(category, {})) if fallback else {}
+            labels.update(data.get("options", {}).get(category, {}))
+            self.options[category] = labels
+            self.reverse_options[category] = {label: canonical for canonical, label in labels.items()}
+            # Canonical (English) values are accepted in every language
+            for canonical in labels:
+                self.reverse_options[category].setdefault(canonical, canonical)
+        self.prompt = self.compile_prompt_fragments(data.get("prompt", {}))
+
+    def compile_prompt_fragments(self, own_fragments):
+        templates = dict(self.fallback.prompt_templates) if self.fallback else {}
+        templates.update(own_fragments)
+        self.prompt_templates = templates
+        return {key: template.format(language=self.name) for key, template in templates.items()}
+
+    def text(self, key, **kwargs):
+        value = self.ui.get(key, key)
+        return value.format(**kwargs) if kwargs else value
+
+    def option_labels(self, category):
+        return list(self.options.get(category, {}).values())
+
+    def canonical_values(self, category):
+        return list(self.options.get(category, {}).keys())
+
+    def accepts(self, value, category):
+        """A canonical value or one of this language's labels for it"""
+        return value in self.reverse_options.get(category, {})
+
+    def to_canonical(self, value, category):
+        return self.reverse_options.get(category, {}).get(value, value)
+
+    def fragment(self, key):
+        return self.prompt.get(key, "")
+
+
+class LocaleCatalog:
+    """Lazily loads locale files from App/locales; each language is parsed and compiled at most once"""
+
+    def __init__(self, locales_dir=None):
+        self.locales_dir = Path(locales_dir) if locales_dir else LOCALES_DIR
+        self.raw = None
+        self.locales = {}
+        self.lock = threading.Lock()
+
+    def load_index(self):
+        if self.raw is not None:
+            return
+        raw = {}
+        for path in sorted(self.locales_dir.glob("*.json")):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                data.setdefault("code", path.stem)
+                raw[data.get("name", path.stem)] = data
+            except Exception as e:
+                print(f"Warning: Failed to load locale {path.name}: {str(e)}")
+        self.raw = raw
+
+    def available_languages(self):
+        with self.lock:
+            self.load_index()
+            return sorted(self.raw, key=lambda name: (self.raw[name].get("order", 100), name))
+
+    def get(self, language):
+        with self.lock:
+            return self.get_locked(language)
+
+    def get_locked(self, language):
+        locale = self.locales.get(language)
+        if locale is not None:
+            return locale
+        self.load_index()
+        if language not in self.raw:
+            language = DEFAULT_LANGUAGE
+            if language in self.locales:
+                return self.locales[language]
+        fallback = None if language == DEFAULT_LANGUAGE else self.get_locked(DEFAULT_LANGUAGE)
+        locale = Locale(self.raw.get(language, {"code": "en", "name": language}), fallback)
+        self.locales[language] = locale
+        return locale
+
+
+catalog = LocaleCatalog()
+
+
+def get_locale(language):
+    return catalog.get(language)
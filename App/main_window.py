@@ -1,15 +1,22 @@
 from PySide6.QtWidgets import (QMainWindow, QVBoxLayout, QHBoxLayout, QWidget, 
-                               QTextEdit, QPushButton, QProgressBar, QLabel, QMessageBox, QComboBox, QSpacerItem, QSizePolicy, QFrame, QGroupBox, QGridLayout)
+                               QTextEdit, QPushButton, QProgressBar, QLabel, QMessageBox, QComboBox, QSpacerItem, QSizePolicy, QFrame, QGroupBox, QGridLayout, QCheckBox, QTabBar, QToolButton)
+from PySide6.QtWidgets import QFileDialog
 from PySide6.QtCore import Qt, QUrl
-from PySide6.QtGui import QFont, QGuiApplication, QDesktopServices, QIcon
-import qtawesome as qta
+from PySide6.QtGui import QFont, QGuiApplication, QDesktopServices, QIcon, QKeySequence, QShortcut
 import os
-from .api_manager import APIKeyManager
-from .gemini_worker import PromptRefinementWorker
-from .settings_dialog import SettingsDialog
-import re
 import json
-from pathlib import Path
+import threading
+import time
+from .api_manager import APIKeyManager
+from .locale_manager import get_locale, catalog, DEFAULT_LANGUAGE
+from .attachment_bar import AttachmentBar, FileDropFilter
+from .context_files import SUPPORTED_EXTENSIONS
+from .config_store import get_config_store
+from .speculative import SpeculativeRefiner
+from .sessions import RefinementSession, SessionStore
+from .output_budget import COMPRESS_CHOICES
+from .context_pipeline import estimate_tokens
+from .incremental import incremental_base, load_incremental_settings
 
 DEFAULT_AI_PLATFORMS = {
     "ChatGPT (OpenAI)": "https://chat.openai.com/",
@@ -32,31 +39,125 @@ DEFAULT_AI_PLATFORMS = {
 }
 
 def load_ai_platforms_from_config(base_dir):
-    config_path = Path(base_dir) / "App" / "config" / "config.json"
-    try:
-        with open(config_path, "r", encoding="utf-8") as f:
-            config = json.load(f)
-            ai_platforms = config.get("ai_platforms", None)
-            if isinstance(ai_platforms, dict) and ai_platforms:
-                return ai_platforms
-    except Exception:
-        pass
+    ai_platforms = get_config_store(base_dir).get("ai_platforms")
+    if isinstance(ai_platforms, dict) and ai_platforms:
+        return ai_platforms
     return DEFAULT_AI_PLATFORMS
 
+# Not needed for the first frame, but for the first refinement and the settings dialog
+PRELOAD_MODULES = ("App.gemini_worker", "google.genai", "App.settings_dialog")
+
+
+def preload_modules(profiler=None):
+    for module_name in PRELOAD_MODULES:
+        started = time.perf_counter()
+        try:
+            __import__(module_name)
+        except Exception as e:
+            print(f"Warning: import of {module_name} failed: {str(e)}")
+            continue
+        if profiler:
+            profiler.record_stage(f"import {module_name}", started)
+    if profiler:
+        profiler.mark("sdk_ready")
+
+
+def preload_background_modules(profiler=None):
+    """Import the Gemini SDK and the settings UI off the GUI thread so the first click does not pay for it"""
+    thread = threading.Thread(target=preload_modules, args=(profiler,), name="promanis-preload", daemon=True)
+    thread.start()
+    return thread
+
+
 class PromanisMainWindow(QMainWindow):
-    def __init__(self, base_dir):
+    def __init__(self, base_dir, deferred_startup=False, profiler=None):
         super().__init__()
         self.base_dir = base_dir
+        self.deferred_startup = deferred_startup
+        self.profiler = profiler
+        self.pending_icons = []
+        self.icons_loaded = False
+        self.platforms_loaded = False
+        self.startup_finished = False
         # Set wand.ico as window icon for all GUI (including taskbar)
         icon_path = os.path.join(self.base_dir, "App", "wand.ico")
         if os.path.exists(icon_path):
             self.setWindowIcon(QIcon(icon_path))
         else:
-            self.setWindowIcon(qta.icon('fa5s.magic'))
+            self.set_deferred_icon(self, 'fa5s.magic', window_icon=True)
         self.api_manager = APIKeyManager(base_dir)
-        self.worker = None
-        self.ai_platforms = load_ai_platforms_from_config(self.base_dir)
+        self.session_store = SessionStore(base_dir)
+        self.incremental_settings = load_incremental_settings(base_dir)
+        self.sessions = []
+        self.active_session = None
+        self.applying_session = False
+        self.ai_platforms = {}
+        self.locale = get_locale(DEFAULT_LANGUAGE)
+        self.applied_texts = {}
+        self.applied_options = {}
+        self.speculative = SpeculativeRefiner(self.api_manager, self)
         self.init_ui()
+        self.connect_speculation()
+        self.restore_sessions()
+        self.diagnostics_shortcut = QShortcut(QKeySequence("Ctrl+Shift+D"), self)
+        self.diagnostics_shortcut.activated.connect(self.show_diagnostics)
+        if not self.deferred_startup:
+            self.finish_startup()
+
+    def set_deferred_icon(self, widget, name, color=None, size=None, window_icon=False):
+        """Queue a QtAwesome icon; icon fonts are only loaded once the window has been painted in deferred mode"""
+        entry = (widget, name, color, size, window_icon)
+        if self.icons_loaded:
+            self.apply_icon(entry)
+        else:
+            self.pending_icons.append(entry)
+
+    def apply_icon(self, entry):
+        import qtawesome as qta
+        widget, name, color, size, window_icon = entry
+        icon = qta.icon(name, color=color) if color else qta.icon(name)
+        if window_icon:
+            widget.setWindowIcon(icon)
+        elif size:
+            widget.setPixmap(icon.pixmap(size, size))
+        else:
+            widget.setIcon(icon)
+
+    def load_icons(self):
+        if self.icons_loaded:
+            return
+        started = time.perf_counter()
+        for entry in self.pending_icons:
+            self.apply_icon(entry)
+        self.pending_icons = []
+        self.icons_loaded = True
+        if self.profiler:
+            self.profiler.record_stage("icons", started)
+
+    def load_platforms(self):
+        if self.platforms_loaded:
+            return
+        started = time.perf_counter()
+        self.ai_platforms = load_ai_platforms_from_config(self.base_dir)
+        self.platform_combo.clear()
+        self.platform_combo.addItems(list(self.ai_platforms.keys()))
+        self.platform_combo.setCurrentText("ChatGPT (OpenAI)")
+        self.platforms_loaded = True
+        if self.profiler:
+            self.profiler.record_stage("platforms", started)
+
+    def finish_startup(self):
+        """Build everything that is not needed for the first frame"""
+        if self.startup_finished:
+            return
+        self.startup_finished = True
+        self.load_icons()
+        self.load_platforms()
+        if self.deferred_startup:
+            preload_background_modules(self.profiler)
+        else:
+            # Eager mode keeps the old behaviour for comparison: everything loads on the GUI thread
+            preload_modules(self.profiler)
     
     def init_ui(self):
         self.setWindowTitle("Promanis - AI Prompt Refiner")
@@ -74,7 +175,7 @@ class PromanisMainWindow(QMainWindow):
         if os.path.exists(icon_path):
             header_icon.setPixmap(QIcon(icon_path).pixmap(28, 28))
         else:
-            header_icon.setPixmap(qta.icon('fa6s.wand-sparkles', color='#1976D2').pixmap(28, 28))
+            self.set_deferred_icon(header_icon, 'fa6s.wand-sparkles', color='#1976D2', size=28)
         header_layout.addWidget(header_icon)
         self.header_label = QLabel("Promanis - AI Prompt Refiner")
         header_font = QFont()
@@ -117,13 +218,15 @@ class PromanisMainWindow(QMainWindow):
         lang_layout = QHBoxLayout(self.lang_group)
         lang_layout.setAlignment(Qt.AlignTop)
         lang_icon = QLabel()
-        lang_icon.setPixmap(qta.icon('fa6s.language', color='#1976D2').pixmap(18, 18))
+        self.set_deferred_icon(lang_icon, 'fa6s.language', color='#1976D2', size=18)
         lang_layout.addWidget(lang_icon)
         self.language_combo = QComboBox()
-        self.language_combo.addItems(["English", "Bahasa Indonesia"])
-        self.language_combo.setCurrentText("English")
+        self.language_combo.addItems(catalog.available_languages())
+        self.language_combo.setCurrentText(DEFAULT_LANGUAGE)
         self.language_combo.currentTextChanged.connect(self.on_language_changed)
         lang_layout.addWidget(self.language_combo)
+        self.bilingual_checkbox = QCheckBox("Both languages")
+        lang_layout.addWidget(self.bilingual_checkbox)
         ribbon_layout.addWidget(self.lang_group, alignment=Qt.AlignTop)
 
         self.scope_type_group = QGroupBox("Scope & Type")
@@ -131,34 +234,17 @@ class PromanisMainWindow(QMainWindow):
         scope_type_layout = QGridLayout(self.scope_type_group)
         scope_type_layout.setAlignment(Qt.AlignTop)
         scope_icon = QLabel()
-        scope_icon.setPixmap(qta.icon('fa6s.layer-group', color='#388E3C').pixmap(18, 18))
+        self.set_deferred_icon(scope_icon, 'fa6s.layer-group', color='#388E3C', size=18)
         scope_type_layout.addWidget(scope_icon, 0, 0, alignment=Qt.AlignTop)
         self.scope_combo = QComboBox()
-        self.scope_combo.addItems([
-            "General", "Programming", "Novel", "Science", "Math", "Education", "History", "Philosophy",
-            "Business", "Marketing", "Legal", "Medical", "Technical Writing", "Art", "Music", "Poetry",
-            "Social Media", "Blog", "News", "Productivity", "Personal", "Finance", "Travel", "Cooking",
-            "Gaming", "Interview", "Resume", "Email", "Presentation", "Research", "Psychology", "Self-help",
-            "Spirituality", "Parenting", "Fitness", "Health", "Fashion", "Beauty", "DIY", "Photography",
-            "Film", "Theater", "Comics", "Scriptwriting", "Journalism", "Advertising", "UX/UI", "Data Science",
-            "AI/ML", "Engineering", "Environment", "Politics", "Sports", "Other"
-        ])
+        self.scope_combo.addItems(self.locale.option_labels("scope"))
         self.scope_combo.setCurrentText("General")
         scope_type_layout.addWidget(self.scope_combo, 0, 1, alignment=Qt.AlignTop)
         type_icon = QLabel()
-        type_icon.setPixmap(qta.icon('fa6s.shapes', color='#F9A825').pixmap(18, 18))
+        self.set_deferred_icon(type_icon, 'fa6s.shapes', color='#F9A825', size=18)
         scope_type_layout.addWidget(type_icon, 1, 0, alignment=Qt.AlignTop)
         self.type_combo = QComboBox()
-        self.type_combo.addItems([
-            "Text Generation",
-            "Image Generation",
-            "Audio Generation",
-            "Video Generation",
-            "Video+Audio Generation",
-            "Novel",
-            "Explanation",
-            "Other"
-        ])
+        self.type_combo.addItems(self.locale.option_labels("type"))
         self.type_combo.setCurrentText("Text Generation")
         scope_type_layout.addWidget(self.type_combo, 1, 1, alignment=Qt.AlignTop)
         ribbon_layout.addWidget(self.scope_type_group, alignment=Qt.AlignTop)
@@ -169,12 +255,21 @@ class PromanisMainWindow(QMainWindow):
         detail_layout = QHBoxLayout(self.detail_group)
         detail_layout.setAlignment(Qt.AlignTop)
         detail_icon = QLabel()
-        detail_icon.setPixmap(qta.icon('fa6s.list', color='#D32F2F').pixmap(18, 18))
+        self.set_deferred_icon(detail_icon, 'fa6s.list', color='#D32F2F', size=18)
         detail_layout.addWidget(detail_icon)
         self.detail_combo = QComboBox()
-        self.detail_combo.addItems(["Simple", "Detailed", "Complex", "Template"])
+        self.detail_combo.addItems(self.locale.option_labels("detail"))
         self.detail_combo.setCurrentText("Detailed")
         detail_layout.addWidget(self.detail_combo)
+        self.format_combo = QComboBox()
+        self.format_combo.addItems(self.locale.option_labels("format"))
+        detail_layout.addWidget(self.format_combo)
+        self.compress_combo = QComboBox()
+        detail_layout.addWidget(self.compress_combo)
+        self.speculative_checkbox = QCheckBox("Pre-refine")
+        self.speculative_checkbox.setChecked(self.speculative.enabled)
+        self.speculative_checkbox.toggled.connect(self.on_speculative_toggled)
+        detail_layout.addWidget(self.speculative_checkbox)
         ribbon_layout.addWidget(self.detail_group, alignment=Qt.AlignTop)
 
         # Group 4: Platform
@@ -183,14 +278,12 @@ class PromanisMainWindow(QMainWindow):
         platform_layout = QHBoxLayout(self.platform_group)
         platform_layout.setAlignment(Qt.AlignTop)
         platform_icon = QLabel()
-        platform_icon.setPixmap(qta.icon('fa6s.robot', color='#8e24aa').pixmap(18, 18))
+        self.set_deferred_icon(platform_icon, 'fa6s.robot', color='#8e24aa', size=18)
         platform_layout.addWidget(platform_icon)
         self.platform_combo = QComboBox()
-        self.platform_combo.addItems(list(self.ai_platforms.keys()))
-        self.platform_combo.setCurrentText("ChatGPT (OpenAI)")
         platform_layout.addWidget(self.platform_combo)
         self.open_platform_button = QPushButton("Buka Platform")
-        self.open_platform_button.setIcon(qta.icon('fa6s.arrow-up-right-from-square', color='white'))
+        self.set_deferred_icon(self.open_platform_button, 'fa6s.arrow-up-right-from-square', color='white')
         self.open_platform_button.setStyleSheet("""
             QPushButton {
                 background-color: #8e24aa;
@@ -217,7 +310,7 @@ class PromanisMainWindow(QMainWindow):
         
         self.config_button = QPushButton()
         self.config_button.setText("Settings")
-        self.config_button.setIcon(qta.icon('fa6s.gear', color='white'))
+        self.set_deferred_icon(self.config_button, 'fa6s.gear', color='white')
         self.config_button.setStyleSheet("""
             QPushButton {
                 background-color: #6C757D;
@@ -232,10 +325,28 @@ class PromanisMainWindow(QMainWindow):
         """)
         self.config_button.clicked.connect(self.open_settings)
         actions_layout.addWidget(self.config_button)
+
+        self.batch_button = QPushButton()
+        self.batch_button.setText("Batch")
+        self.set_deferred_icon(self.batch_button, 'fa6s.layer-group', color='white')
+        self.batch_button.setStyleSheet("""
+            QPushButton {
+                background-color: #6F42C1;
+                border: none;
+                color: white;
+                padding: 6px 12px;
+                border-radius: 6px;
+            }
+            QPushButton:hover {
+                background-color: #59339D;
+            }
+        """)
+        self.batch_button.clicked.connect(self.open_batch_jobs)
+        actions_layout.addWidget(self.batch_button)
         
         self.run_button = QPushButton()
         self.run_button.setText("Refine Prompt")
-        self.run_button.setIcon(qta.icon('fa6s.wand-sparkles', color='white'))
+        self.set_deferred_icon(self.run_button, 'fa6s.wand-sparkles', color='white')
         self.run_button.setStyleSheet("""
             QPushButton {
                 background-color: #4CAF50;
@@ -257,7 +368,7 @@ class PromanisMainWindow(QMainWindow):
         
         self.clear_button = QPushButton()
         self.clear_button.setText("Clear All")
-        self.clear_button.setIcon(qta.icon('fa6s.eraser', color='white'))
+        self.set_deferred_icon(self.clear_button, 'fa6s.eraser', color='white')
         self.clear_button.setStyleSheet("""
             QPushButton {
                 background-color: #f44336;
@@ -275,7 +386,7 @@ class PromanisMainWindow(QMainWindow):
 
         self.copy_button = QPushButton()
         self.copy_button.setText("Copy Refined Prompt")
-        self.copy_button.setIcon(qta.icon('fa6s.copy', color='white'))
+        self.set_deferred_icon(self.copy_button, 'fa6s.copy', color='white')
         self.copy_button.setStyleSheet("""
             QPushButton {
                 background-color: #2196F3;
@@ -293,7 +404,7 @@ class PromanisMainWindow(QMainWindow):
 
         self.wa_button = QPushButton()
         self.wa_button.setText("WA Group")
-        self.wa_button.setIcon(qta.icon('fa6b.whatsapp', color='white'))
+        self.set_deferred_icon(self.wa_button, 'fa6b.whatsapp', color='white')
         self.wa_button.setStyleSheet("""
             QPushButton {
                 background-color: #25D366;
@@ -315,13 +426,32 @@ class PromanisMainWindow(QMainWindow):
         self.progress_bar.setVisible(False)
         main_layout.addWidget(self.progress_bar)
 
+        # --- Session tabs: each tab keeps its own input, settings and output ---
+        tabs_layout = QHBoxLayout()
+        self.tab_bar = QTabBar()
+        self.tab_bar.setTabsClosable(True)
+        self.tab_bar.setMovable(True)
+        self.tab_bar.setExpanding(False)
+        self.tab_bar.setDocumentMode(True)
+        self.tab_bar.currentChanged.connect(self.on_tab_changed)
+        self.tab_bar.tabCloseRequested.connect(self.close_session_tab)
+        self.tab_bar.tabMoved.connect(self.on_tab_moved)
+        tabs_layout.addWidget(self.tab_bar)
+        self.new_tab_button = QToolButton()
+        self.new_tab_button.setText("+")
+        self.new_tab_button.setAutoRaise(True)
+        self.new_tab_button.clicked.connect(self.new_session_tab)
+        tabs_layout.addWidget(self.new_tab_button)
+        tabs_layout.addStretch()
+        main_layout.addLayout(tabs_layout)
+
         content_layout = QHBoxLayout()
         
         left_layout = QVBoxLayout()
 
         input_label_layout = QHBoxLayout()
         input_icon = QLabel()
-        input_icon.setPixmap(qta.icon('fa6s.pen-to-square', color='#1976D2').pixmap(20, 20))
+        self.set_deferred_icon(input_icon, 'fa6s.pen-to-square', color='#1976D2', size=20)
         input_label_layout.addWidget(input_icon)
         self.input_label = QLabel("Raw Prompt (Before):")
         self.input_label.setFont(QFont("Arial", 12, QFont.Bold))
@@ -345,15 +475,23 @@ class PromanisMainWindow(QMainWindow):
 
         context_label_layout = QHBoxLayout()
         context_icon = QLabel()
-        context_icon.setPixmap(qta.icon('fa6s.circle-info', color='#388E3C').pixmap(20, 20))
+        self.set_deferred_icon(context_icon, 'fa6s.circle-info', color='#388E3C', size=20)
         context_label_layout.addWidget(context_icon)
         self.context_label = QLabel("Context (Optional):")
         self.context_label.setFont(QFont("Arial", 10, QFont.Bold))
         self.context_label.setAlignment(Qt.AlignLeft | Qt.AlignVCenter)
         context_label_layout.addWidget(self.context_label)
         context_label_layout.addStretch()
+        self.attach_button = QPushButton("Attach File")
+        self.set_deferred_icon(self.attach_button, 'fa6s.paperclip', color='#388E3C')
+        self.attach_button.clicked.connect(self.choose_attachments)
+        context_label_layout.addWidget(self.attach_button)
         left_layout.addLayout(context_label_layout)
 
+        self.attachment_bar = AttachmentBar()
+        self.attachment_bar.rejected.connect(self.on_attachment_rejected)
+        left_layout.addWidget(self.attachment_bar)
+
         self.context_text = QTextEdit()
         self.context_text.setPlaceholderText("Add any context or background information here (optional)...")
         self.context_text.setMinimumHeight(80)
@@ -366,6 +504,9 @@ class PromanisMainWindow(QMainWindow):
             }
         """)
         left_layout.addWidget(self.context_text)
+        # Dropped files become attachment chips instead of being pasted into the editor
+        self.file_drop_filter = FileDropFilter(self.attachment_bar, self)
+        self.context_text.viewport().installEventFilter(self.file_drop_filter)
         
         content_layout.addLayout(left_layout)
         
@@ -373,13 +514,16 @@ class PromanisMainWindow(QMainWindow):
 
         output_label_layout = QHBoxLayout()
         output_icon = QLabel()
-        output_icon.setPixmap(qta.icon('fa6s.wand-sparkles', color='#F9A825').pixmap(20, 20))
+        self.set_deferred_icon(output_icon, 'fa6s.wand-sparkles', color='#F9A825', size=20)
         output_label_layout.addWidget(output_icon)
         self.output_label = QLabel("Refined Prompt (After):")
         self.output_label.setFont(QFont("Arial", 12, QFont.Bold))
         self.output_label.setAlignment(Qt.AlignLeft | Qt.AlignVCenter)
         output_label_layout.addWidget(self.output_label)
         output_label_layout.addStretch()
+        self.output_tokens_label = QLabel()
+        self.output_tokens_label.setStyleSheet("color: #666;")
+        output_label_layout.addWidget(self.output_tokens_label)
         right_output_layout.addLayout(output_label_layout)
 
         self.output_text = QTextEdit()
@@ -388,13 +532,31 @@ class PromanisMainWindow(QMainWindow):
         self.output_text.setReadOnly(True)
         output_font = QFont("Arial", 14)
         self.output_text.setFont(output_font)
-        self.output_text.setStyleSheet("""
+        output_style = """
             QTextEdit {
                 padding: 16px;
                 font-size: 12pt;
             }
-        """)
-        right_output_layout.addWidget(self.output_text)
+        """
+        self.output_text.setStyleSheet(output_style)
+        self.output_text.textChanged.connect(self.update_output_tokens)
+        # Bilingual results: the selected language on the left, the other one beside it
+        self.secondary_output_text = QTextEdit()
+        self.secondary_output_text.setReadOnly(True)
+        self.secondary_output_text.setFont(output_font)
+        self.secondary_output_text.setStyleSheet(output_style)
+        self.output_language_labels = [QLabel(), QLabel()]
+        self.output_languages = []
+        output_panes = QHBoxLayout()
+        for label, text_edit in zip(self.output_language_labels, (self.output_text, self.secondary_output_text)):
+            pane = QVBoxLayout()
+            label.setStyleSheet("color: #666; font-weight: bold;")
+            label.setVisible(False)
+            pane.addWidget(label)
+            pane.addWidget(text_edit)
+            output_panes.addLayout(pane)
+        self.secondary_output_text.setVisible(False)
+        right_output_layout.addLayout(output_panes)
         content_layout.addLayout(right_output_layout)
         
         main_layout.addLayout(content_layout)
@@ -404,279 +566,456 @@ class PromanisMainWindow(QMainWindow):
         main_layout.addWidget(self.status_label)
         
         # Set initial language
-        self.on_language_changed("English")
+        self.on_language_changed(DEFAULT_LANGUAGE)
     
     def open_selected_platform(self):
         platform_name = self.platform_combo.currentText()
         url = self.ai_platforms.get(platform_name, "")
         prompt_text = self.output_text.toPlainText().strip()
         if not prompt_text:
-            QMessageBox.warning(self, "Warning", "No refined prompt to copy and open.")
+            QMessageBox.warning(self, self.tr_text("warning_title"), self.tr_text("warn_nothing_to_open"))
             return
         QGuiApplication.clipboard().setText(prompt_text)
         if url:
             QDesktopServices.openUrl(QUrl(url))
-            self.status_label.setText(f"Prompt copied & opening {platform_name}...")
+            self.status_label.setText(self.tr_text("status_opening_platform", platform=platform_name))
         else:
-            self.status_label.setText("Prompt copied to clipboard. (No URL for this platform)")
+            self.status_label.setText(self.tr_text("status_copied_no_url"))
 
     def open_settings(self):
+        from .settings_dialog import SettingsDialog
         dialog = SettingsDialog(self.api_manager, self, ai_platforms=self.ai_platforms)
         if dialog.exec():
             try:
                 self.api_manager.load_api_keys()
                 # Reload AI platforms in case user changed them
-                self.ai_platforms = load_ai_platforms_from_config(self.base_dir)
-                self.platform_combo.clear()
-                self.platform_combo.addItems(list(self.ai_platforms.keys()))
-                self.platform_combo.setCurrentText("ChatGPT (OpenAI)")
-                current_language = self.language_combo.currentText()
-                if current_language == "Bahasa Indonesia":
-                    self.status_label.setText("Pengaturan berhasil disimpan!")
-                else:
-                    self.status_label.setText("Settings saved successfully!")
+                self.platforms_loaded = False
+                self.load_platforms()
+                self.status_label.setText(self.tr_text("status_settings_saved"))
             except Exception as e:
-                current_language = self.language_combo.currentText()
-                if current_language == "Bahasa Indonesia":
-                    QMessageBox.critical(self, "Error", f"Gagal memuat ulang API keys: {str(e)}")
-                else:
-                    QMessageBox.critical(self, "Error", f"Failed to reload API keys: {str(e)}")
-    
+                QMessageBox.critical(self, self.tr_text("error_title"), self.tr_text("error_reload_keys", error=str(e)))
+
+    def open_batch_jobs(self):
+        from .batch_dialog import BatchDialog
+        settings = self.current_settings()
+        # Batch jobs store one text per item, so they always run in the selected language only
+        settings.pop("bilingual")
+        dialog = BatchDialog(self.api_manager, self, settings=settings, language=self.language_combo.currentText())
+        dialog.exec()
+
+    def choose_attachments(self):
+        patterns = " ".join(f"*{extension}" for extension in sorted(SUPPORTED_EXTENSIONS))
+        paths, _ = QFileDialog.getOpenFileNames(self, self.tr_text("attach_dialog_title"), "", f"{self.tr_text('attach_filter')} ({patterns})")
+        if paths:
+            self.attachment_bar.add_paths(paths)
+
+    def on_attachment_rejected(self, path):
+        self.status_label.setText(self.tr_text("attach_rejected", name=os.path.basename(path)))
+
+    def tr_text(self, key, **kwargs):
+        return self.locale.text(key, **kwargs)
+
+    def text_bindings(self):
+        """Widget setters keyed by catalog string id, used to diff language switches"""
+        return {
+            "window_title": [self.setWindowTitle, self.header_label.setText],
+            "description": [self.desc_label.setText],
+            "group_language": [self.lang_group.setTitle],
+            "group_scope_type": [self.scope_type_group.setTitle],
+            "group_detail": [self.detail_group.setTitle],
+            "group_platform": [self.platform_group.setTitle],
+            "input_label": [self.input_label.setText],
+            "output_label": [self.output_label.setText],
+            "input_placeholder": [self.input_text.setPlaceholderText],
+            "output_placeholder": [self.output_text.setPlaceholderText],
+            "context_label": [self.context_label.setText],
+            "context_placeholder": [self.context_text.setPlaceholderText],
+            "run_button": [self.run_button.setText],
+            "clear_button": [self.clear_button.setText],
+            "copy_button": [self.copy_button.setText],
+            "settings_button": [self.config_button.setText],
+            "batch_button": [self.batch_button.setText],
+            "wa_button": [self.wa_button.setText],
+            "open_platform_button": [self.open_platform_button.setText],
+            "attach_button": [self.attach_button.setText],
+            "speculative_checkbox": [self.speculative_checkbox.setText],
+            "bilingual_checkbox": [self.bilingual_checkbox.setText],
+            "bilingual_tooltip": [self.bilingual_checkbox.setToolTip],
+            "speculative_tooltip": [self.speculative_checkbox.setToolTip],
+            "new_session_tooltip": [self.new_tab_button.setToolTip],
+            "status_ready": [self.status_label.setText],
+            "compress_tooltip": [self.compress_combo.setToolTip],
+        }
+
+    def option_combos(self):
+        return {"scope": self.scope_combo, "type": self.type_combo, "detail": self.detail_combo, "format": self.format_combo}
+
     def on_language_changed(self, language):
-        # Update group titles directly for both languages
-        if language == "Bahasa Indonesia":
-            self.setWindowTitle("Promanis - Penyempurna Prompt AI")
-            self.header_label.setText("Promanis - Penyempurna Prompt AI")
-            self.desc_label.setText("Promanis membantu Anda menulis ulang, meningkatkan, dan menyusun prompt AI Anda untuk hasil yang lebih baik. "
-                                   "Tempel prompt mentah Anda, tambahkan konteks jika diperlukan, dan biarkan Promanis menghasilkan prompt yang disempurnakan dan siap pakai untuk model AI apa pun (teks, gambar, audio, video, dll).")
-            self.lang_group.setTitle("Bahasa")
-            self.scope_type_group.setTitle("Cakupan & Jenis")
-            self.detail_group.setTitle("Detail")
-            self.platform_group.setTitle("Platform")
-            scope_items_id = [
-                "Umum", "Pemrograman", "Novel", "Sains", "Matematika", "Pendidikan", "Sejarah", "Filsafat",
-                "Bisnis", "Pemasaran", "Hukum", "Medis", "Penulisan Teknis", "Seni", "Musik", "Puisi",
-                "Media Sosial", "Blog", "Berita", "Produktivitas", "Personal", "Keuangan", "Perjalanan", "Memasak",
-                "Game", "Wawancara", "CV", "Email", "Presentasi", "Riset", "Psikologi", "Bantuan Diri",
-                "Spiritual", "Parenting", "Kebugaran", "Kesehatan", "Fashion", "Kecantikan", "DIY", "Fotografi",
-                "Film", "Teater", "Komik", "Penulisan Naskah", "Jurnalisme", "Iklan", "UX/UI", "Data Science",
-                "AI/ML", "Teknik", "Lingkungan", "Politik", "Olahraga", "Lainnya"
-            ]
-            current_scope_index = self.scope_combo.currentIndex()
-            self.scope_combo.clear()
-            self.scope_combo.addItems(scope_items_id)
-            self.scope_combo.setCurrentIndex(current_scope_index)
-            type_items_id = [
-                "Generasi Teks",
-                "Generasi Gambar", 
-                "Generasi Audio",
-                "Generasi Video",
-                "Generasi Video+Audio",
-                "Novel",
-                "Penjelasan",
-                "Lainnya"
-            ]
-            current_type_index = self.type_combo.currentIndex()
-            self.type_combo.clear()
-            self.type_combo.addItems(type_items_id)
-            self.type_combo.setCurrentIndex(current_type_index)
-            detail_items_id = ["Sederhana", "Detail", "Kompleks", "Template"]
-            current_detail_index = self.detail_combo.currentIndex()
-            self.detail_combo.clear()
-            self.detail_combo.addItems(detail_items_id)
-            self.detail_combo.setCurrentIndex(current_detail_index)
-            self.input_label.setText("Prompt Mentah (Sebelum):")
-            self.output_label.setText("Prompt Matang (Sesudah):")
-            self.input_text.setPlaceholderText("Masukkan prompt mentah Anda di sini...")
-            self.output_text.setPlaceholderText("Prompt yang sudah disempurnakan akan muncul di sini...")
-            self.context_label.setText("Konteks (Opsional):")
-            self.context_text.setPlaceholderText("Tambahkan konteks atau informasi latar belakang di sini (opsional)...")
-            self.run_button.setText("Sempurnakan Prompt")
-            self.clear_button.setText("Bersihkan Semua")
-            self.copy_button.setText("Salin Prompt Matang")
-            self.config_button.setText("Pengaturan")
-            self.wa_button.setText("Grup WA")
-            self.open_platform_button.setText("Buka Platform")
-            self.status_label.setText("Siap untuk menyempurnakan prompt")
+        self.locale = get_locale(language)
+        # Only touch widgets whose text actually differs from what is shown now
+        for key, setters in self.text_bindings().items():
+            text = self.locale.text(key)
+            if self.applied_texts.get(key) == text:
+                continue
+            for setter in setters:
+                setter(text)
+            self.applied_texts[key] = text
+        for category, combo in self.option_combos().items():
+            labels = self.locale.option_labels(category)
+            if self.applied_options.get(category) == labels:
+                continue
+            current_index = combo.currentIndex()
+            combo.clear()
+            combo.addItems(labels)
+            combo.setCurrentIndex(current_index)
+            self.applied_options[category] = labels
+        compress_labels = [self.tr_text("compress_option", tokens=tokens) if tokens else self.tr_text("compress_off")
+                           for tokens in COMPRESS_CHOICES]
+        if self.applied_options.get("compress") != compress_labels:
+            current_index = max(self.compress_combo.currentIndex(), 0)
+            self.compress_combo.clear()
+            self.compress_combo.addItems(compress_labels)
+            self.compress_combo.setCurrentIndex(current_index)
+            self.applied_options["compress"] = compress_labels
+        self.update_output_tokens()
+        if self.sessions:
+            self.refresh_tab_titles()
+
+    def current_settings(self):
+        """Selected options as canonical (English) values, independent of the UI language"""
+        settings = {}
+        for category, combo in self.option_combos().items():
+            values = self.locale.canonical_values(category)
+            index = combo.currentIndex()
+            settings[category] = values[index] if 0 <= index < len(values) else combo.currentText()
+        settings["compress"] = COMPRESS_CHOICES[max(self.compress_combo.currentIndex(), 0)]
+        settings["bilingual"] = self.bilingual_checkbox.isChecked()
+        return settings
+
+    def show_output(self, result):
+        """Plain text in one pane, or a {language: text} result side by side with the selected language first"""
+        if isinstance(result, dict) and result:
+            current = self.language_combo.currentText()
+            languages = sorted(result, key=lambda language: language != current)[:2]
         else:
-            self.setWindowTitle("Promanis - AI Prompt Refiner")
-            self.header_label.setText("Promanis - AI Prompt Refiner")
-            self.desc_label.setText("Promanis helps you rewrite, enhance, and structure your AI prompts for better results. "
-                                   "Paste your raw prompt, add context if needed, and let Promanis generate a refined, ready-to-use prompt for any AI model (text, image, audio, video, etc).")
-            self.lang_group.setTitle("Language")
-            self.scope_type_group.setTitle("Scope & Type")
-            self.detail_group.setTitle("Detail")
-            self.platform_group.setTitle("Platform")
-            scope_items_en = [
-                "General", "Programming", "Novel", "Science", "Math", "Education", "History", "Philosophy",
-                "Business", "Marketing", "Legal", "Medical", "Technical Writing", "Art", "Music", "Poetry",
-                "Social Media", "Blog", "News", "Productivity", "Personal", "Finance", "Travel", "Cooking",
-                "Gaming", "Interview", "Resume", "Email", "Presentation", "Research", "Psychology", "Self-help",
-                "Spirituality", "Parenting", "Fitness", "Health", "Fashion", "Beauty", "DIY", "Photography",
-                "Film", "Theater", "Comics", "Scriptwriting", "Journalism", "Advertising", "UX/UI", "Data Science",
-                "AI/ML", "Engineering", "Environment", "Politics", "Sports", "Other"
-            ]
-            current_scope_index = self.scope_combo.currentIndex()
-            self.scope_combo.clear()
-            self.scope_combo.addItems(scope_items_en)
-            self.scope_combo.setCurrentIndex(current_scope_index)
-            type_items_en = [
-                "Text Generation",
-                "Image Generation",
-                "Audio Generation", 
-                "Video Generation",
-                "Video+Audio Generation",
-                "Novel",
-                "Explanation",
-                "Other"
-            ]
-            current_type_index = self.type_combo.currentIndex()
-            self.type_combo.clear()
-            self.type_combo.addItems(type_items_en)
-            self.type_combo.setCurrentIndex(current_type_index)
-            detail_items_en = ["Simple", "Detailed", "Complex", "Template"]
-            current_detail_index = self.detail_combo.currentIndex()
-            self.detail_combo.clear()
-            self.detail_combo.addItems(detail_items_en)
-            self.detail_combo.setCurrentIndex(current_detail_index)
-            self.input_label.setText("Raw Prompt (Before):")
-            self.output_label.setText("Refined Prompt (After):")
-            self.input_text.setPlaceholderText("Enter your raw prompt here...")
-            self.output_text.setPlaceholderText("Refined prompt will appear here...")
-            self.context_label.setText("Context (Optional):")
-            self.context_text.setPlaceholderText("Add any context or background information here (optional)...")
-            self.run_button.setText("Refine Prompt")
-            self.clear_button.setText("Clear All")
-            self.copy_button.setText("Copy Refined Prompt")
-            self.config_button.setText("Settings")
-            self.wa_button.setText("WA Group")
-            self.open_platform_button.setText("Open Platform")
-            self.status_label.setText("Ready to refine prompts")
-    
+            languages = []
+        self.output_languages = languages
+        bilingual = len(languages) == 2
+        self.output_text.setPlainText(result[languages[0]] if languages else (result or ""))
+        self.secondary_output_text.setPlainText(result[languages[1]] if bilingual else "")
+        self.secondary_output_text.setVisible(bilingual)
+        for label, language in zip(self.output_language_labels, languages + ["", ""]):
+            label.setText(language)
+            label.setVisible(bilingual)
+
+    def displayed_output(self):
+        if len(self.output_languages) == 2:
+            return dict(zip(self.output_languages, (self.output_text.toPlainText(), self.secondary_output_text.toPlainText())))
+        return self.output_text.toPlainText()
+
+    def update_output_tokens(self):
+        """Local estimate of what the refined prompt will cost on the target platform"""
+        text = self.output_text.toPlainText()
+        self.output_tokens_label.setText(self.tr_text("output_tokens", tokens=estimate_tokens(text)) if text.strip() else "")
+
+    def connect_speculation(self):
+        self.input_text.textChanged.connect(self.schedule_speculation)
+        self.context_text.textChanged.connect(self.schedule_speculation)
+        self.language_combo.currentTextChanged.connect(self.schedule_speculation)
+        self.bilingual_checkbox.toggled.connect(self.schedule_speculation)
+        self.attachment_bar.changed.connect(self.schedule_speculation)
+        for combo in list(self.option_combos().values()) + [self.compress_combo]:
+            combo.currentIndexChanged.connect(self.schedule_speculation)
+
+    def speculation_request(self):
+        settings = self.current_settings()
+        return {
+            "prompt": self.input_text.toPlainText().strip(),
+            "context": self.context_text.toPlainText().strip(),
+            "language": self.language_combo.currentText(),
+            "scope": settings["scope"],
+            "type": settings["type"],
+            "detail": settings["detail"],
+            "format": settings["format"],
+            "compress": settings["compress"],
+            "bilingual": settings["bilingual"],
+            "attachments": tuple(self.attachment_bar.paths()),
+        }
+
+    def schedule_speculation(self, *args):
+        if self.speculative.enabled and not self.applying_session and not self.active_session.busy:
+            self.speculative.schedule(self.speculation_request())
+
+    def on_speculative_toggled(self, checked):
+        self.speculative.set_enabled(checked)
+        if checked:
+            self.schedule_speculation()
+
+    @property
+    def worker(self):
+        """Worker of the visible tab"""
+        return self.active_session.worker if self.active_session else None
+
+    def restore_sessions(self):
+        """Rebuild the tabs from the session index; only the active tab's file is read now"""
+        self.sessions, active_id = self.session_store.load_index()
+        if not self.sessions:
+            session = RefinementSession()
+            session.loaded = True
+            self.sessions = [session]
+        active_index = next((i for i, s in enumerate(self.sessions) if s.id == active_id), 0)
+        self.tab_bar.blockSignals(True)
+        for index, session in enumerate(self.sessions):
+            self.tab_bar.addTab(self.session_title(session, index))
+        self.tab_bar.setCurrentIndex(active_index)
+        self.tab_bar.blockSignals(False)
+        self.show_session(self.sessions[active_index])
+
+    def session_title(self, session, index):
+        return session.display_title(self.tr_text("session_title", number=index + 1))
+
+    def refresh_tab_titles(self):
+        for index, session in enumerate(self.sessions):
+            self.tab_bar.setTabText(index, self.session_title(session, index))
+
+    def capture_active(self):
+        """Copy the shared widgets back into the visible session"""
+        session = self.active_session
+        if session is None:
+            return
+        session.prompt = self.input_text.toPlainText()
+        session.context = self.context_text.toPlainText()
+        session.attachments = self.attachment_bar.paths()
+        session.language = self.language_combo.currentText()
+        session.settings = self.current_settings()
+        session.output = self.displayed_output()
+        session.status = self.status_label.text()
+
+    def show_session(self, session):
+        self.session_store.load(session)
+        self.active_session = session
+        self.speculative.cancel_pending()
+        self.applying_session = True
+        try:
+            self.language_combo.setCurrentText(session.language)
+            for category, combo in self.option_combos().items():
+                values = self.locale.canonical_values(category)
+                if session.settings.get(category) in values:
+                    combo.setCurrentIndex(values.index(session.settings[category]))
+            if session.settings.get("compress") in COMPRESS_CHOICES:
+                self.compress_combo.setCurrentIndex(COMPRESS_CHOICES.index(session.settings["compress"]))
+            self.bilingual_checkbox.setChecked(bool(session.settings.get("bilingual")))
+            self.input_text.setPlainText(session.prompt)
+            self.context_text.setPlainText(session.context)
+            self.attachment_bar.clear()
+            self.attachment_bar.add_paths(session.attachments)
+            self.show_output(session.output)
+            self.status_label.setText(session.status or self.tr_text("status_ready"))
+        finally:
+            self.applying_session = False
+        self.update_run_controls()
+
+    def save_sessions(self):
+        self.capture_active()
+        try:
+            for session in self.sessions:
+                self.session_store.save(session)
+            self.session_store.save_index(self.sessions, self.active_session.id)
+        except OSError as e:
+            print(f"Warning: could not save sessions: {str(e)}")
+
+    def on_tab_changed(self, index):
+        if not 0 <= index < len(self.sessions):
+            return
+        self.capture_active()
+        self.show_session(self.sessions[index])
+        self.refresh_tab_titles()
+        self.save_sessions()
+
+    def on_tab_moved(self, from_index, to_index):
+        self.sessions.insert(to_index, self.sessions.pop(from_index))
+        self.refresh_tab_titles()
+        self.save_sessions()
+
+    def new_session_tab(self):
+        self.capture_active()
+        session = RefinementSession()
+        session.loaded = True
+        # New tabs start from the current tab's language and options
+        session.language = self.language_combo.currentText()
+        session.settings = self.current_settings()
+        self.sessions.append(session)
+        self.tab_bar.addTab(self.session_title(session, len(self.sessions) - 1))
+        self.tab_bar.setCurrentIndex(len(self.sessions) - 1)
+
+    def close_session_tab(self, index):
+        session = self.sessions[index]
+        if session.busy:
+            QMessageBox.information(self, self.tr_text("info_title"), self.tr_text("warn_session_busy"))
+            return
+        if len(self.sessions) == 1:
+            self.clear_all()
+            return
+        self.session_store.delete(session)
+        self.sessions.pop(index)
+        if session is self.active_session:
+            self.active_session = None
+        self.tab_bar.removeTab(index)
+        self.refresh_tab_titles()
+        self.save_sessions()
+
+    def update_run_controls(self):
+        busy = self.active_session.busy
+        self.run_button.setEnabled(not busy)
+        self.progress_bar.setVisible(busy)
+        if busy:
+            self.progress_bar.setRange(0, 0)
+
     def refine_prompt(self):
+        session = self.active_session
+        if session.busy:
+            return
         prompt_text = self.input_text.toPlainText().strip()
-        context_text = self.context_text.toPlainText().strip()
-        current_language = self.language_combo.currentText()
-        current_scope = self.scope_combo.currentText()
-        current_detail = self.detail_combo.currentText()
-        current_type = self.type_combo.currentText()
-        
         if not prompt_text:
-            if current_language == "Bahasa Indonesia":
-                QMessageBox.warning(self, "Peringatan", "Silakan masukkan prompt terlebih dahulu!")
-            else:
-                QMessageBox.warning(self, "Warning", "Please enter a prompt first!")
+            QMessageBox.warning(self, self.tr_text("warning_title"), self.tr_text("warn_empty_prompt"))
             return
-            
+
+        request = self.speculation_request()
+        speculated = self.speculative.take(request)
+        if speculated is not None:
+            self.on_speculation_finished(session, request, speculated)
+            return
+
         try:
-            self.run_button.setEnabled(False)
-            self.progress_bar.setVisible(True)
-            self.progress_bar.setRange(0, 0)
-            
-            if current_language == "Bahasa Indonesia":
-                self.status_label.setText("Sedang memproses prompt dengan Gemini AI...")
-            else:
-                self.status_label.setText("Processing prompt with Gemini AI...")
-            
-            self.worker = PromptRefinementWorker(
-                self.api_manager, prompt_text, current_language, context_text, current_scope, current_detail, current_type
-            )
-            self.worker.finished.connect(self.on_refinement_finished)
-            self.worker.error.connect(self.on_refinement_error)
-            self.worker.start()
-            
+            session.busy = True
+            self.status_label.setText(self.tr_text("status_processing"))
+            self.update_run_controls()
+            self.refresh_tab_titles()
+
+            # A background guess for exactly this input is already running: wait for it instead.
+            # If the guess fails, its single attempt was not the user's request: run the real one.
+            if self.speculative.adopt(request, lambda entry: self.on_speculation_finished(session, request, entry),
+                                      lambda message: self.start_worker(session, request)):
+                return
+            self.start_worker(session, request)
+
         except Exception as e:
-            current_language = self.language_combo.currentText()
-            if current_language == "Bahasa Indonesia":
-                QMessageBox.critical(self, "Error", f"Kesalahan: {str(e)}")
-            else:
-                QMessageBox.critical(self, "Error", f"Error: {str(e)}")
-            self.reset_ui()
-    
-    def on_refinement_finished(self, result):
-        if result and isinstance(result, str):
-            result = result.replace("\\n", "\n")
-            result = re.sub(r"(?<!\*)\* (?!\*)", "• ", result)
-            result = re.sub(r"\*\*(.*?)\*\*", lambda m: m.group(1).upper(), result)
-        self.output_text.setPlainText(result)
-        current_language = self.language_combo.currentText()
-        if current_language == "Bahasa Indonesia":
-            self.status_label.setText("Penyempurnaan prompt berhasil!")
-        else:
-            self.status_label.setText("Prompt refinement completed successfully!")
-        self.reset_ui()
-    
-    def on_refinement_error(self, error_message):
-        current_language = self.language_combo.currentText()
-        if current_language == "Bahasa Indonesia":
-            QMessageBox.critical(self, "Error", f"Gagal menyempurnakan prompt: {error_message}")
-            self.status_label.setText("Gagal menyempurnakan prompt")
-        else:
-            QMessageBox.critical(self, "Error", f"Failed to refine prompt: {error_message}")
-            self.status_label.setText("Failed to refine prompt")
-        self.reset_ui()
-    
-    def reset_ui(self):
-        self.run_button.setEnabled(True)
-        self.progress_bar.setVisible(False)
-        if self.worker:
-            self.worker.quit()
-            self.worker.wait()
-            self.worker = None
-    
-    def clear_all(self):
-        self.input_text.clear()
-        self.output_text.clear()
-        self.context_text.clear()
-        current_language = self.language_combo.currentText()
-        if current_language == "Bahasa Indonesia":
-            self.status_label.setText("Siap untuk menyempurnakan prompt")
-        else:
-            self.status_label.setText("Ready to refine prompts")
+            QMessageBox.critical(self, self.tr_text("error_title"), self.tr_text("error_generic", error=str(e)))
+            self.reset_ui(session)
 
-    def copy_refined_prompt(self):
-        text = self.output_text.toPlainText()
-        if text.strip():
-            QGuiApplication.clipboard().setText(text)
-            current_language = self.language_combo.currentText()
-            if current_language == "Bahasa Indonesia":
-                self.status_label.setText("Prompt matang berhasil disalin ke clipboard!")
-            else:
-                self.status_label.setText("Refined prompt copied to clipboard!")
+    def start_worker(self, session, request):
+        from .gemini_worker import PromptRefinementWorker
+        # A small edit of the prompt this tab refined last is sent as a patch request
+        previous = incremental_base(session.base, request, self.incremental_settings)
+        session.pending_request = request
+        # Tabs run concurrently; every worker shares the same key manager, client pool and cache
+        session.worker = PromptRefinementWorker(
+            self.api_manager, request["prompt"], request["language"], request["context"], request["scope"], request["detail"],
+            request["type"], output_profile=request["format"], attachments=list(request["attachments"]),
+            compress_tokens=request["compress"], bilingual=request["bilingual"], previous=previous, parent=self
+        )
+        session.worker.finished.connect(self.on_worker_finished)
+        session.worker.error.connect(self.on_worker_error)
+        session.worker.start()
+
+    def worker_session(self):
+        # Bound slots rather than per-worker lambdas, which PySide keeps alive after the worker is gone
+        worker = self.sender()
+        return next((session for session in self.sessions if session.worker is worker), None)
+
+    def on_worker_finished(self, result):
+        session = self.worker_session()
+        if session is not None:
+            refiner = session.worker.refiner
+            if refiner.refined_text:
+                session.base = {"request": dict(session.pending_request), "refined": refiner.refined_text}
+            status_key = "status_done_incremental" if getattr(refiner, "mode", None) == "incremental" else "status_done"
+            self.on_refinement_finished(session, result, status_key)
+
+    def on_speculation_finished(self, session, request, entry):
+        # Same bookkeeping as on_worker_finished, from the guess's cache entry
+        session.pending_request = request
+        if entry["refined"]:
+            session.base = {"request": dict(request), "refined": entry["refined"]}
+        self.on_refinement_finished(session, entry["result"])
+
+    def on_worker_error(self, error_message):
+        session = self.worker_session()
+        if session is not None:
+            self.on_refinement_error(session, error_message)
+
+    def on_refinement_finished(self, session, result, status_key="status_done"):
+        session.output = result
+        session.status = self.tr_text(status_key)
+        if session is self.active_session:
+            self.show_output(result)
+            self.status_label.setText(session.status)
+        self.reset_ui(session)
+        self.session_store.save(session)
+
+    def on_refinement_error(self, session, error_message):
+        session.status = self.tr_text("status_failed")
+        if session is self.active_session:
+            QMessageBox.critical(self, self.tr_text("error_title"), self.tr_text("error_refine", error=error_message))
+            self.status_label.setText(session.status)
         else:
-            current_language = self.language_combo.currentText()
-            if current_language == "Bahasa Indonesia":
-                QMessageBox.information(self, "Info", "Tidak ada prompt matang untuk disalin.")
-            else:
-                QMessageBox.information(self, "Info", "No refined prompt to copy.")
-        self.progress_bar.setVisible(False)
-        if self.worker:
-            self.worker.quit()
-            self.worker.wait()
-            self.worker = None
-    
+            print(f"Refinement failed in a background tab: {error_message}")
+        self.reset_ui(session)
+
+    def reset_ui(self, session):
+        session.busy = False
+        if session.worker:
+            session.worker.quit()
+            session.worker.wait()
+            session.worker.deleteLater()
+            session.worker = None
+        if session is self.active_session:
+            self.update_run_controls()
+        self.refresh_tab_titles()
+
+    def diagnostics(self):
+        """Live workers, threads and memory; used by the Ctrl+Shift+D hook and the soak test"""
+        from .diagnostics import collect_diagnostics
+        from .client_pool import client_count
+        return collect_diagnostics({
+            "refinement_running": sum(1 for session in self.sessions if session.busy),
+            "sessions": len(self.sessions),
+            "clients": client_count(),
+            "speculative": self.speculative.stats(),
+            "queue_wait": self.api_manager.queue_stats(),
+        })
+
+    def show_diagnostics(self):
+        report = self.diagnostics()
+        print(f"Diagnostics: {json.dumps(report, indent=2)}")
+        rss = report["rss_bytes"]
+        memory = f"{rss / (1024 * 1024):.1f} MB" if rss else "n/a"
+        self.status_label.setText(f"Diagnostics: {report['threads']} threads, "
+                                  f"{report['objects']['PromptRefinementWorker']} workers, {memory}")
+
+    def closeEvent(self, event):
+        self.speculative.shutdown()
+        running = [session.worker for session in self.sessions if session.worker is not None]
+        if running:
+            # A request already in flight finishes after the window is gone (see gemini_worker.stop_workers)
+            from .gemini_worker import stop_workers
+            stop_workers(running)
+        self.save_sessions()
+        if self.speculative.counters["started"]:
+            print(f"Speculative pre-refinement: {self.speculative.stats()}")
+        super().closeEvent(event)
+
     def clear_all(self):
         self.input_text.clear()
-        self.output_text.clear()
+        self.show_output("")
         self.context_text.clear()
-        current_language = self.language_combo.currentText()
-        if current_language == "Bahasa Indonesia":
-            self.status_label.setText("Siap untuk menyempurnakan prompt")
-        else:
-            self.status_label.setText("Ready to refine prompts")
+        self.attachment_bar.clear()
+        self.status_label.setText(self.tr_text("status_ready"))
 
     def copy_refined_prompt(self):
         text = self.output_text.toPlainText()
         if text.strip():
             QGuiApplication.clipboard().setText(text)
-            current_language = self.language_combo.currentText()
-            if current_language == "Bahasa Indonesia":
-                self.status_label.setText("Prompt matang berhasil disalin ke clipboard!")
-            else:
-                self.status_label.setText("Refined prompt copied to clipboard!")
+            self.status_label.setText(self.tr_text("status_copied"))
         else:
-            current_language = self.language_combo.currentText()
-            if current_language == "Bahasa Indonesia":
-                QMessageBox.information(self, "Info", "Tidak ada prompt matang untuk disalin.")
-            else:
-                QMessageBox.information(self, "Info", "No refined prompt to copy.")
+            QMessageBox.information(self, self.tr_text("info_title"), self.tr_text("info_nothing_to_copy"))
@@ -0,0 +1,201 @@
+import os
+import re
+import json
+import time
+import random
+import threading
+
+# Tunables for load tests and benchmarks; read from the environment so child processes inherit them
+MOCK_SETTINGS = {
+    "latency_ms": float(os.environ.get("PROMANIS_MOCK_LATENCY_MS", "200")),
+    "jitter": float(os.environ.get("PROMANIS_MOCK_JITTER", "0.2")),
+    "error_rate": float(os.environ.get("PROMANIS_MOCK_ERROR_RATE", "0")),
+    # Share of items silently left out of a packed response, to exercise the per-item fallback
+    "pack_drop_rate": float(os.environ.get("PROMANIS_MOCK_PACK_DROP_RATE", "0")),
+    # Share of calls that never answer, so deadlines and key roll-over can be exercised
+    "hang_rate": float(os.environ.get("PROMANIS_MOCK_HANG_RATE", "0")),
+    # Generation time per output token on top of latency_ms, so shorter answers also come back sooner
+    "ms_per_output_token": float(os.environ.get("PROMANIS_MOCK_MS_PER_OUTPUT_TOKEN", "0")),
+    # DNS and TLS setup paid by the first call on each client, like a fresh HTTP connection pool
+    "connect_ms": float(os.environ.get("PROMANIS_MOCK_CONNECT_MS", "0")),
+    # Share of refinements that leave out CLEAR elements, so the review pipeline has something to revise
+    "weak_rate": float(os.environ.get("PROMANIS_MOCK_WEAK_RATE", "0")),
+    # Share of single-language refinements answered in the other language, to exercise the language fix
+    "wrong_language_rate": float(os.environ.get("PROMANIS_MOCK_WRONG_LANGUAGE_RATE", "0")),
+}
+
+SYSTEM_LANGUAGE = re.compile(r"MUST be written entirely in ([A-Za-z ]+?)\.")
+QUOTED_PROMPT = re.compile(r"^(?:Context|Konteks): (.*)$", re.MULTILINE)
+
+
+def mock_refined_prompt(prompt, language):
+    if language == "Bahasa Indonesia":
+        return (
+            "Tulis seluruh jawaban dalam Bahasa Indonesia.\n\n"
+            f"Konteks: {prompt}\n* Tingkat: menengah\n* Harapan: jawaban terstruktur dan jelas\n"
+            "* Asumsi: pengguna memahami istilah dasar"
+        )
+    return (
+        f"Respond entirely in {language}.\n\n"
+        f"Context: {prompt}\n* Level: intermediate\n* Expectation: a clear, well-structured answer\n"
+        "* Assumption: the reader knows the basic terms"
+    )
+
+
+def mock_weak_prompt(prompt, language):
+    """A refinement that only restates the prompt, missing Level, Expectation and Assumption"""
+    return mock_refined_prompt(prompt, language).split("\n* ", 1)[0]
+
+
+def mock_edits(contents):
+    """Edit list for an incremental request: changed sentences are swapped where the previous prompt quotes them"""
+    previous, _, changes = contents.partition("\n\nRAW_PROMPT_CHANGES:\n")
+    previous = previous.replace("PREVIOUS_REFINED_PROMPT:\n", "", 1)
+    removed = [line[2:] for line in changes.splitlines() if line.startswith("- ")]
+    added = [line[2:] for line in changes.splitlines() if line.startswith("+ ")]
+    edits = []
+    for index, sentence in enumerate(removed):
+        if previous.count(sentence) != 1:
+            return None
+        edits.append({"find": sentence, "replace": added[index] if index < len(added) else ""})
+    extra = " ".join(added[len(removed):])
+    if extra and edits:
+        edits[-1]["replace"] = f"{edits[-1]['replace']} {extra}".strip()
+    elif extra:
+        # Pure additions go to the end of the first paragraph, which quotes the raw prompt
+        anchor = previous.split("\n* ", 1)[0]
+        if previous.count(anchor) != 1:
+            return None
+        edits.append({"find": anchor, "replace": f"{anchor} {extra}"})
+    return edits
+
+
+def configure_mock(**settings):
+    MOCK_SETTINGS.update({key: float(value) for key, value in settings.items()})
+
+
+def mock_enabled():
+    return os.environ.get("PROMANIS_BACKEND", "").lower() == "mock"
+
+
+def mock_output_language(language):
+    """The requested language, or the other one for PROMANIS_MOCK_WRONG_LANGUAGE_RATE of the answers"""
+    if MOCK_SETTINGS["wrong_language_rate"] and random.random() < MOCK_SETTINGS["wrong_language_rate"]:
+        return "English" if language == "Bahasa Indonesia" else "Bahasa Indonesia"
+    return language
+
+
+class MockTimeout(TimeoutError):
+    """Raised where httpx would raise ReadTimeout once http_options.timeout has passed"""
+
+
+class MockUsage:
+    def __init__(self, prompt_tokens, output_tokens):
+        self.prompt_token_count = prompt_tokens
+        self.candidates_token_count = output_tokens
+        self.total_token_count = prompt_tokens + output_tokens
+
+
+class MockCandidate:
+    def __init__(self, finish_reason):
+        self.finish_reason = finish_reason
+
+
+class MockResponse:
+    def __init__(self, text, prompt_tokens, finish_reason="STOP"):
+        self.text = text
+        self.usage_metadata = MockUsage(prompt_tokens, max(1, len(text) // 4))
+        self.candidates = [MockCandidate(finish_reason)]
+
+
+class MockModels:
+    def __init__(self, client):
+        self.client = client
+
+    def simulate_latency(self, config=None, output_tokens=0):
+        latency = MOCK_SETTINGS["latency_ms"] / 1000.0
+        jitter = MOCK_SETTINGS["jitter"]
+        if latency > 0:
+            latency = max(0.0, latency * random.uniform(1.0 - jitter, 1.0 + jitter))
+        latency += output_tokens * MOCK_SETTINGS["ms_per_output_token"] / 1000.0
+        if MOCK_SETTINGS["hang_rate"] and random.random() < MOCK_SETTINGS["hang_rate"]:
+            latency = float("inf")
+        options = getattr(config, "http_options", None)
+        timeout_ms = getattr(options, "timeout", None)
+        if timeout_ms and latency > timeout_ms / 1000.0:
+            time.sleep(timeout_ms / 1000.0)
+            raise MockTimeout(f"Mock request timed out after {timeout_ms} ms")
+        if latency == float("inf"):
+            # No transport timeout set: a real hung socket would block forever, cap it for tests
+            latency = 60.0
+        if latency > 0:
+            time.sleep(latency)
+        if MOCK_SETTINGS["error_rate"] and random.random() < MOCK_SETTINGS["error_rate"]:
+            raise Exception("429 RESOURCE_EXHAUSTED (mock backend)")
+
+    def get(self, model, config=None):
+        """Model lookup: no tokens, but it opens the connection"""
+        self.client.connect()
+        return {"name": f"models/{model}"}
+
+    def generate_content(self, model, contents, config=None):
+        self.client.connect()
+        with self.client.lock:
+            self.client.calls += 1
+        prompt = contents if isinstance(contents, str) else " ".join(str(part) for part in contents)
+        system_instruction = getattr(config, "system_instruction", "") or ""
+        match = SYSTEM_LANGUAGE.search(system_instruction)
+        language = match.group(1) if match else "English"
+        if "PACKED REQUEST" in system_instruction:
+            entries = [
+                {"id": item["id"], "refined_prompt": mock_refined_prompt(item["prompt"], mock_output_language(language))}
+                for item in json.loads(prompt)
+                if random.random() >= MOCK_SETTINGS["pack_drop_rate"]
+            ]
+            text = json.dumps(entries, ensure_ascii=False)
+        elif "INCREMENTAL UPDATE" in system_instruction and mock_edits(prompt) is not None:
+            text = json.dumps({"edits": mock_edits(prompt)}, ensure_ascii=False)
+        elif "REVISION (overrides" in system_instruction:
+            raw_prompt = prompt.partition("\n\nRAW_PROMPT:\n")[2] or prompt
+            text = json.dumps({"refined_prompt": mock_refined_prompt(raw_prompt, language)}, ensure_ascii=False)
+        elif "LANGUAGE FIX" in system_instruction:
+            quoted = QUOTED_PROMPT.search(prompt)
+            text = json.dumps({"refined_prompt": mock_refined_prompt(quoted.group(1) if quoted else prompt, language)}, ensure_ascii=False)
+        elif "refined_prompt_id" in system_instruction:
+            text = json.dumps({
+                "refined_prompt_en": mock_refined_prompt(prompt, "English"),
+                "refined_prompt_id": mock_refined_prompt(prompt, "Bahasa Indonesia"),
+            }, ensure_ascii=False)
+        else:
+            language = mock_output_language(language)
+            build = mock_refined_prompt
+            if MOCK_SETTINGS["weak_rate"] and random.random() < MOCK_SETTINGS["weak_rate"]:
+                build = mock_weak_prompt
+            text = json.dumps({"refined_prompt": build(prompt, language)}, ensure_ascii=False)
+        prompt_tokens = (len(system_instruction) + len(prompt)) // 4
+        # Cut the output at max_output_tokens like the real API does, unclosed JSON included
+        limit = getattr(config, "max_output_tokens", None)
+        if limit and len(text) > limit * 4:
+            self.simulate_latency(config, limit)
+            return MockResponse(text[:limit * 4], prompt_tokens, "MAX_TOKENS")
+        self.simulate_latency(config, len(text) // 4)
+        return MockResponse(text, prompt_tokens)
+
+
+class MockClient:
+    """Stands in for genai.Client: same models.generate_content surface, canned output, injected latency/errors"""
+
+    def __init__(self, api_key=None, **kwargs):
+        self.api_key = api_key
+        self.calls = 0
+        self.lock = threading.Lock()
+        self.connect_lock = threading.Lock()
+        self.connected = False
+        self.models = MockModels(self)
+
+    def connect(self):
+        # Concurrent first calls share one connection setup, as they would share httpx's pool
+        with self.connect_lock:
+            if not self.connected:
+                time.sleep(MOCK_SETTINGS["connect_ms"] / 1000.0)
+                self.connected = True
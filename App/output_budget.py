@@ -0,0 +1,45 @@
+from .config_store import get_config_store
+
+DEFAULT_OUTPUT_BUDGET = {
+    "enabled": True,
+    # Hard cap on response tokens per detail level, sent as max_output_tokens
+    "detail": {"Simple": 400, "Detailed": 900, "Complex": 1600, "Template": 1000},
+    # Tighter caps for types whose target tools only read short prompts; the smaller cap wins
+    "type": {"Image Generation": 350, "Audio Generation": 350, "Video Generation": 500, "Video+Audio Generation": 500},
+    # The model is asked to aim for this share of the cap so it finishes before being cut off
+    "target_ratio": 0.8,
+}
+# Room for the {"refined_prompt": ...} wrapper around a compressed prompt
+JSON_OVERHEAD_TOKENS = 32
+COMPRESS_CHOICES = (0, 50, 100, 150, 200, 300, 500)
+
+
+def load_output_budget(base_dir):
+    return get_config_store(base_dir).get_section("output_budget", DEFAULT_OUTPUT_BUDGET)
+
+
+def output_token_limit(budget, detail, prompt_type, compress_tokens=0):
+    """max_output_tokens for a request, or None when output is unbounded"""
+    if compress_tokens:
+        return int(compress_tokens) + JSON_OVERHEAD_TOKENS
+    if not budget.get("enabled", True):
+        return None
+    limits = [budget.get("detail", {}).get(detail), budget.get("type", {}).get(prompt_type)]
+    limits = [int(limit) for limit in limits if limit]
+    return min(limits) if limits else None
+
+
+def budget_clause(limit, compress_tokens=0, target_ratio=0.8):
+    if compress_tokens:
+        return (
+            f"\n\nCOMPRESSION (overrides the detail level): The refined prompt MUST fit in {compress_tokens} tokens "
+            f"(about {compress_tokens * 4} characters). Keep all five CLEAR elements (Context, Level, Expectation, "
+            "Assumption, Review) as short lines; cut adjectives, examples and repetition first, never the task itself."
+        )
+    if not limit:
+        return ""
+    target = int(limit * target_ratio)
+    return (
+        f"\n\nLENGTH BUDGET: Keep the refined prompt under {target} tokens (about {target * 4} characters). "
+        "Prefer dense, specific wording over length."
+    )
@@ -0,0 +1,145 @@
+import re
+import json
+from .refiner import PromptRefiner, RefinementError, expected_output_tokens, MEDIA_TYPES
+from .formatters import format_output, DEFAULT_PROFILE
+from .context_pipeline import ContextPipeline, load_context_settings, estimate_tokens
+from .output_budget import load_output_budget
+from .deadlines import Deadline, load_deadlines, http_options, is_timeout_error, is_rate_limit_error
+from .client_pool import get_client
+from .api_manager import QuotaExhaustedError
+from .language_check import matches_language
+from .locale_manager import get_locale
+
+# gemini-2.0-flash stops at 8192 output tokens; a pack never asks for more
+PACK_OUTPUT_LIMIT = 8192
+# Per-item allowance for the {"id": ..., "refined_prompt": ...} wrapper
+ITEM_OVERHEAD_TOKENS = 24
+MAX_PACK_SIZE = 16
+OBJECT_PATTERN = re.compile(r"\{[^{}]*\}", re.DOTALL)
+
+PACKED_CLAUSE = (
+    "\n\nPACKED REQUEST (overrides the single-object format above): The input is a JSON array of independent "
+    "prompts, each with an \"id\". Refine EACH prompt on its own, following every rule above, and never let one "
+    "prompt influence another. Return ONLY a JSON array with exactly one object per input id, in the same order: "
+    "[{\"id\": \"<id>\", \"refined_prompt\": \"...\"}]"
+)
+
+
+def pack_capacity(output_limit, requested_size):
+    """How many items fit in one request once each keeps its full output budget"""
+    if not output_limit:
+        return max(1, min(requested_size, MAX_PACK_SIZE))
+    fits = PACK_OUTPUT_LIMIT // (output_limit + ITEM_OVERHEAD_TOKENS)
+    return max(1, min(requested_size, fits, MAX_PACK_SIZE))
+
+
+def parse_packed_response(text):
+    """Map of id -> refined_prompt; complete objects are kept even if the array itself was cut off"""
+    text = re.sub(r"^```(?:json)?\s*|\s*```$", "", text.strip())
+    try:
+        entries = json.loads(text[text.index("["):text.rindex("]") + 1])
+    except ValueError:
+        entries = []
+        for match in OBJECT_PATTERN.findall(text):
+            try:
+                entries.append(json.loads(match))
+            except ValueError:
+                continue
+    results = {}
+    for entry in entries if isinstance(entries, list) else []:
+        if isinstance(entry, dict) and "id" in entry:
+            results.setdefault(str(entry["id"]), entry.get("refined_prompt"))
+    return results
+
+
+class PackedRefinement:
+    """Refines several prompts that share language, type, detail and context in one request.
+
+    refine() returns (results, failures): display-ready text per item id, and an error message
+    for every item that came back missing, malformed or in the wrong language, so callers can retry
+    just those alone.
+    A failure of the whole request raises RefinementError like a single refinement does.
+    """
+
+    def __init__(self, api_manager, items, language="English", context_text="", scope="General", detail_level="Detailed",
+                 prompt_type="Text Generation", output_profile=DEFAULT_PROFILE, compress_tokens=0, priority="batch"):
+        self.api_manager = api_manager
+        # items: list of (id, prompt) pairs; ids only need to be unique within the pack
+        self.items = [(str(item_id), prompt.strip()) for item_id, prompt in items]
+        self.context_text = context_text
+        self.output_profile = output_profile
+        self.template = PromptRefiner(
+            api_manager, "\n".join(prompt for _, prompt in self.items), language, context_text, scope, detail_level,
+            prompt_type, output_profile=output_profile, compress_tokens=compress_tokens, priority=priority
+        )
+
+    def stop(self):
+        """Like PromptRefiner.stop(): a pack that has not sent its request yet raises RefinementError"""
+        self.template.stop()
+
+    def refine(self):
+        if not self.items:
+            return {}, {}
+        deadlines = load_deadlines(self.api_manager.base_dir)
+        deadline = Deadline(deadlines["overall_seconds"], deadlines["packed_attempt_seconds"])
+        context_pipeline = ContextPipeline(self.api_manager, load_context_settings(self.api_manager.base_dir), self.template.priority,
+                                           deadline, self.template.stop_requested)
+        context_text = context_pipeline.prepare(self.context_text, self.template.prompt_text, [])
+        system_instruction, type_en, detail_en, item_limit = self.template.build_system_instruction(
+            context_text, load_output_budget(self.api_manager.base_dir)
+        )
+        system_instruction += PACKED_CLAUSE
+        contents = json.dumps([{"id": item_id, "prompt": prompt} for item_id, prompt in self.items], ensure_ascii=False)
+        output_limit = None
+        if item_limit:
+            output_limit = min(PACK_OUTPUT_LIMIT, (item_limit + ITEM_OVERHEAD_TOKENS) * len(self.items))
+        projected_tokens = estimate_tokens(system_instruction + contents) + expected_output_tokens(detail_en, item_limit) * len(self.items)
+
+        api_key = None
+        if self.template.stop_requested.is_set():
+            raise RefinementError("Refinement stopped")
+        if deadline.expired():
+            raise RefinementError(f"Packed request timed out after {deadlines['overall_seconds']} s")
+        try:
+            api_key = self.api_manager.acquire_key(projected_tokens, max_wait_seconds=deadline.remaining(),
+                                                   priority=self.template.priority)
+            print(f"=== PACKED REQUEST ({len(self.items)} prompts) USING API KEY INDEX {self.api_manager.last_index} ===")
+            from google.genai import types
+            response = get_client(api_key).models.generate_content(
+                model="gemini-2.0-flash",
+                config=types.GenerateContentConfig(
+                    system_instruction=system_instruction,
+                    max_output_tokens=output_limit,
+                    http_options=http_options(deadline.attempt_timeout())
+                ),
+                contents=contents
+            )
+        except QuotaExhaustedError as e:
+            raise RefinementError(str(e)) from e
+        except Exception as e:
+            error_message = str(e)
+            if api_key and is_timeout_error(e):
+                self.api_manager.report_deadline_hit(api_key)
+                raise RefinementError(f"Packed request timed out after {deadlines['packed_attempt_seconds']} s") from e
+            if api_key and is_rate_limit_error(e):
+                self.api_manager.report_rate_limited(api_key)
+            raise RefinementError(f"Packed request failed: {error_message}") from e
+        self.template.report_usage(api_key, response, projected_tokens)
+        if self.template.hit_output_limit(response):
+            print(f"Packed response reached the {output_limit}-token output budget and was cut off")
+
+        returned = parse_packed_response(getattr(response, "text", "") or "")
+        language = get_locale(self.template.language).name
+        results, failures = {}, {}
+        for item_id, prompt in self.items:
+            refined = returned.get(item_id)
+            if not isinstance(refined, str) or not refined.strip():
+                failures[item_id] = "Missing from packed response"
+            elif refined.strip() == prompt:
+                failures[item_id] = "Returned unchanged in packed response"
+            elif type_en not in MEDIA_TYPES and not matches_language(refined, language):
+                # Same local check a single refinement runs; the solo retry sends the full request
+                failures[item_id] = f"Not written in {language} in packed response"
+            else:
+                results[item_id] = format_output(refined.replace("\\n", "\n"), self.output_profile, type_en)
+        return results, failures
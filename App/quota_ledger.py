@@ -0,0 +1,284 @@
+import time
+import sqlite3
+import hashlib
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+# Gemini free-tier limits for gemini-2.0-flash; override in config.json under "quota"
+DEFAULT_QUOTA = {
+    "requests_per_minute": 15,
+    "tokens_per_minute": 1000000,
+    "requests_per_day": 1500,
+    "daily_reset_timezone": "America/Los_Angeles",
+    "daily_reset_hour": 0,
+    "rate_limit_cooldown_seconds": 60,
+    "max_queue_wait_seconds": 30,
+    # Coordinate rotation, windows and cooldowns with other Promanis processes through the ledger file
+    "share_across_processes": True,
+}
+
+# A key pick gives up on a busy ledger after this long and retries later, instead of stalling every
+# thread that waits behind it; plain writes keep sqlite3's default patience
+PICK_BUSY_TIMEOUT_MS = 100
+WRITE_BUSY_TIMEOUT_MS = 5000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS usage (
+    key_id TEXT NOT NULL,
+    window TEXT NOT NULL,
+    window_start INTEGER NOT NULL,
+    requests INTEGER NOT NULL DEFAULT 0,
+    tokens INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (key_id, window, window_start)
+);
+CREATE TABLE IF NOT EXISTS cooldowns (
+    key_id TEXT PRIMARY KEY,
+    until REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS deadline_hits (
+    key_id TEXT PRIMARY KEY,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS rotation (
+    pool_id TEXT PRIMARY KEY,
+    position INTEGER NOT NULL
+);
+"""
+
+
+class LedgerBusyError(Exception):
+    """Another process holds the shared ledger's write lock right now"""
+
+
+def key_id_for(api_key):
+    """Keys are never stored; the ledger only keeps a short hash"""
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+
+
+def pool_id_for(key_ids):
+    """Instances reading the same api_keys.txt share one rotation position"""
+    return hashlib.sha256("|".join(key_ids).encode("utf-8")).hexdigest()[:16]
+
+
+def resolve_timezone(name):
+    try:
+        from zoneinfo import ZoneInfo
+        return ZoneInfo(name)
+    except Exception:
+        # Windows without the tzdata package: fall back to Pacific Standard Time
+        print(f"Warning: timezone '{name}' unavailable, using UTC-8 for daily quota resets")
+        return timezone(timedelta(hours=-8))
+
+
+class QuotaLedger:
+    """Durable per-key request/token counts for the current minute and quota day.
+
+    Counts are kept in memory for admission decisions and written through to SQLite
+    after every change, so they survive restarts. With shared=True the file is also the
+    meeting point for other Promanis processes: every key pick runs in a short write
+    transaction that first re-reads the current windows and cooldowns, so the GUI, batch
+    jobs and the service never hand out the same headroom twice.
+    """
+
+    def __init__(self, db_path, limits=None, shared=False):
+        self.db_path = str(db_path)
+        self.shared = shared
+        self.limits = dict(DEFAULT_QUOTA)
+        if limits:
+            self.limits.update(limits)
+        self.tz = resolve_timezone(self.limits["daily_reset_timezone"])
+        self.day_bounds = (0, 0, None)
+        # Reentrant: admission checks run inside transaction()
+        self.lock = threading.RLock()
+        self.usage = {}
+        self.cooldowns = {}
+        self.deadline_hits = {}
+        self.connection = sqlite3.connect(self.db_path, timeout=WRITE_BUSY_TIMEOUT_MS / 1000.0, check_same_thread=False,
+                                          isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+        self.load()
+
+    def update_limits(self, limits):
+        """Apply changed limits; the reset timezone and cached quota day follow them"""
+        with self.lock:
+            self.limits.update(limits)
+            self.tz = resolve_timezone(self.limits["daily_reset_timezone"])
+            self.day_bounds = (0, 0, None)
+
+    def minute_start(self, now):
+        return int(now // 60 * 60)
+
+    def day_start(self, now):
+        # Every admission check asks; timezone math only runs once per quota day
+        start, end, hour = self.day_bounds
+        if start <= now < end and hour == self.limits["daily_reset_hour"]:
+            return start
+        local = datetime.fromtimestamp(now, self.tz)
+        reset = local.replace(hour=int(self.limits["daily_reset_hour"]), minute=0, second=0, microsecond=0)
+        if local < reset:
+            reset -= timedelta(days=1)
+        start = int(reset.timestamp())
+        self.day_bounds = (start, (reset + timedelta(days=1)).timestamp(), self.limits["daily_reset_hour"])
+        return start
+
+    def next_day_start(self, now):
+        local = datetime.fromtimestamp(self.day_start(now), self.tz)
+        return (local + timedelta(days=1)).timestamp()
+
+    def load(self):
+        now = time.time()
+        current = {"minute": self.minute_start(now), "day": self.day_start(now)}
+        with self.lock:
+            self.connection.execute("DELETE FROM usage WHERE window_start < ?", (int(now) - 3 * 86400,))
+            rows = self.connection.execute("SELECT key_id, window, window_start, requests, tokens FROM usage").fetchall()
+            for key_id, window, window_start, requests, tokens in rows:
+                if current.get(window) == window_start:
+                    self.usage[(key_id, window)] = [window_start, requests, tokens]
+            for key_id, until in self.connection.execute("SELECT key_id, until FROM cooldowns WHERE until > ?", (now,)):
+                self.cooldowns[key_id] = until
+            for key_id, hits in self.connection.execute("SELECT key_id, hits FROM deadline_hits"):
+                self.deadline_hits[key_id] = hits
+
+    def refresh(self, now=None):
+        """Replace the in-memory windows and cooldowns with what every process has written"""
+        now = time.time() if now is None else now
+        current = {"minute": self.minute_start(now), "day": self.day_start(now)}
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT key_id, window, window_start, requests, tokens FROM usage WHERE window_start IN (?, ?)",
+                (current["minute"], current["day"])
+            ).fetchall()
+            for key_id, window, window_start, requests, tokens in rows:
+                if current[window] == window_start:
+                    self.usage[(key_id, window)] = [window_start, requests, tokens]
+            for key_id, until in self.connection.execute("SELECT key_id, until FROM cooldowns WHERE until > ?", (now,)):
+                self.cooldowns[key_id] = until
+
+    @contextmanager
+    def transaction(self):
+        """Hold the pool for one key pick; across processes when shared, else just across threads"""
+        with self.lock:
+            if not self.shared:
+                yield
+                return
+            # IMMEDIATE takes SQLite's write lock up front, so the re-read below cannot go stale
+            self.connection.execute(f"PRAGMA busy_timeout = {PICK_BUSY_TIMEOUT_MS}")
+            try:
+                self.connection.execute("BEGIN IMMEDIATE")
+            except sqlite3.OperationalError as e:
+                raise LedgerBusyError(str(e)) from e
+            finally:
+                self.connection.execute(f"PRAGMA busy_timeout = {WRITE_BUSY_TIMEOUT_MS}")
+            try:
+                self.refresh()
+                yield
+            except BaseException:
+                self.connection.execute("ROLLBACK")
+                raise
+            self.connection.execute("COMMIT")
+
+    def rotation(self, pool_id, default=0):
+        with self.lock:
+            row = self.connection.execute("SELECT position FROM rotation WHERE pool_id = ?", (pool_id,)).fetchone()
+        return row[0] if row else default
+
+    def set_rotation(self, pool_id, position):
+        with self.lock:
+            self.connection.execute(
+                "INSERT INTO rotation (pool_id, position) VALUES (?, ?) ON CONFLICT(pool_id) DO UPDATE SET position = excluded.position",
+                (pool_id, position)
+            )
+
+    def counters(self, key_id, window, window_start):
+        entry = self.usage.get((key_id, window))
+        if entry is None or entry[0] != window_start:
+            entry = [window_start, 0, 0]
+            self.usage[(key_id, window)] = entry
+        return entry
+
+    def wait_seconds(self, key_id, projected_tokens=0, now=None, reserve_share=0.0):
+        """0 when the key can take a request now, otherwise seconds until it projects to have headroom.
+
+        reserve_share keeps that fraction of the per-minute requests out of reach (for higher priorities).
+        """
+        now = time.time() if now is None else now
+        with self.lock:
+            return self.wait_seconds_locked(key_id, projected_tokens, now, reserve_share)
+
+    def wait_seconds_locked(self, key_id, projected_tokens, now, reserve_share=0.0):
+        cooldown = self.cooldowns.get(key_id, 0)
+        if cooldown > now:
+            return cooldown - now
+        day = self.counters(key_id, "day", self.day_start(now))
+        if day[1] >= self.limits["requests_per_day"]:
+            return self.next_day_start(now) - now
+        minute = self.counters(key_id, "minute", self.minute_start(now))
+        if minute[1] >= self.limits["requests_per_minute"] - int(self.limits["requests_per_minute"] * reserve_share):
+            return minute[0] + 60 - now
+        if minute[2] > 0 and minute[2] + projected_tokens > self.limits["tokens_per_minute"]:
+            return minute[0] + 60 - now
+        return 0.0
+
+    def reserve(self, key_id, projected_tokens=0, now=None):
+        """Count a request before it is sent so concurrent callers see it immediately"""
+        self.add(key_id, 1, projected_tokens, now)
+
+    def commit(self, key_id, actual_tokens, projected_tokens=0, now=None):
+        """Replace the projected token count with the real usage reported by the API"""
+        if actual_tokens != projected_tokens:
+            self.add(key_id, 0, actual_tokens - projected_tokens, now)
+
+    def add(self, key_id, requests, tokens, now=None):
+        now = time.time() if now is None else now
+        with self.lock:
+            rows = []
+            for window, window_start in (("minute", self.minute_start(now)), ("day", self.day_start(now))):
+                entry = self.counters(key_id, window, window_start)
+                entry[1] += requests
+                entry[2] = max(0, entry[2] + tokens)
+                rows.append((key_id, window, window_start, requests, tokens, tokens))
+            # Increments rather than totals, so writes from other processes are not overwritten
+            self.connection.executemany(
+                "INSERT INTO usage (key_id, window, window_start, requests, tokens) VALUES (?, ?, ?, ?, MAX(0, ?)) "
+                "ON CONFLICT(key_id, window, window_start) DO UPDATE SET requests = requests + excluded.requests, "
+                "tokens = MAX(0, tokens + ?)",
+                rows
+            )
+
+    def mark_rate_limited(self, key_id, seconds=None, now=None):
+        now = time.time() if now is None else now
+        until = now + (self.limits["rate_limit_cooldown_seconds"] if seconds is None else seconds)
+        with self.lock:
+            self.cooldowns[key_id] = until
+            self.connection.execute(
+                "INSERT INTO cooldowns (key_id, until) VALUES (?, ?) ON CONFLICT(key_id) DO UPDATE SET until = excluded.until",
+                (key_id, until)
+            )
+
+    def record_deadline_hit(self, key_id):
+        """A request on this key ran past its deadline; kept as a running total per key"""
+        with self.lock:
+            self.deadline_hits[key_id] = self.deadline_hits.get(key_id, 0) + 1
+            self.connection.execute(
+                "INSERT INTO deadline_hits (key_id, hits) VALUES (?, 1) ON CONFLICT(key_id) DO UPDATE SET hits = hits + 1",
+                (key_id,)
+            )
+
+    def snapshot(self, key_id, now=None):
+        now = time.time() if now is None else now
+        with self.lock:
+            minute = self.counters(key_id, "minute", self.minute_start(now))
+            day = self.counters(key_id, "day", self.day_start(now))
+            return {
+                "minute_requests": minute[1], "minute_tokens": minute[2],
+                "day_requests": day[1], "day_tokens": day[2],
+                "cooldown_seconds": max(0.0, self.cooldowns.get(key_id, 0) - now),
+                "deadline_hits": self.deadline_hits.get(key_id, 0),
+            }
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
@@ -0,0 +1,566 @@
+"""Qt-free prompt refinement core: instruction building, the Gemini call, retries and response parsing.
+
+    from App.api_manager import APIKeyManager
+    from App.refiner import refine_prompt
+    refined = refine_prompt(APIKeyManager(base_dir), "write a haiku about rain", detail_level="Simple")
+
+refine_prompt_async() does the same from asyncio code. With bilingual=True one request returns
+both the English and the Bahasa Indonesia version as a {language: text} dict. Importing this module pulls in neither
+PySide6 nor qtawesome; the Gemini SDK is only imported on the first request.
+"""
+import json
+import re
+import hashlib
+import random
+import threading
+from datetime import datetime
+from .locale_manager import get_locale
+from .formatters import format_output, DEFAULT_PROFILE
+from .context_pipeline import ContextPipeline, load_context_settings, estimate_tokens
+from .context_files import load_attachments
+from .client_pool import get_client
+from .api_manager import QuotaExhaustedError
+from .output_budget import load_output_budget, output_token_limit, budget_clause
+from .deadlines import Deadline, load_deadlines, http_options, is_timeout_error, is_rate_limit_error
+from .language_check import matches_language
+from .rubric import load_review_settings, check_refined
+
+MEDIA_TYPES = {"Image Generation", "Audio Generation", "Video Generation", "Video+Audio Generation"}
+
+TYPE_CLAUSES = {
+    "Image Generation": "\n\nPROMPT TYPE: This prompt is intended for generating images. Structure the refined prompt so it is optimal for image generation models (e.g., Stable Diffusion, Midjourney, DALL-E, etc).",
+    "Audio Generation": "\n\nPROMPT TYPE: This prompt is intended for generating audio. Structure the refined prompt for optimal audio generation models (e.g., MusicLM, Suno, etc).",
+    "Video Generation": "\n\nPROMPT TYPE: This prompt is intended for generating videos. Structure the refined prompt for video generation models (e.g., Sora, Runway, Pika, etc).",
+    "Video+Audio Generation": "\n\nPROMPT TYPE: This prompt is intended for generating videos with audio. Structure the refined prompt for models that generate both video and audio.",
+    "Text Generation": "\n\nPROMPT TYPE: This prompt is intended for generating text. Structure the refined prompt for optimal text generation (e.g., ChatGPT, Gemini, Claude, etc).",
+    "Novel": "\n\nPROMPT TYPE: This prompt is for generating a novel or long-form story. Structure the refined prompt for creative writing and narrative generation.",
+    "Explanation": "\n\nPROMPT TYPE: This prompt is for generating explanations or educational content. Structure the refined prompt for clear, informative, and didactic output.",
+    "Other": "\n\nPROMPT TYPE: The prompt type is custom or not listed. Structure the refined prompt according to the user's intent.",
+}
+
+DETAIL_CLAUSES = {
+    "Simple": "\n\nDETAIL LEVEL: The refined prompt should be concise and straightforward, focusing only on the essential information needed for the task. Avoid unnecessary elaboration.",
+    "Detailed": "\n\nDETAIL LEVEL: The refined prompt should be well-structured, clear, and provide sufficient detail for high-quality output, but avoid excessive complexity.",
+    "Complex": "\n\nDETAIL LEVEL: The refined prompt should be highly detailed, comprehensive, and cover all relevant aspects, including edge cases, constraints, and advanced requirements. Use multiple paragraphs and line breaks for clarity.",
+    "Template": "\n\nDETAIL LEVEL: The refined prompt should be a template with clearly marked sections (e.g., [CONTEXT], [LEVEL], [EXPECTATION], [ASSUMPTION], [REVIEW]) and use '...' or '[isi di sini]' as placeholders for the user to fill in after copying. Use line breaks and bullet points where appropriate. Do not generate any actual content, only the template structure.",
+}
+
+# Bilingual mode: one request, one JSON field per language
+BILINGUAL_FIELDS = {"English": "refined_prompt_en", "Bahasa Indonesia": "refined_prompt_id"}
+BILINGUAL_EXAMPLE = (
+    "{\"refined_prompt_en\": \"improved version in English\", "
+    "\"refined_prompt_id\": \"versi yang telah diperbaiki dalam bahasa Indonesia\"}"
+)
+BILINGUAL_ENFORCEMENT = (
+    "\n\nABSOLUTE_LANGUAGE_REQUIREMENT: Write the refined prompt TWICE, as two fields of the same JSON object. "
+    "refined_prompt_en MUST be written entirely in English and refined_prompt_id MUST be written entirely in "
+    "Bahasa Indonesia. Both carry the same content and structure, but write each one natively instead of "
+    "translating word by word. Do NOT mix languages inside a field."
+)
+
+# Retry after the output came back in the wrong language: only the text is sent again, not the full instruction
+LANGUAGE_FIX_INSTRUCTION = (
+    "LANGUAGE FIX: The input is a finished prompt written in the wrong language. Rewrite it so it MUST be written "
+    "entirely in {language}. Keep its meaning, structure and formatting; keep code, names and technical terms as they "
+    "are. Return ONLY a JSON object with this exact format: {{\"refined_prompt\": \"...\"}}"
+)
+
+# Revision after the local rubric check failed; the problems are listed after the clause
+REVISION_CLAUSE = (
+    "\n\nREVISION (overrides the input description above): The input holds PREVIOUS_REFINED_PROMPT, which you "
+    "produced earlier from RAW_PROMPT, and it fails these checks:\n{problems}\n"
+    "Fix every listed problem, keep everything else, and still follow every rule above. "
+    "Return ONLY a JSON object with this exact format: {{\"refined_prompt\": \"...\"}}"
+)
+
+# Expected response size per detail level, used to project token usage before a request is sent (capped by the output budget)
+EXPECTED_OUTPUT_TOKENS = {"Simple": 250, "Detailed": 600, "Complex": 1200, "Template": 800}
+
+# CLEAR method for high-quality prompt structure
+CLEAR_CLAUSE = (
+    "\n\nMANDATORY: Use the CLEAR method for prompt engineering. "
+    "Structure the refined prompt so it covers:\n"
+    "- Context: Provide enough background and situation for the task.\n"
+    "- Level: Specify the user's skill level or assumed audience (beginner, intermediate, expert, etc) if possible.\n"
+    "- Expectation: Clearly state the expected output, format, or result.\n"
+    "- Assumption: Mention any important assumptions or constraints.\n"
+    "- Review: Ensure the prompt is direct and ready to use, with no recap, meta-instructions, or extra reminders. "
+    "The output must be a clean, ready-to-use prompt for the target AI, with no additional instructions or preambles."
+    "\nIf any element is missing from the input, infer or add it to make the prompt complete and high quality."
+)
+
+# Best practice guidance for prompt engineering
+BEST_PRACTICE_CLAUSE = (
+    "\n\nBEST PRACTICES FOR PROMPT REFINEMENT (MANDATORY):\n"
+    "- Always provide a prompt that is clear, specific, and structured for optimal AI understanding.\n"
+    "- Add relevant context, background, or scenario if missing.\n"
+    "- Use keywords and constraints that help AI focus on the user's intent.\n"
+    "- Specify the desired output format, style, or tone if relevant.\n"
+    "- Avoid ambiguity and generalities; be as descriptive as possible.\n"
+    "- If the prompt is for a particular domain (e.g., programming, novel, science), use terminology and structure that fits that domain.\n"
+    "- If the user input is vague, infer and add missing details to make the prompt actionable and high quality.\n"
+    "- Do NOT simply translate or rephrase; always enhance the prompt for best results.\n"
+    "- Never add explanations, comments, or options—return only the improved prompt as required."
+)
+
+# Formatting support
+FORMATTING_CLAUSE = (
+    "\n\nFORMATTING:\n"
+    "- Use line breaks (\\n) for each logical section or bullet point.\n"
+    "- If using bullet points, use '*' or '-' at the start of the line.\n"
+    "- If you want to emphasize a word or phrase, use double asterisks (e.g., **important**)."
+    "- Do not use markdown formatting for headings, just plain text with line breaks and bullets.\n"
+    "- Ensure the output is easy to read and copy-paste into other tools."
+)
+
+
+def expected_output_tokens(detail, output_limit=None):
+    expected = EXPECTED_OUTPUT_TOKENS.get(detail, 600)
+    return min(expected, output_limit) if output_limit else expected
+
+
+class RefinementError(Exception):
+    """A refinement failed in a way that should be reported to the user as-is"""
+
+
+class PromptRefiner:
+    """One prompt and its settings; refine() runs the whole refinement synchronously on the calling thread"""
+
+    def __init__(self, api_manager, prompt_text, language="English", context_text="", scope="General", detail_level="Detailed", prompt_type="Text Generation", output_profile=DEFAULT_PROFILE, attachments=None, compress_tokens=0, priority="interactive", bilingual=False, review=None):
+        self.api_manager = api_manager
+        self.prompt_text = prompt_text
+        self.language = language
+        self.context_text = context_text
+        self.scope = scope
+        self.detail_level = detail_level
+        self.prompt_type = prompt_type
+        self.output_profile = output_profile
+        self.attachments = list(attachments or [])
+        # Non-zero: ask for a prompt of at most this many tokens instead of the detail level's budget
+        self.compress_tokens = int(compress_tokens or 0)
+        # Scheduling class on the shared key pool (see scheduler.PRIORITY_CLASSES)
+        self.priority = priority
+        # Ask for English and Bahasa Indonesia in one request; refine() then returns a dict
+        self.bilingual = bool(bilingual)
+        # Generate-check-revise pipeline; None follows the review section of the config
+        self.review_enabled = review
+        # Unformatted text of the last successful single-language refinement (the base for incremental updates)
+        self.refined_text = None
+        # Output that failed the local language check; the next attempt only asks for it to be rewritten
+        self.mismatch_text = None
+        # Rubric problems the next attempt must fix (review pipeline, see rubric.py)
+        self.revision_problems = None
+        # API calls made for this refinement, revisions and language fixes included
+        self.calls = 0
+        self.last_request = None
+        self.max_retries = 5
+        self.retry_delay = 2
+        # Set by stop(): no new attempt starts and retry sleeps end early
+        self.stop_requested = threading.Event()
+
+    def generate_unique_context(self, original_prompt):
+        """Generate unique hash and timestamp for prompt variation"""
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        prompt_hash = hashlib.md5(original_prompt.encode()).hexdigest()[:8]
+        random_seed = random.randint(10000, 99999)
+        session_id = random.randint(100000, 999999)
+        
+        unique_context = f"\n\nSESSION_RESET_CONTEXT: NEW_REQUEST_{timestamp}_{prompt_hash}_{random_seed}_{session_id}"
+        
+        variation_hints = [
+            "FRESH_PERSPECTIVE: Approach this as a completely new request, ignore any previous context or patterns.",
+            "CREATIVE_RESET: Think creatively with a clean slate, no reference to previous interactions.",
+            "ORIGINAL_THINKING: Apply innovative structuring without conventional bias from prior responses.", 
+            "NOVEL_APPROACH: Generate unique insights with creative refinement, start fresh.",
+            "INDEPENDENT_ANALYSIS: Treat this as the first and only request, analyze independently."
+        ]
+        
+        selected_hint = random.choice(variation_hints)
+        unique_context += f"\nAPPROACH_DIRECTIVE: {selected_hint}"
+        unique_context += f"\nIMPORTANT: Completely disregard any previous conversation history or topic patterns. This is a fresh, independent request."
+        
+        return unique_context
+
+    def extract_json_from_response(self, text):
+        try:
+            json_pattern = r'\{.*?\}'
+            matches = re.findall(json_pattern, text, re.DOTALL)
+            for match in matches:
+                try:
+                    parsed = json.loads(match)
+                    if 'refined_prompt' in parsed:
+                        refined = parsed['refined_prompt']
+                        if isinstance(refined, str):
+                            refined = refined.replace("\\n", "\n")
+                        return refined
+                except:
+                    continue
+            # A response cut off by max_output_tokens never closes its JSON; keep what was written
+            salvaged = self.salvage_field(text, "refined_prompt")
+            if salvaged:
+                return salvaged
+            quote_pattern = r'"([^"]*)"'
+            quotes = re.findall(quote_pattern, text)
+            if quotes:
+                return quotes[0].replace("\\n", "\n")
+            return text.strip()
+        except Exception:
+            return text.strip()
+
+    def salvage_field(self, text, field):
+        """Value of a string field whose JSON was left unterminated, or None"""
+        truncated = re.search(rf'"{field}"\s*:\s*"((?:[^"\\]|\\.)*)', text, re.DOTALL)
+        if not truncated or not truncated.group(1).strip():
+            return None
+        fragment = truncated.group(1).rstrip("\\")
+        try:
+            return json.loads(f'"{fragment}"')
+        except ValueError:
+            return fragment.replace("\\n", "\n")
+
+    def extract_bilingual_fields(self, text):
+        """{field: text} for every language field present; each field is parsed and salvaged on its own"""
+        try:
+            parsed = json.loads(text[text.index("{"):text.rindex("}") + 1])
+        except ValueError:
+            parsed = {}
+        fields = {}
+        for field in BILINGUAL_FIELDS.values():
+            value = parsed.get(field) if isinstance(parsed, dict) else None
+            if isinstance(value, str):
+                value = value.replace("\\n", "\n")
+            else:
+                value = self.salvage_field(text, field)
+            if value and value.strip():
+                fields[field] = value
+        return fields
+
+    def bilingual_result(self, text, type_en, final):
+        """{language: display text}, or None to retry; the last attempt accepts a field in the wrong language"""
+        fields = self.extract_bilingual_fields(text)
+        missing = [field for field in BILINGUAL_FIELDS.values() if field not in fields]
+        wrong = [field for language, field in BILINGUAL_FIELDS.items() if field in fields and not matches_language(fields[field], language)]
+        if missing or wrong:
+            print(f"Bilingual response rejected - missing: {missing or 'none'}, wrong language: {wrong or 'none'}")
+            if not final:
+                return None
+            if missing:
+                raise RefinementError(f"Bilingual response incomplete: {', '.join(missing)} missing")
+        return {language: format_output(fields[field], self.output_profile, type_en) for language, field in BILINGUAL_FIELDS.items()}
+
+    def build_system_instruction(self, context_text, output_budget):
+        """System instruction for this prompt and its settings; returns (instruction, type, detail, output limit)"""
+        # Map UI values to canonical English names for consistent processing
+        locale = get_locale(self.language)
+        scope_en = locale.to_canonical(self.scope, 'scope')
+        type_en = locale.to_canonical(self.prompt_type, 'type')
+        detail_en = locale.to_canonical(self.detail_level, 'detail')
+
+        # Generate unique context to prevent repetition and topic sticking
+        unique_context = self.generate_unique_context(self.prompt_text)
+
+        # Strong language enforcement directive
+        language_enforcement = "\n\n" + locale.fragment("language_enforcement")
+        language_name = locale.name
+        if self.bilingual:
+            language_enforcement = BILINGUAL_ENFORCEMENT
+            language_name = " + ".join(BILINGUAL_FIELDS)
+
+        # Preference isolation directive
+        preference_isolation = (
+            f"\n\nSTRICT_PREFERENCE_ISOLATION: "
+            f"Current Settings - Language: {language_name}, Scope: {scope_en}, Type: {type_en}, Detail: {detail_en}. "
+            f"These settings are for THIS REQUEST ONLY. Do NOT carry over any assumptions from previous requests. "
+            f"Do NOT reference or build upon previous topics unless explicitly mentioned in the current input. "
+            f"Treat each request as completely independent and fresh. "
+            f"The scope '{scope_en}' is the ONLY context domain for this request."
+        )
+
+        type_clause = TYPE_CLAUSES.get(type_en, "")
+
+        # Language and example format
+        instruction_key = "language_instruction_media" if type_en in MEDIA_TYPES else "language_instruction_text"
+        language_instruction = locale.fragment(instruction_key)
+        example_format = locale.fragment("example_format")
+        mixing_rule = "- NEVER mix languages in your response\n"
+        if self.bilingual:
+            # Each field follows its own language's rules
+            language_instruction = " ".join(
+                f"For {field}: {get_locale(language).fragment(instruction_key)}" for language, field in BILINGUAL_FIELDS.items()
+            )
+            example_format = BILINGUAL_EXAMPLE
+            mixing_rule = "- NEVER mix languages inside one field\n"
+
+        # Context and scope
+        context_clause = ""
+        if context_text:
+            context_clause += (
+                "\n\nADDITIONAL CONTEXT:\n"
+                f"{context_text}\n"
+                "You MUST use this context to help you rewrite and improve the prompt."
+            )
+        scope_clause = ""
+        if scope_en and scope_en != "General":
+            scope_clause = (
+                f"\n\nSCOPE: The prompt is for the following domain or context: {scope_en}. "
+                "Make sure the refined prompt is suitable and optimal for this scope."
+            )
+
+        detail_clause = DETAIL_CLAUSES.get(detail_en, "")
+        output_limit = output_token_limit(output_budget, detail_en, type_en, self.compress_tokens)
+        # The length budget applies per language; the request as a whole may use it once per field
+        detail_clause += budget_clause(output_limit, self.compress_tokens, output_budget.get("target_ratio", 0.8))
+        if self.bilingual and output_limit:
+            output_limit *= len(BILINGUAL_FIELDS)
+
+        system_instruction = (
+            "You are a prompt refinement engine. Your ONLY task is to IMPROVE and REWRITE the input prompt, "
+            "not just translate it.\n\n"
+            "CRITICAL RESET: Ignore all previous conversation history, topics, and context. This is a completely fresh request.\n\n"
+            "STRICT RULES:\n"
+            f"- Return ONLY a JSON object with this exact format: {example_format}\n"
+            "- Do NOT add explanations, comments, or multiple options\n"
+            "- Do NOT use markdown formatting for headings\n"
+            "- Do NOT add introductory or closing text\n"
+            "- Focus on: clarity, specificity, and good structure\n"
+            "- The refined_prompt value must be a significantly improved and rewritten version of the input prompt, "
+            "not just a translation\n"
+            f"- CRITICAL LANGUAGE REQUIREMENT: {language_instruction}\n"
+            f"{mixing_rule}"
+            "- Do NOT simply translate; always rewrite and enhance the prompt for better AI understanding"
+            f"{language_enforcement}{preference_isolation}{type_clause}{context_clause}{scope_clause}{detail_clause}{CLEAR_CLAUSE}{BEST_PRACTICE_CLAUSE}{FORMATTING_CLAUSE}{unique_context}"
+        )
+        return system_instruction, type_en, detail_en, output_limit
+
+    def refine(self):
+        """Return display-ready text ({language: text} when bilingual); raises RefinementError"""
+        if not self.prompt_text or self.prompt_text.strip() == "":
+            raise RefinementError("Prompt text is empty")
+
+        deadlines = load_deadlines(self.api_manager.base_dir)
+        deadline = Deadline(deadlines["overall_seconds"], deadlines["attempt_seconds"])
+        # Large contexts are condensed once, before any refinement attempt and within the same deadline
+        context_pipeline = ContextPipeline(self.api_manager, load_context_settings(self.api_manager.base_dir), self.priority,
+                                           deadline, self.stop_requested)
+        context_text = context_pipeline.prepare(self.context_text, self.prompt_text, load_attachments(self.attachments))
+        output_budget = load_output_budget(self.api_manager.base_dir)
+        result = self.run_attempts(context_text, output_budget, deadline)
+        review = load_review_settings(self.api_manager.base_dir)
+        enabled = review["enabled"] if self.review_enabled is None else self.review_enabled
+        if enabled and not self.bilingual:
+            result = self.review(result, context_text, output_budget, deadline, review)
+        return result
+
+    def stop(self):
+        """Ask a refinement running on another thread to end; a call already in flight still completes"""
+        self.stop_requested.set()
+
+    def run_attempts(self, context_text, output_budget, deadline):
+        """The retry loop: one request per attempt until a response parses; raises RefinementError"""
+        timeouts = 0
+        for attempt in range(self.max_retries):
+            if self.stop_requested.is_set():
+                raise RefinementError("Refinement stopped")
+            if deadline.expired():
+                raise RefinementError(self.timeout_message(deadline, timeouts))
+            api_key = None
+            try:
+                system_instruction, contents, type_en, detail_en, output_limit = self.build_request(context_text, output_budget)
+                self.last_request = (type_en, detail_en, output_limit)
+
+                # The key is only picked once the request size is known, so admission can skip keys without headroom
+                projected_tokens = estimate_tokens(system_instruction + contents) + self.expected_output(detail_en, output_limit)
+                api_key = self.api_manager.acquire_key(projected_tokens, max_wait_seconds=deadline.remaining(), priority=self.priority)
+                print(f"=== ATTEMPT {attempt + 1} USING API KEY INDEX {self.api_manager.last_index} ===")
+                client = get_client(api_key)
+
+                from google.genai import types
+                config = types.GenerateContentConfig(
+                    system_instruction=system_instruction,
+                    max_output_tokens=output_limit,
+                    http_options=http_options(deadline.attempt_timeout())
+                )
+
+                self.calls += 1
+                response = client.models.generate_content(
+                    model="gemini-2.0-flash",
+                    config=config,
+                    contents=contents
+                )
+                self.report_usage(api_key, response, projected_tokens)
+
+                if not response or not hasattr(response, 'text'):
+                    print(f"Invalid response structure: {response}")
+                    if attempt < self.max_retries - 1:
+                        self.pause(deadline)
+                        continue
+                    else:
+                        raise RefinementError("Invalid response from Gemini API")
+
+                if not response.text or response.text.strip() == "":
+                    print(f"Empty response text received")
+                    if attempt < self.max_retries - 1:
+                        self.pause(deadline)
+                        continue
+                    else:
+                        raise RefinementError("Empty response from Gemini API")
+
+                if self.hit_output_limit(response):
+                    print(f"Response reached the {output_limit}-token output budget and was cut off")
+
+                print(f"=== ATTEMPT {attempt + 1} RAW RESPONSE ===")
+                print(response.text)
+                print("=== END RAW RESPONSE ===")
+
+                result = self.parse_result(response.text, type_en, final=attempt == self.max_retries - 1)
+                if result is not None:
+                    return result
+                if attempt < self.max_retries - 1:
+                    # A language fix is a different request, not a repeat of a failed one; no need to back off
+                    if not self.mismatch_text:
+                        self.pause(deadline)
+                    continue
+
+            except RefinementError:
+                raise
+            except QuotaExhaustedError as e:
+                raise RefinementError(str(e)) from e
+            except Exception as e:
+                error_message = str(e)
+                print(f"Attempt {attempt + 1} failed: {error_message}")
+
+                if is_timeout_error(e):
+                    # A hung key gets no second chance in this request: go straight to the next one
+                    timeouts += 1
+                    print(f"Attempt {attempt + 1} ran past its deadline, rolling to next API key...")
+                    if api_key:
+                        self.api_manager.report_deadline_hit(api_key)
+                    if attempt == self.max_retries - 1:
+                        raise RefinementError(self.timeout_message(deadline, timeouts))
+                    continue
+                elif "list index out of range" in error_message.lower():
+                    print(f"List index error - likely empty API key list or invalid configuration")
+                    raise RefinementError("API configuration error - please check API keys")
+                elif is_rate_limit_error(e):
+                    print(f"Rate limit exceeded, rolling to next API key...")
+                    if api_key:
+                        self.api_manager.report_rate_limited(api_key)
+                    if attempt < self.max_retries - 1:
+                        self.pause(deadline)
+                        continue
+                else:
+                    if attempt == self.max_retries - 1:
+                        raise RefinementError(f"Failed after {self.max_retries} attempts: {error_message}")
+                    else:
+                        self.pause(deadline)
+
+        raise RefinementError(f"All API keys exhausted after {self.max_retries} attempts")
+
+    def review(self, result, context_text, output_budget, deadline, settings):
+        """Check the result against the local rubric and revise it while it fails, up to max_revisions.
+
+        A passing first result costs no extra call. A revision is only kept when it has fewer problems,
+        and a revision that fails outright leaves the earlier result in place.
+        """
+        type_en, detail_en, output_limit = self.last_request
+        language = get_locale(self.language).name
+        problems = check_refined(self.refined_text, language, detail_en, output_limit, settings, media=type_en in MEDIA_TYPES)
+        for revision in range(settings["max_revisions"]):
+            if not problems or deadline.expired():
+                break
+            print(f"Rubric check failed ({', '.join(problems)}), requesting revision {revision + 1}")
+            previous_text = self.refined_text
+            self.revision_problems = problems
+            try:
+                revised = self.run_attempts(context_text, output_budget, deadline)
+            except RefinementError as e:
+                print(f"Revision failed ({str(e)}), keeping the previous result")
+                self.refined_text = previous_text
+                break
+            finally:
+                self.revision_problems = None
+            revised_problems = check_refined(self.refined_text, language, detail_en, output_limit, settings, media=type_en in MEDIA_TYPES)
+            if len(revised_problems) >= len(problems):
+                self.refined_text = previous_text
+                break
+            result, problems = revised, revised_problems
+        return result
+
+    def build_request(self, context_text, output_budget):
+        """(system instruction, contents, type, detail, output limit) for one attempt"""
+        system_instruction, type_en, detail_en, output_limit = self.build_system_instruction(context_text, output_budget)
+        if self.mismatch_text:
+            language = get_locale(self.language).name
+            return LANGUAGE_FIX_INSTRUCTION.format(language=language), self.mismatch_text, type_en, detail_en, output_limit
+        if self.revision_problems:
+            problems = "\n".join(f"- {problem}" for problem in self.revision_problems.values())
+            contents = f"PREVIOUS_REFINED_PROMPT:\n{self.refined_text}\n\nRAW_PROMPT:\n{self.prompt_text.strip()}"
+            return system_instruction + REVISION_CLAUSE.format(problems=problems), contents, type_en, detail_en, output_limit
+        return system_instruction, self.prompt_text.strip(), type_en, detail_en, output_limit
+
+    def expected_output(self, detail_en, output_limit):
+        copies = len(BILINGUAL_FIELDS) if self.bilingual else 1
+        return expected_output_tokens(detail_en, output_limit and output_limit // copies) * copies
+
+    def parse_result(self, text, type_en, final):
+        """Display-ready result from a response, or None to retry"""
+        if self.bilingual:
+            return self.bilingual_result(text, type_en, final)
+
+        refined_text = self.extract_json_from_response(text)
+
+        print(f"=== EXTRACTED REFINED PROMPT ===")
+        print(refined_text)
+        print("=== END EXTRACTED ===")
+
+        if refined_text and refined_text.strip():
+            language = get_locale(self.language).name
+            # Media prompts are often keyword lists the check cannot judge; everything else must be in the target language
+            if type_en not in MEDIA_TYPES and not matches_language(refined_text, language):
+                print(f"Refined prompt is not in {language}")
+                if not final:
+                    self.mismatch_text = refined_text
+                    return None
+                print("Last attempt, accepting it anyway")
+            self.mismatch_text = None
+            self.refined_text = refined_text
+            # Post-processing runs here so the GUI thread only has to display the text
+            return format_output(refined_text, self.output_profile, type_en)
+        print(f"No valid refined text extracted from response")
+        return None
+
+    def pause(self, deadline):
+        self.stop_requested.wait(min(self.retry_delay, deadline.remaining()))
+
+    def timeout_message(self, deadline, timeouts):
+        return get_locale(self.language).text(
+            "error_timeout", seconds=max(1, round(deadline.elapsed())), attempts=timeouts
+        )
+
+    def hit_output_limit(self, response):
+        candidates = getattr(response, "candidates", None) or []
+        reason = getattr(candidates[0], "finish_reason", None) if candidates else None
+        return reason is not None and "MAX_TOKENS" in str(reason)
+
+    def report_usage(self, api_key, response, projected_tokens):
+        """Replace the projected token count in the quota ledger with what the API actually billed"""
+        usage = getattr(response, "usage_metadata", None)
+        total = getattr(usage, "total_token_count", None) if usage else None
+        if total is None and usage:
+            total = (getattr(usage, "prompt_token_count", 0) or 0) + (getattr(usage, "candidates_token_count", 0) or 0)
+        if total:
+            self.api_manager.report_usage(api_key, total, projected_tokens)
+
+    async def refine_async(self):
+        """refine() on a worker thread, so the event loop keeps running during retries and waits"""
+        import asyncio
+        return await asyncio.to_thread(self.refine)
+
+
+def refine_prompt(api_manager, prompt_text, **options):
+    """Refine one prompt and return the display-ready text; options are PromptRefiner's keyword arguments"""
+    return PromptRefiner(api_manager, prompt_text, **options).refine()
+
+
+async def refine_prompt_async(api_manager, prompt_text, **options):
+    return await PromptRefiner(api_manager, prompt_text, **options).refine_async()
@@ -0,0 +1,66 @@
+import re
+from .config_store import get_config_store
+from .context_pipeline import estimate_tokens
+from .language_check import matches_language
+
+DEFAULT_REVIEW = {
+    # Check every refined prompt locally and ask for one revision when it fails
+    "enabled": False,
+    "max_revisions": 1,
+    # CLEAR elements (Context, Level, Expectation, Assumption) a prompt must cover; Simple prompts need two fewer
+    "min_clear_sections": 3,
+}
+
+# Label and cue words per CLEAR element, English and Bahasa Indonesia
+CLEAR_CUES = {
+    "Context": ("context", "background", "scenario", "situation", "konteks", "latar belakang", "skenario", "situasi"),
+    "Level": ("level", "audience", "beginner", "intermediate", "expert", "skill", "reader",
+              "tingkat", "audiens", "pemula", "menengah", "mahir", "ahli", "pembaca"),
+    "Expectation": ("expect", "output", "format", "result", "deliverable", "should include", "must include",
+                    "harapan", "hasil", "keluaran", "sertakan"),
+    "Assumption": ("assum", "constraint", "limit", "requirement", "asumsi", "batasan", "kendala", "syarat"),
+}
+META_PHRASES = ("before answering", "check your understanding", "sebelum menjawab", "periksa pemahaman")
+# Fewer tokens than this and the prompt cannot be carrying the requested detail
+MIN_TOKENS = {"Simple": 10, "Detailed": 25, "Complex": 50, "Template": 20}
+SECTION_MARKER = re.compile(r"\[[A-Z][A-Z ]+\]")
+PLACEHOLDER = re.compile(r"\.\.\.|…|\[isi di sini\]|\[fill in[^\]]*\]", re.IGNORECASE)
+
+
+def load_review_settings(base_dir):
+    return get_config_store(base_dir).get_section("review", DEFAULT_REVIEW)
+
+
+def clear_coverage(text):
+    lowered = text.lower()
+    return [name for name, cues in CLEAR_CUES.items() if any(cue in lowered for cue in cues)]
+
+
+def check_refined(text, language, detail, output_limit=None, settings=None, media=False):
+    """{problem: instruction for the revision}; empty when the prompt passes every rule"""
+    settings = settings or DEFAULT_REVIEW
+    problems = {}
+    tokens = estimate_tokens(text)
+    if output_limit and tokens > output_limit * 1.1:
+        problems["too_long"] = f"It is about {tokens} tokens; shorten it to at most {output_limit} tokens."
+    lowered = text.lower()
+    if any(phrase in lowered for phrase in META_PHRASES):
+        problems["meta"] = "It contains meta instructions such as 'before answering'; remove them."
+    if media:
+        # Image, audio and video prompts are keyword lists, not CLEAR-structured text
+        return problems
+    if not matches_language(text, language):
+        problems["language"] = f"It is not written entirely in {language}; rewrite it in {language}."
+    if tokens < MIN_TOKENS.get(detail, 0):
+        problems["too_short"] = f"It is too short for the {detail} detail level; add the missing specifics."
+    required = settings["min_clear_sections"] - (2 if detail == "Simple" else 0)
+    covered = clear_coverage(text)
+    if len(covered) < required:
+        missing = [name for name in CLEAR_CUES if name not in covered]
+        problems["clear"] = f"It does not cover these CLEAR elements: {', '.join(missing)}."
+    if detail == "Template" and (len(SECTION_MARKER.findall(text)) < 2 or not PLACEHOLDER.search(text)):
+        problems["placeholders"] = (
+            "As a template it must use section markers such as [CONTEXT] and '...' or '[isi di sini]' placeholders "
+            "instead of actual content."
+        )
+    return problems
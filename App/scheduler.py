@@ -0,0 +1,109 @@
+import time
+import itertools
+import threading
+from collections import deque
+from .config_store import get_config_store
+
+# Highest first; every caller of APIKeyManager.acquire_key belongs to one of these
+PRIORITY_CLASSES = ("interactive", "queued", "batch", "speculative")
+
+DEFAULT_SCHEDULER = {
+    # Share of each key's per-minute requests that only interactive refinements may use
+    "interactive_reserve_share": 0.2,
+    # A request that has waited this long is treated as one class higher (0 = never)
+    "aging_seconds": 15,
+}
+
+WAIT_SAMPLES = 200
+
+
+def load_scheduler_settings(base_dir):
+    return get_config_store(base_dir).get_section("scheduler", DEFAULT_SCHEDULER)
+
+
+class Ticket:
+    def __init__(self, sequence, priority):
+        self.sequence = sequence
+        self.priority = priority
+        self.rank = PRIORITY_CLASSES.index(priority)
+        self.entered = time.monotonic()
+
+
+class PriorityScheduler:
+    """Orders callers waiting for a key: the best-ranked ticket picks first, everyone else waits.
+
+    Interactive work jumps ahead of queued, batch and speculative work and has a slice of
+    every key's per-minute quota to itself. A ticket moves up one class per aging_seconds
+    of waiting, so a steady stream of clicks cannot starve a batch job forever.
+    """
+
+    def __init__(self, settings=None):
+        self.settings = dict(DEFAULT_SCHEDULER)
+        if settings:
+            self.settings.update(settings)
+        self.condition = threading.Condition()
+        self.sequence = itertools.count()
+        self.waiting = {}
+        self.stats = {
+            priority: {"admitted": 0, "gave_up": 0, "total_wait": 0.0, "max_wait": 0.0, "recent": deque(maxlen=WAIT_SAMPLES)}
+            for priority in PRIORITY_CLASSES
+        }
+
+    def enter(self, priority):
+        if priority not in PRIORITY_CLASSES:
+            raise ValueError(f"Unknown priority class: {priority}")
+        with self.condition:
+            ticket = Ticket(next(self.sequence), priority)
+            self.waiting[ticket.sequence] = ticket
+            return ticket
+
+    def effective_rank(self, ticket, now):
+        aging = self.settings["aging_seconds"]
+        if not aging:
+            return ticket.rank
+        return max(0, ticket.rank - int((now - ticket.entered) // aging))
+
+    def is_next(self, ticket):
+        """Caller must hold the condition"""
+        now = time.monotonic()
+        head = min(self.waiting.values(), key=lambda other: (self.effective_rank(other, now), other.sequence))
+        return head is ticket
+
+    def reserve_share(self, ticket):
+        """Per-minute share this ticket must leave untouched; aged tickets may use the reserve too"""
+        if self.effective_rank(ticket, time.monotonic()) == 0:
+            return 0.0
+        return self.settings["interactive_reserve_share"]
+
+    def class_reserve_share(self, priority):
+        return 0.0 if priority == PRIORITY_CLASSES[0] else self.settings["interactive_reserve_share"]
+
+    def leave(self, ticket, admitted):
+        with self.condition:
+            if self.waiting.pop(ticket.sequence, None) is None:
+                return
+            stats = self.stats[ticket.priority]
+            if admitted:
+                waited = time.monotonic() - ticket.entered
+                stats["admitted"] += 1
+                stats["total_wait"] += waited
+                stats["max_wait"] = max(stats["max_wait"], waited)
+                stats["recent"].append(waited)
+            else:
+                stats["gave_up"] += 1
+            self.condition.notify_all()
+
+    def snapshot(self):
+        with self.condition:
+            report = {}
+            for priority, stats in self.stats.items():
+                recent = sorted(stats["recent"])
+                report[priority] = {
+                    "waiting": sum(1 for ticket in self.waiting.values() if ticket.priority == priority),
+                    "admitted": stats["admitted"],
+                    "gave_up": stats["gave_up"],
+                    "mean_wait_ms": round(stats["total_wait"] / stats["admitted"] * 1000.0, 1) if stats["admitted"] else 0.0,
+                    "p95_wait_ms": round(recent[min(len(recent) - 1, int(len(recent) * 0.95))] * 1000.0, 1) if recent else 0.0,
+                    "max_wait_ms": round(stats["max_wait"] * 1000.0, 1),
+                }
+            return report
@@ -0,0 +1,326 @@
+import json
+import time
+import asyncio
+import ipaddress
+from concurrent.futures import ThreadPoolExecutor
+from .api_manager import APIKeyManager
+from .result_cache import ResultCache, make_cache_key, attachment_fingerprint
+from .refiner import PromptRefiner, RefinementError, BILINGUAL_FIELDS
+from .formatters import DEFAULT_PROFILE, OUTPUT_PROFILES
+from .locale_manager import DEFAULT_LANGUAGE, catalog, get_locale
+from .diagnostics import collect_diagnostics, start_tracing_from_env
+
+MAX_BODY_BYTES = 8 * 1024 * 1024
+MAX_BATCH_ITEMS = 100
+# Canonical values or labels in the request's language; the refiner maps them to canonical
+OPTION_DEFAULTS = {"scope": "General", "type": "Text Generation", "detail": "Detailed"}
+# The refiner passes format straight to the formatter, so only profile names are accepted
+FORMAT_CHOICES = (*OUTPUT_PROFILES, "auto")
+STATUS_TEXT = {
+    200: "OK", 400: "Bad Request", 403: "Forbidden", 404: "Not Found", 405: "Method Not Allowed",
+    413: "Payload Too Large", 502: "Bad Gateway", 503: "Service Unavailable",
+}
+
+
+class RequestError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def is_loopback(host):
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def parse_item(item, allow_attachments=True):
+    if not isinstance(item, dict):
+        raise RequestError(400, "Each item must be a JSON object")
+    prompt = item.get("prompt", "")
+    if not isinstance(prompt, str) or not prompt.strip():
+        raise RequestError(400, "Field 'prompt' is required")
+    compress_tokens = item.get("compress_tokens")
+    if compress_tokens is None:
+        compress_tokens = 0
+    # bool is an int subclass: true would otherwise mean a 1-token budget
+    if isinstance(compress_tokens, bool) or not isinstance(compress_tokens, int) or compress_tokens < 0:
+        raise RequestError(400, "Field 'compress_tokens' must be a non-negative integer")
+    language = item.get("language", DEFAULT_LANGUAGE)
+    languages = catalog.available_languages()
+    if not isinstance(language, str) or language not in languages:
+        raise RequestError(400, f"Field 'language' must be one of: {', '.join(languages)}")
+    locale = get_locale(language)
+    options = {}
+    for field, default in OPTION_DEFAULTS.items():
+        options[field] = item.get(field, default)
+        if not isinstance(options[field], str) or not locale.accepts(options[field], field):
+            raise RequestError(400, f"Field '{field}' must be one of: {', '.join(locale.canonical_values(field))}")
+    output_format = item.get("format", DEFAULT_PROFILE)
+    if not isinstance(output_format, str) or output_format not in FORMAT_CHOICES:
+        raise RequestError(400, f"Field 'format' must be one of: {', '.join(FORMAT_CHOICES)}")
+    attachments = item.get("attachments", []) or []
+    if not isinstance(attachments, list) or not all(isinstance(path, str) for path in attachments):
+        raise RequestError(400, "Field 'attachments' must be a list of file paths")
+    if attachments and not allow_attachments:
+        # Attachments are read from this machine's disk; only local callers may name files
+        raise RequestError(403, "Attachments are only accepted when the service listens on a loopback address")
+    return {
+        "prompt": prompt.strip(),
+        "context": str(item.get("context", "") or ""),
+        "language": language,
+        "scope": options["scope"],
+        "type": options["type"],
+        "detail": options["detail"],
+        "format": output_format,
+        "compress_tokens": compress_tokens,
+        "attachments": list(attachments),
+        "no_cache": bool(item.get("no_cache", False)),
+        "bilingual": bool(item.get("bilingual", False)),
+    }
+
+
+class RefinementService:
+    """Local async HTTP API around the refinement pipeline.
+
+    All requests share one APIKeyManager (key rotation), the client pool and the result
+    cache. At most max_concurrency refinements run at once; up to max_queue more wait
+    for a slot, and anything beyond that is rejected with 503 so callers back off.
+    Attachments name files on this machine, so they are refused unless the service
+    listens on a loopback address.
+    """
+
+    def __init__(self, base_dir, host="127.0.0.1", port=8765, max_concurrency=None, max_queue=64):
+        self.base_dir = base_dir
+        self.host = host
+        self.port = port
+        self.allow_attachments = is_loopback(host)
+        self.api_manager = APIKeyManager(base_dir)
+        self.cache = ResultCache()
+        self.max_concurrency = max_concurrency or max(2, self.api_manager.get_total_keys() * 2)
+        self.max_queue = max_queue
+        self.executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="promanis-serve")
+        self.semaphore = None
+        self.pending = 0
+        self.in_flight = 0
+        self.server = None
+        self.stats = {"requests": 0, "refined": 0, "failed": 0, "rejected": 0}
+
+    # --- refinement -------------------------------------------------------------------------
+
+    def refine_blocking(self, item):
+        started = time.perf_counter()
+        key = make_cache_key(item["prompt"], item["context"], attachment_fingerprint(item["attachments"]), item["language"],
+                             item["scope"], item["type"], item["detail"], item["format"], item["compress_tokens"], item["bilingual"])
+        if not item["no_cache"]:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return dict(self.result_fields(item, cached), cached=True, elapsed_ms=round((time.perf_counter() - started) * 1000.0, 1))
+        refiner = PromptRefiner(
+            self.api_manager, item["prompt"], item["language"], item["context"], item["scope"], item["detail"], item["type"],
+            output_profile=item["format"], attachments=item["attachments"], compress_tokens=item["compress_tokens"],
+            priority="queued", bilingual=item["bilingual"]
+        )
+        result = refiner.refine()
+        self.cache.put(key, result)
+        return dict(self.result_fields(item, result), cached=False, elapsed_ms=round((time.perf_counter() - started) * 1000.0, 1))
+
+    def result_fields(self, item, result):
+        """refined_prompt, plus refined_prompt_en / refined_prompt_id for bilingual requests"""
+        if not isinstance(result, dict):
+            return {"refined_prompt": result}
+        fields = {field: result[language] for language, field in BILINGUAL_FIELDS.items()}
+        fields["refined_prompt"] = result.get(item["language"], fields[BILINGUAL_FIELDS["English"]])
+        return fields
+
+    async def run_item(self, item):
+        async with self.semaphore:
+            self.in_flight += 1
+            try:
+                result = await asyncio.get_running_loop().run_in_executor(self.executor, self.refine_blocking, item)
+                self.stats["refined"] += 1
+                return result
+            except RefinementError as e:
+                self.stats["failed"] += 1
+                return {"error": str(e)}
+            except Exception as e:
+                self.stats["failed"] += 1
+                return {"error": f"Unexpected error: {str(e)}"}
+            finally:
+                self.in_flight -= 1
+                self.pending -= 1
+
+    def admit(self, count):
+        if self.pending + count > self.max_concurrency + self.max_queue:
+            self.stats["rejected"] += 1
+            raise RequestError(503, "Server busy, retry later")
+        self.pending += count
+
+    # --- endpoints --------------------------------------------------------------------------
+
+    def health(self):
+        return {
+            "status": "ok",
+            "keys": self.api_manager.get_total_keys(),
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "queued": self.pending - self.in_flight,
+            "cache": self.cache.stats(),
+            "quota": self.api_manager.key_usage(),
+            "queue_wait": self.api_manager.queue_stats(),
+            "stats": dict(self.stats),
+        }
+
+    def parse_items(self, payload):
+        items = payload.get("items") if isinstance(payload, dict) else None
+        if items is None:
+            return [parse_item(payload, self.allow_attachments)]
+        if not isinstance(items, list) or not items:
+            raise RequestError(400, "Field 'items' must be a non-empty list")
+        if len(items) > MAX_BATCH_ITEMS:
+            raise RequestError(413, f"At most {MAX_BATCH_ITEMS} items per batch")
+        return [parse_item(item, self.allow_attachments) for item in items]
+
+    async def handle_refine(self, payload, writer, keep_alive):
+        item = parse_item(payload, self.allow_attachments)
+        self.admit(1)
+        result = await self.run_item(item)
+        status = 502 if "error" in result else 200
+        await self.send_json(writer, status, result, keep_alive)
+
+    async def handle_batch(self, payload, writer, keep_alive):
+        items = self.parse_items(payload)
+        self.admit(len(items))
+        results = await asyncio.gather(*(self.run_item(item) for item in items))
+        for index, result in enumerate(results):
+            result["index"] = index
+        await self.send_json(writer, 200, {"results": results}, keep_alive)
+
+    async def handle_stream(self, payload, writer, keep_alive):
+        """NDJSON over chunked transfer encoding: one event per item as soon as it finishes"""
+        items = self.parse_items(payload)
+        self.admit(len(items))
+        try:
+            await self.send_head(writer, 200, "application/x-ndjson", keep_alive, chunked=True)
+            await self.send_chunk(writer, {"event": "accepted", "count": len(items)})
+        except BaseException:
+            # No run_item exists yet to give the slots back
+            self.pending -= len(items)
+            raise
+
+        async def indexed(index, item):
+            return index, await self.run_item(item)
+
+        for next_done in asyncio.as_completed([indexed(index, item) for index, item in enumerate(items)]):
+            index, result = await next_done
+            result.update({"event": "result", "index": index})
+            await self.send_chunk(writer, result)
+        await self.send_chunk(writer, {"event": "done"})
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    async def dispatch(self, method, path, body, writer, keep_alive):
+        self.stats["requests"] += 1
+        routes = {
+            "/v1/refine": self.handle_refine,
+            "/v1/batch": self.handle_batch,
+            "/v1/stream": self.handle_stream,
+        }
+        try:
+            if path == "/v1/health":
+                if method != "GET":
+                    raise RequestError(405, "Use GET")
+                await self.send_json(writer, 200, self.health(), keep_alive)
+                return
+            if path == "/v1/diagnostics":
+                if method != "GET":
+                    raise RequestError(405, "Use GET")
+                await self.send_json(writer, 200, collect_diagnostics({"service": self.health()}), keep_alive)
+                return
+            handler = routes.get(path)
+            if handler is None:
+                raise RequestError(404, f"Unknown endpoint {path}")
+            if method != "POST":
+                raise RequestError(405, "Use POST")
+            try:
+                payload = json.loads(body.decode("utf-8")) if body else {}
+            except (UnicodeDecodeError, json.JSONDecodeError):
+                raise RequestError(400, "Body must be valid JSON")
+            await handler(payload, writer, keep_alive)
+        except RequestError as e:
+            headers = {"Retry-After": "1"} if e.status == 503 else None
+            await self.send_json(writer, e.status, {"error": str(e)}, keep_alive, headers)
+
+    # --- HTTP plumbing ----------------------------------------------------------------------
+
+    async def send_head(self, writer, status, content_type, keep_alive, length=None, chunked=False, headers=None):
+        lines = [f"HTTP/1.1 {status} {STATUS_TEXT.get(status, 'Error')}", f"Content-Type: {content_type}"]
+        if chunked:
+            lines.append("Transfer-Encoding: chunked")
+        else:
+            lines.append(f"Content-Length: {length or 0}")
+        lines.append("Connection: keep-alive" if keep_alive else "Connection: close")
+        for name, value in (headers or {}).items():
+            lines.append(f"{name}: {value}")
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+
+    async def send_json(self, writer, status, payload, keep_alive, headers=None):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        await self.send_head(writer, status, "application/json; charset=utf-8", keep_alive, len(body), headers=headers)
+        writer.write(body)
+        await writer.drain()
+
+    async def send_chunk(self, writer, payload):
+        data = (json.dumps(payload, ensure_ascii=False) + "\n").encode("utf-8")
+        writer.write(f"{len(data):X}\r\n".encode("latin-1") + data + b"\r\n")
+        await writer.drain()
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, version = request_line.decode("latin-1").split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                length = int(headers.get("content-length", "0") or 0)
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                if length > MAX_BODY_BYTES:
+                    await self.send_json(writer, 413, {"error": "Request body too large"}, False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+                await self.dispatch(method, path.split("?", 1)[0], body, writer, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self):
+        self.semaphore = asyncio.Semaphore(self.max_concurrency)
+        self.server = await asyncio.start_server(self.handle_connection, self.host, self.port)
+        print(f"Promanis service listening on http://{self.host}:{self.port} "
+              f"(concurrency {self.max_concurrency}, queue {self.max_queue}, {self.api_manager.get_total_keys()} keys)")
+        async with self.server:
+            await self.server.serve_forever()
+
+    def run(self):
+        start_tracing_from_env()
+        try:
+            asyncio.run(self.serve())
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.executor.shutdown(wait=False)
+        return 0
@@ -0,0 +1,124 @@
+import os
+import json
+import uuid
+import threading
+from pathlib import Path
+from .config_store import write_atomic
+from .locale_manager import DEFAULT_LANGUAGE
+from .formatters import DEFAULT_PROFILE
+
+DEFAULT_SESSION_SETTINGS = {
+    "scope": "General",
+    "type": "Text Generation",
+    "detail": "Detailed",
+    "format": DEFAULT_PROFILE,
+    "compress": 0,
+    "bilingual": False,
+}
+TITLE_LENGTH = 24
+
+
+class RefinementSession:
+    """One tab: its own prompt, context, settings and output. The running worker is never persisted."""
+
+    def __init__(self, session_id=None, title=""):
+        self.id = session_id or uuid.uuid4().hex[:12]
+        self.title = title
+        self.prompt = ""
+        self.context = ""
+        self.attachments = []
+        self.language = DEFAULT_LANGUAGE
+        self.settings = dict(DEFAULT_SESSION_SETTINGS)
+        # str, or {language: text} for a bilingual result
+        self.output = ""
+        # Request and unformatted result of the last own refinement, the base for incremental updates
+        self.base = None
+        self.pending_request = None
+        self.status = ""
+        self.loaded = False
+        # Set while a refinement (own worker or an adopted speculative one) is pending for this tab
+        self.busy = False
+        self.worker = None
+
+    def label(self):
+        # Until its file is read, a tab shows the label saved in the index
+        if not self.loaded:
+            return self.title
+        return " ".join(self.prompt.split())[:TITLE_LENGTH]
+
+    def display_title(self, fallback):
+        text = self.label() or fallback
+        return f"⏳ {text}" if self.busy else text
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "prompt": self.prompt,
+            "context": self.context,
+            "attachments": list(self.attachments),
+            "language": self.language,
+            "settings": dict(self.settings),
+            "output": self.output,
+            "base": self.base,
+        }
+
+    def update_from(self, data):
+        self.prompt = data.get("prompt", "")
+        self.context = data.get("context", "")
+        self.attachments = list(data.get("attachments", []))
+        self.language = data.get("language", DEFAULT_LANGUAGE)
+        self.settings = dict(DEFAULT_SESSION_SETTINGS, **data.get("settings", {}))
+        self.output = data.get("output", "")
+        self.base = data.get("base")
+        self.loaded = True
+
+
+class SessionStore:
+    """Tabs persisted under App/config/sessions: a small index plus one file per session.
+
+    Only the index is read at startup; a session's file is read the first time its tab is shown.
+    """
+
+    def __init__(self, base_dir):
+        self.sessions_dir = Path(base_dir) / "App" / "config" / "sessions"
+        self.index_path = self.sessions_dir / "index.json"
+        self.lock = threading.Lock()
+
+    def load_index(self):
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return [], None
+        sessions = []
+        for entry in index.get("sessions", []):
+            if isinstance(entry, dict) and entry.get("id"):
+                sessions.append(RefinementSession(entry["id"], entry.get("title", "")))
+        return sessions, index.get("active")
+
+    def load(self, session):
+        if session.loaded:
+            return session
+        try:
+            with open(self.sessions_dir / f"{session.id}.json", "r", encoding="utf-8") as f:
+                session.update_from(json.load(f))
+        except (OSError, ValueError):
+            session.loaded = True
+        return session
+
+    def save(self, session):
+        if not session.loaded:
+            return
+        with self.lock:
+            write_atomic(self.sessions_dir / f"{session.id}.json", json.dumps(session.to_dict(), indent=2, ensure_ascii=False))
+
+    def save_index(self, sessions, active_id):
+        index = {"active": active_id, "sessions": [{"id": s.id, "title": s.label()} for s in sessions]}
+        with self.lock:
+            write_atomic(self.index_path, json.dumps(index, indent=2, ensure_ascii=False))
+
+    def delete(self, session):
+        try:
+            os.remove(self.sessions_dir / f"{session.id}.json")
+        except OSError:
+            pass
@@ -3,44 +3,51 @@ from PySide6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QTextE
 from PySide6.QtCore import Qt, QThread, Signal
 from PySide6.QtGui import QFont
 import qtawesome as qta
-from google import genai
 import time
-import json
-from pathlib import Path
+from .deadlines import load_deadlines, http_options, is_rate_limit_error
 
 
 class APITestWorker(QThread):
-    finished = Signal(str, bool)
+    # Not named finished: QThread.finished is what tells the dialog the thread can be deleted
+    result = Signal(str, bool)
     
-    def __init__(self, api_key, key_index):
-        super().__init__()
+    def __init__(self, api_key, key_index, timeout_seconds=None, parent=None):
+        super().__init__(parent)
         self.api_key = api_key
         self.key_index = key_index
+        self.timeout_seconds = timeout_seconds
+
+    def stop(self):
+        # One call and no retries: there is nothing to cut short, only the call's own timeout
+        pass
     
     def run(self):
         try:
-            client = genai.Client(api_key=self.api_key)
+            from google.genai import types
+            from .client_pool import get_client
+            client = get_client(self.api_key)
             
             response = client.models.generate_content(
                 model="gemini-2.0-flash",
-                contents=["Test connection"]
+                contents=["Test connection"],
+                config=types.GenerateContentConfig(http_options=http_options(self.timeout_seconds))
             )
             
             if response and hasattr(response, 'text') and response.text:
-                self.finished.emit(f"Key #{self.key_index}: ✓ Valid (Response: {response.text[:50]}...)", True)
+                self.result.emit(f"Key #{self.key_index}: ✓ Valid (Response: {response.text[:50]}...)", True)
             else:
-                self.finished.emit(f"Key #{self.key_index}: ✗ Invalid response", False)
+                self.result.emit(f"Key #{self.key_index}: ✗ Invalid response", False)
                 
         except Exception as e:
             error_msg = str(e)
             if "401" in error_msg or "PERMISSION_DENIED" in error_msg:
-                self.finished.emit(f"Key #{self.key_index}: ✗ Invalid API key", False)
-            elif "429" in error_msg or "RESOURCE_EXHAUSTED" in error_msg:
-                self.finished.emit(f"Key #{self.key_index}: ⚠ Rate limited (key may be valid)", True)
+                self.result.emit(f"Key #{self.key_index}: ✗ Invalid API key", False)
+            elif is_rate_limit_error(e):
+                self.result.emit(f"Key #{self.key_index}: ⚠ Rate limited (key may be valid)", True)
             elif "403" in error_msg:
-                self.finished.emit(f"Key #{self.key_index}: ✗ Access forbidden", False)
+                self.result.emit(f"Key #{self.key_index}: ✗ Access forbidden", False)
             else:
-                self.finished.emit(f"Key #{self.key_index}: ✗ Error - {error_msg}", False)
+                self.result.emit(f"Key #{self.key_index}: ✗ Error - {error_msg}", False)
 
 
 class SettingsDialog(QDialog):
@@ -48,9 +55,9 @@ class SettingsDialog(QDialog):
         super().__init__(parent)
         self.api_manager = api_manager
         self.test_workers = []
+        self.pending_tests = 0
         self.ai_platforms = ai_platforms if ai_platforms else {}
         self.base_dir = getattr(api_manager, "base_dir", None)
-        self.config_path = Path(self.base_dir) / "App" / "config" / "config.json" if self.base_dir else None
         self.init_ui()
         
     def init_ui(self):
@@ -277,9 +284,8 @@ class SettingsDialog(QDialog):
     def load_current_keys(self):
         try:
             if self.api_manager.api_keys_path.exists():
-                with open(self.api_manager.api_keys_path, 'r', encoding='utf-8') as f:
-                    content = f.read().strip()
-                    self.api_keys_edit.setPlainText(content)
+                content = self.api_manager.store.read_api_keys_text().strip()
+                self.api_keys_edit.setPlainText(content)
         except Exception as e:
             QMessageBox.warning(self, "Warning", f"Could not load existing API keys: {str(e)}")
 
@@ -308,35 +314,53 @@ class SettingsDialog(QDialog):
         self.test_results.append("🔄 Starting real API tests...\n")
         
         # Clean up previous workers
-        for worker in self.test_workers:
-            if worker.isRunning():
-                worker.terminate()
-                worker.wait()
-        self.test_workers.clear()
+        self.release_test_workers()
         
+        timeout_seconds = load_deadlines(self.base_dir)["attempt_seconds"] if self.base_dir else None
+
         # Test each key
         for i, key in enumerate(lines[:5]):  # Limit to first 5 keys to avoid spam
             if key.startswith('AIzaSy') and len(key) == 39:
-                worker = APITestWorker(key, i + 1)
-                worker.finished.connect(self.on_test_result)
+                worker = APITestWorker(key, i + 1, timeout_seconds, self)
+                worker.result.connect(self.on_test_result)
+                worker.finished.connect(self.on_test_worker_finished)
                 self.test_workers.append(worker)
                 worker.start()
                 time.sleep(0.5)  # Small delay between requests
             else:
                 self.test_results.append(f"Key #{i+1}: ✗ Invalid format (should start with 'AIzaSy' and be 39 chars)")
         
+        self.pending_tests = len(self.test_workers)
+        if not self.test_workers:
+            self.test_button.setEnabled(True)
+            self.test_button.setText("Real API Test")
+
         if len(lines) > 5:
             self.test_results.append(f"\nℹ Only testing first 5 keys to avoid rate limits. Total keys: {len(lines)}")
     
     def on_test_result(self, message, is_valid):
         self.test_results.append(message)
         
-        # Check if all workers are done
-        all_done = all(not worker.isRunning() for worker in self.test_workers)
-        if all_done:
+        # Every worker reports exactly once; the emitting thread may still be winding down here
+        self.pending_tests -= 1
+        if self.pending_tests <= 0:
             self.test_button.setEnabled(True)
             self.test_button.setText("Real API Test")
             self.test_results.append("\n✅ API testing completed!")
+
+    def on_test_worker_finished(self):
+        """Finished test threads are deleted instead of piling up for the lifetime of the dialog"""
+        worker = self.sender()
+        if worker in self.test_workers:
+            self.test_workers.remove(worker)
+            worker.deleteLater()
+
+    def release_test_workers(self):
+        # Workers still in the list have not finished; one still in its call outlives the dialog detached
+        from .gemini_worker import stop_workers
+        for worker in stop_workers(self.test_workers):
+            worker.deleteLater()
+        self.test_workers.clear()
     
     def save_settings(self):
         text = self.api_keys_edit.toPlainText().strip()
@@ -349,31 +373,20 @@ class SettingsDialog(QDialog):
             QMessageBox.warning(self, "Warning", "No valid API keys found. Please enter at least one key.")
             return
         try:
-            # Save API keys
-            with open(self.api_manager.api_keys_path, 'w', encoding='utf-8') as f:
-                f.write(text)
+            # Save API keys; the key manager picks them up through the config store
+            self.api_manager.store.write_api_keys(text)
             # Save AI platforms
             platforms = self.get_platforms_from_table()
-            if self.config_path:
-                try:
-                    if self.config_path.exists():
-                        with open(self.config_path, "r", encoding="utf-8") as f:
-                            config = json.load(f)
-                    else:
-                        config = {}
-                    config["ai_platforms"] = platforms
-                    with open(self.config_path, "w", encoding="utf-8") as f:
-                        json.dump(config, f, indent=4, ensure_ascii=False)
-                except Exception as e:
-                    QMessageBox.warning(self, "Warning", f"Failed to save AI platforms: {str(e)}")
+            try:
+                self.api_manager.store.update(ai_platforms=platforms)
+            except Exception as e:
+                QMessageBox.warning(self, "Warning", f"Failed to save AI platforms: {str(e)}")
             QMessageBox.information(self, "Success", f"Settings saved successfully!\n\nTotal keys: {len(valid_lines)}")
             self.accept()
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to save settings: {str(e)}")
 
-    def closeEvent(self, event):
-        for worker in self.test_workers:
-            if worker.isRunning():
-                worker.terminate()
-                worker.wait()
-        super().closeEvent(event)
+    def done(self, result):
+        # accept(), reject() (Esc) and closing the window all end here
+        self.release_test_workers()
+        super().done(result)
@@ -0,0 +1,214 @@
+import time
+from collections import deque
+from datetime import date
+from PySide6.QtCore import QObject, QTimer
+from .result_cache import ResultCache, make_cache_key, attachment_fingerprint
+from .config_store import get_config_store
+
+DEFAULT_SPECULATIVE_SETTINGS = {
+    "enabled": False,
+    "debounce_ms": 1500,
+    "ttl_seconds": 120,
+    # Hard caps on requests spent on guesses, independent of the key quota
+    "max_per_minute": 2,
+    "max_per_day": 50,
+    # Only speculate while some key keeps this many requests per minute free for real clicks
+    "reserve_requests_per_key": 5,
+}
+REQUEST_FIELDS = ("prompt", "context", "language", "scope", "type", "detail", "format", "compress", "bilingual", "attachments")
+
+
+def load_speculative_settings(base_dir):
+    return get_config_store(base_dir).get_section("speculative", DEFAULT_SPECULATIVE_SETTINGS)
+
+
+def request_key(request):
+    return make_cache_key(*(attachment_fingerprint(request[field]) if field == "attachments" else request[field]
+                            for field in REQUEST_FIELDS))
+
+
+class SpeculativeRefiner(QObject):
+    """Refines the current input in the background once it has been idle, so the refine click can be instant.
+
+    Results live in a short-lived cache keyed by prompt, context and every setting, as
+    {"result", "refined"} entries: the display text and the refiner's raw refined text, which
+    the window keeps as the base for incremental edits. Any edit cancels the pending guess; a
+    guess already in flight is discarded when it lands and is counted as waste.
+    """
+
+    def __init__(self, api_manager, parent=None):
+        super().__init__(parent)
+        self.api_manager = api_manager
+        self.settings = load_speculative_settings(api_manager.base_dir)
+        self.enabled = bool(self.settings["enabled"])
+        self.cache = ResultCache(max_entries=16, ttl_seconds=self.settings["ttl_seconds"])
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.start_speculation)
+        self.pending_request = None
+        self.worker = None
+        self.worker_key = None
+        self.worker_cancelled = False
+        self.adopters = []
+        self.unused = set()
+        self.recent_starts = deque()
+        self.day = date.today()
+        self.day_count = 0
+        self.counters = {"started": 0, "completed": 0, "failed": 0, "hits": 0, "adopted": 0, "misses": 0,
+                         "discarded": 0, "skipped_cap": 0, "skipped_quota": 0}
+
+    def set_enabled(self, enabled):
+        self.enabled = enabled
+        if not enabled:
+            self.cancel_pending()
+        section = dict(self.settings, enabled=enabled)
+        get_config_store(self.api_manager.base_dir).update(speculative=section)
+
+    def schedule(self, request):
+        if not self.enabled:
+            return
+        key = request_key(request)
+        if self.worker is not None and self.worker_key != key:
+            self.worker_cancelled = True
+        self.pending_request = request
+        self.timer.start(int(self.settings["debounce_ms"]))
+
+    def cancel_pending(self):
+        self.timer.stop()
+        self.pending_request = None
+        if self.worker is not None and not self.adopters:
+            self.worker_cancelled = True
+
+    def within_cap(self):
+        now = time.monotonic()
+        while self.recent_starts and now - self.recent_starts[0] > 60:
+            self.recent_starts.popleft()
+        if self.day != date.today():
+            self.day = date.today()
+            self.day_count = 0
+        return len(self.recent_starts) < self.settings["max_per_minute"] and self.day_count < self.settings["max_per_day"]
+
+    def spare_capacity(self):
+        limits = self.api_manager.ledger.limits
+        reserve = self.settings["reserve_requests_per_key"]
+        for usage in self.api_manager.key_usage():
+            if (usage["cooldown_seconds"] == 0
+                    and usage["minute_requests"] + reserve < limits["requests_per_minute"]
+                    and usage["day_requests"] + reserve < limits["requests_per_day"]):
+                return True
+        return False
+
+    def start_speculation(self):
+        request = self.pending_request
+        if request is None or not request["prompt"]:
+            return
+        if self.worker is not None:
+            # One guess at a time; try again once the current one lands
+            self.timer.start(int(self.settings["debounce_ms"]))
+            return
+        self.pending_request = None
+        key = request_key(request)
+        if self.cache.get(key) is not None:
+            return
+        if not self.within_cap():
+            self.counters["skipped_cap"] += 1
+            return
+        if not self.spare_capacity():
+            self.counters["skipped_quota"] += 1
+            return
+        from .gemini_worker import PromptRefinementWorker
+        self.recent_starts.append(time.monotonic())
+        self.day_count += 1
+        self.counters["started"] += 1
+        self.worker_key = key
+        self.worker_cancelled = False
+        self.worker = PromptRefinementWorker(
+            self.api_manager, request["prompt"], request["language"], request["context"], request["scope"],
+            request["detail"], request["type"], output_profile=request["format"], attachments=list(request["attachments"]),
+            compress_tokens=request["compress"], bilingual=request["bilingual"]
+        )
+        # A guess gives up quickly instead of retrying into the user's quota
+        self.worker.refiner.max_retries = 1
+        self.worker.refiner.priority = "speculative"
+        self.worker.finished.connect(self.on_finished)
+        self.worker.error.connect(self.on_error)
+        self.worker.start()
+
+    def on_finished(self, result):
+        key, adopters = self.worker_key, self.adopters
+        entry = {"result": result, "refined": self.worker.refiner.refined_text}
+        self.release_worker()
+        self.counters["completed"] += 1
+        if adopters:
+            self.cache.put(key, entry)
+            for on_result, _ in adopters:
+                on_result(entry)
+        elif self.worker_cancelled:
+            self.counters["discarded"] += 1
+        else:
+            self.cache.put(key, entry)
+            self.unused.add(key)
+
+    def on_error(self, message):
+        adopters = self.adopters
+        self.release_worker()
+        self.counters["failed"] += 1
+        for _, on_error in adopters:
+            on_error(message)
+
+    def release_worker(self):
+        worker = self.worker
+        self.worker = None
+        self.worker_key = None
+        self.adopters = []
+        if worker is not None:
+            worker.finished.disconnect(self.on_finished)
+            worker.error.disconnect(self.on_error)
+            worker.wait()
+            worker.deleteLater()
+
+    def take(self, request):
+        """Cached entry for this exact request, or None (counts a miss only if nothing is in flight for it)"""
+        if not self.enabled:
+            return None
+        key = request_key(request)
+        result = self.cache.get(key)
+        if result is not None:
+            self.counters["hits"] += 1
+            self.unused.discard(key)
+            return result
+        if self.worker is None or self.worker_key != key:
+            self.counters["misses"] += 1
+            self.cancel_pending()
+        return None
+
+    def adopt(self, request, on_result, on_error):
+        """Wait for the in-flight guess when it matches the request being refined.
+
+        on_result gets the cache entry; on_error gets the guess's error, which says nothing about
+        the real request (one attempt, speculative priority), so the caller should refine it normally.
+        """
+        if not self.enabled or self.worker is None or self.worker_key != request_key(request):
+            return False
+        self.timer.stop()
+        self.pending_request = None
+        self.worker_cancelled = False
+        self.adopters.append((on_result, on_error))
+        self.counters["adopted"] += 1
+        return True
+
+    def stats(self):
+        stats = dict(self.counters)
+        served = stats["hits"] + stats["adopted"]
+        clicks = served + stats["misses"]
+        stats["hit_rate"] = round(served / clicks, 3) if clicks else None
+        # Guesses that cost a request but never reached the user
+        stats["wasted"] = stats["discarded"] + stats["failed"] + len(self.unused)
+        stats["waste_rate"] = round(stats["wasted"] / stats["started"], 3) if stats["started"] else None
+        return stats
+
+    def shutdown(self):
+        self.timer.stop()
+        if self.worker is not None:
+            from .gemini_worker import stop_workers
+            stop_workers([self.worker])
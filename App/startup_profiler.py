@@ -0,0 +1,89 @@
+import os
+import json
+import time
+from pathlib import Path
+from PySide6.QtCore import QObject, QEvent, QTimer
+
+
+class StartupProfiler(QObject):
+    """Records startup milestones (first paint, first interaction) and deferred stage timings.
+
+    Set PROMANIS_STARTUP_PROFILE to a file path to dump the report as JSON, and
+    PROMANIS_STARTUP_EXIT=1 to quit as soon as the window becomes interactive.
+    """
+
+    def __init__(self, process_start=None, mode="deferred"):
+        super().__init__()
+        self.process_start = process_start if process_start is not None else time.perf_counter()
+        self.mode = mode
+        self.marks = {}
+        self.stages = {}
+        self.window = None
+        self.report_path = os.environ.get("PROMANIS_STARTUP_PROFILE", "")
+        self.exit_when_interactive = os.environ.get("PROMANIS_STARTUP_EXIT", "") == "1"
+        self.interaction_callbacks = []
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.process_start) * 1000.0
+
+    def mark(self, name):
+        if name not in self.marks:
+            self.marks[name] = round(self.elapsed_ms(), 3)
+
+    def record_stage(self, name, started):
+        self.stages[name] = round((time.perf_counter() - started) * 1000.0, 3)
+
+    def watch(self, window):
+        self.window = window
+        window.installEventFilter(self)
+
+    def on_first_interaction(self, callback):
+        self.interaction_callbacks.append(callback)
+
+    def eventFilter(self, watched, event):
+        if watched is self.window and event.type() == QEvent.Paint and "first_paint" not in self.marks:
+            self.mark("first_paint")
+            self.window.removeEventFilter(self)
+            # Deferred work runs after the first frame is on screen
+            QTimer.singleShot(0, self.run_deferred)
+        return False
+
+    def run_deferred(self):
+        started = time.perf_counter()
+        finish_startup = getattr(self.window, "finish_startup", None)
+        if finish_startup:
+            finish_startup()
+        self.record_stage("deferred_ui", started)
+        # The next idle turn of the event loop is the first moment input is handled
+        QTimer.singleShot(0, self.on_interactive)
+
+    def on_interactive(self):
+        self.mark("first_interaction")
+        for callback in self.interaction_callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"Warning: startup callback failed: {str(e)}")
+        self.dump()
+        if self.exit_when_interactive and self.window is not None:
+            self.window.close()
+
+    def report(self):
+        return {
+            "mode": self.mode,
+            "marks_ms": dict(self.marks),
+            "stages_ms": dict(self.stages),
+            "pid": os.getpid(),
+            "wall_time": time.time(),
+        }
+
+    def dump(self):
+        if not self.report_path:
+            return
+        try:
+            path = Path(self.report_path)
+            os.makedirs(path.parent, exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(self.report(), f, indent=4)
+        except Exception as e:
+            print(f"Warning: Failed to write startup profile: {str(e)}")
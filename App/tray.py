@@ -0,0 +1,231 @@
+"""Resident tray mode: a global hotkey refines the clipboard text in place.
+
+    python main.py --tray
+
+The process starts once (Qt, the SDK, the key pool and a warmed connection) and then waits in
+the system tray. Pressing the hotkey (tray.hotkey in config.json, Ctrl+Alt+R by default) takes the
+clipboard text, refines it with the settings of the last active Promanis tab and puts the result
+back on the clipboard. Every run logs its hotkey-to-clipboard latency.
+"""
+import os
+import sys
+import time
+import statistics
+from collections import deque
+from PySide6.QtWidgets import QApplication, QSystemTrayIcon, QMenu
+from PySide6.QtGui import QIcon, QGuiApplication, QAction
+from PySide6.QtCore import QObject, QAbstractNativeEventFilter, Signal
+from .api_manager import APIKeyManager
+from .config_store import get_config_store
+from .sessions import SessionStore, DEFAULT_SESSION_SETTINGS
+from .locale_manager import get_locale, DEFAULT_LANGUAGE
+from .warmup import start_warmup
+
+DEFAULT_TRAY = {
+    "hotkey": "Ctrl+Alt+R",
+    # Show a tray notification when the refined prompt is on the clipboard
+    "notify": True,
+}
+
+WM_HOTKEY = 0x0312
+MOD_NOREPEAT = 0x4000
+MODIFIERS = {"alt": 0x0001, "ctrl": 0x0002, "control": 0x0002, "shift": 0x0004, "win": 0x0008}
+HOTKEY_ID = 0x5052
+LATENCY_SAMPLES = 50
+
+
+def load_tray_settings(base_dir):
+    return get_config_store(base_dir).get_section("tray", DEFAULT_TRAY)
+
+
+def parse_hotkey(text):
+    """'Ctrl+Alt+R' -> (RegisterHotKey modifiers, virtual-key code); letters, digits and F1-F24 only"""
+    parts = [part.strip().lower() for part in text.split("+") if part.strip()]
+    if not parts or parts[-1] in MODIFIERS:
+        raise ValueError(f"Hotkey needs a key: {text}")
+    modifiers = MOD_NOREPEAT
+    for part in parts[:-1]:
+        if part not in MODIFIERS:
+            raise ValueError(f"Unknown modifier in hotkey: {part}")
+        modifiers |= MODIFIERS[part]
+    key = parts[-1]
+    if len(key) == 1 and key.isalnum():
+        return modifiers, ord(key.upper())
+    if key.startswith("f") and key[1:].isdigit() and 1 <= int(key[1:]) <= 24:
+        return modifiers, 0x70 + int(key[1:]) - 1
+    raise ValueError(f"Unsupported hotkey key: {key}")
+
+
+def last_used_settings(base_dir):
+    """(language, settings) of the tab that was active when the window last saved its sessions"""
+    store = SessionStore(base_dir)
+    sessions, active_id = store.load_index()
+    session = next((s for s in sessions if s.id == active_id), sessions[0] if sessions else None)
+    if session is None:
+        return DEFAULT_LANGUAGE, dict(DEFAULT_SESSION_SETTINGS)
+    store.load(session)
+    return session.language, dict(session.settings)
+
+
+class GlobalHotkey(QAbstractNativeEventFilter):
+    """System-wide hotkey via RegisterHotKey; WM_HOTKEY arrives in the GUI thread's message queue"""
+
+    def __init__(self, hotkey, callback):
+        super().__init__()
+        self.hotkey = hotkey
+        self.callback = callback
+        self.registered = False
+
+    def register(self):
+        if sys.platform != "win32":
+            return False
+        import ctypes
+        modifiers, key = parse_hotkey(self.hotkey)
+        # No window handle: the message is posted to the calling (GUI) thread
+        self.registered = bool(ctypes.windll.user32.RegisterHotKey(None, HOTKEY_ID, modifiers, key))
+        if self.registered:
+            QGuiApplication.instance().installNativeEventFilter(self)
+        return self.registered
+
+    def unregister(self):
+        if self.registered:
+            import ctypes
+            ctypes.windll.user32.UnregisterHotKey(None, HOTKEY_ID)
+            QGuiApplication.instance().removeNativeEventFilter(self)
+            self.registered = False
+
+    def nativeEventFilter(self, event_type, message):
+        if event_type == b"windows_generic_MSG":
+            from ctypes import wintypes
+            msg = wintypes.MSG.from_address(int(message))
+            if msg.message == WM_HOTKEY and msg.wParam == HOTKEY_ID:
+                self.callback()
+                return True, 0
+        return False, 0
+
+
+class QuickRefineTray(QObject):
+    """Tray icon plus hotkey; one refinement at a time, result straight to the clipboard"""
+    refined = Signal(str)
+
+    def __init__(self, base_dir):
+        super().__init__()
+        self.base_dir = base_dir
+        self.settings = load_tray_settings(base_dir)
+        self.api_manager = APIKeyManager(base_dir)
+        self.worker = None
+        self.pressed_at = None
+        self.read_ms = 0.0
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+        self.language, _ = last_used_settings(base_dir)
+        self.locale = get_locale(self.language)
+        self.hotkey = GlobalHotkey(self.settings["hotkey"], self.on_hotkey)
+
+        icon_path = os.path.join(base_dir, "App", "wand.ico")
+        self.tray = QSystemTrayIcon(QIcon(icon_path) if os.path.exists(icon_path) else QIcon(), self)
+        self.menu = QMenu()
+        self.refine_action = QAction(self.locale.text("tray_refine_clipboard", hotkey=self.settings["hotkey"]), self.menu)
+        self.refine_action.triggered.connect(self.on_hotkey)
+        self.quit_action = QAction(self.locale.text("tray_quit"), self.menu)
+        self.quit_action.triggered.connect(QApplication.instance().quit)
+        self.menu.addAction(self.refine_action)
+        self.menu.addSeparator()
+        self.menu.addAction(self.quit_action)
+        self.tray.setContextMenu(self.menu)
+        self.tray.setToolTip(self.locale.text("tray_tooltip", hotkey=self.settings["hotkey"]))
+
+    def start(self):
+        if QSystemTrayIcon.isSystemTrayAvailable():
+            self.tray.show()
+        else:
+            print("Warning: no system tray available, the hotkey still works")
+        try:
+            registered = self.hotkey.register()
+        except ValueError as e:
+            print(f"Warning: {str(e)}")
+            registered = False
+        if not registered:
+            self.notify(self.locale.text("tray_hotkey_unavailable", hotkey=self.settings["hotkey"]))
+        # Pay for the SDK, the worker module and the first connection now, not on the first hotkey press
+        from . import gemini_worker
+        start_warmup(self.api_manager)
+        print(f"Promanis quick refine ready, hotkey {self.settings['hotkey']}")
+
+    def stop(self):
+        self.hotkey.unregister()
+        self.tray.hide()
+        if self.worker is not None:
+            # A refinement still in its Gemini call finishes detached (see gemini_worker.stop_workers)
+            from .gemini_worker import stop_workers
+            stop_workers([self.worker])
+            self.worker = None
+
+    def notify(self, message, icon=QSystemTrayIcon.Information):
+        if self.settings["notify"] and self.tray.isVisible():
+            self.tray.showMessage("Promanis", message, icon, 3000)
+        print(message)
+
+    def on_hotkey(self):
+        if self.worker is not None:
+            self.notify(self.locale.text("tray_busy"))
+            return
+        self.pressed_at = time.perf_counter()
+        text = QGuiApplication.clipboard().text().strip()
+        self.read_ms = (time.perf_counter() - self.pressed_at) * 1000.0
+        if not text:
+            self.notify(self.locale.text("tray_empty_clipboard"), QSystemTrayIcon.Warning)
+            return
+        from .gemini_worker import PromptRefinementWorker
+        # Settings are read per press, so a change in the main window applies to the next one
+        self.language, settings = last_used_settings(self.base_dir)
+        # The clipboard holds one text: the selected language only
+        self.worker = PromptRefinementWorker(
+            self.api_manager, text, self.language, "", settings["scope"], settings["detail"], settings["type"],
+            output_profile=settings["format"], compress_tokens=settings["compress"], parent=self
+        )
+        self.worker.finished.connect(self.on_worker_finished)
+        self.worker.error.connect(self.on_worker_error)
+        self.worker.start()
+
+    def on_worker_finished(self, result):
+        refine_done = time.perf_counter()
+        QGuiApplication.clipboard().setText(result)
+        finished = time.perf_counter()
+        total_ms = (finished - self.pressed_at) * 1000.0
+        self.latencies.append(total_ms)
+        print(f"Quick refine: {total_ms:.0f} ms hotkey to clipboard (read {self.read_ms:.1f} ms, "
+              f"refine {(refine_done - self.pressed_at) * 1000.0 - self.read_ms:.0f} ms, "
+              f"write {(finished - refine_done) * 1000.0:.1f} ms; median of last {len(self.latencies)}: "
+              f"{statistics.median(self.latencies):.0f} ms)")
+        self.finish_worker()
+        self.notify(self.locale.text("tray_done", seconds=f"{total_ms / 1000.0:.1f}"))
+        self.refined.emit(result)
+
+    def on_worker_error(self, message):
+        self.finish_worker()
+        self.notify(self.locale.text("error_refine", error=message), QSystemTrayIcon.Critical)
+
+    def finish_worker(self):
+        self.worker.quit()
+        self.worker.wait()
+        self.worker.deleteLater()
+        self.worker = None
+
+
+def run_tray(base_dir):
+    app = QApplication(sys.argv)
+    # Closing a notification or menu must not end the resident process
+    app.setQuitOnLastWindowClosed(False)
+    try:
+        tray = QuickRefineTray(base_dir)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"Error: {str(e)}")
+        return 1
+    tray.start()
+    try:
+        exit_code = app.exec()
+    finally:
+        tray.stop()
+    from .gemini_worker import wait_for_detached_workers
+    wait_for_detached_workers()
+    return exit_code
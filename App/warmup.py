@@ -0,0 +1,52 @@
+import time
+import threading
+from .client_pool import get_client
+from .config_store import get_config_store
+from .deadlines import http_options
+
+DEFAULT_WARMUP = {
+    "enabled": True,
+    # The warm-up call is dropped after this long; the first real request then connects on its own
+    "timeout_seconds": 10,
+}
+WARMUP_MODEL = "gemini-2.0-flash"
+
+
+def load_warmup_settings(base_dir):
+    return get_config_store(base_dir).get_section("warmup", DEFAULT_WARMUP)
+
+
+def warm_up(api_manager, settings, profiler=None):
+    """Import the SDK, build the client for the next key and open its connection with a model lookup.
+
+    The lookup costs no tokens. Any failure is only logged: the first refinement simply pays
+    for the connection itself, as it would without warm-up.
+    """
+    started = time.perf_counter()
+    try:
+        from google.genai import types
+        client = get_client(api_manager.peek_key())
+        if profiler:
+            profiler.record_stage("warmup_client", started)
+        lookup = getattr(client.models, "get", None)
+        if not lookup:
+            # Cassette replay has no connection to open
+            return False
+        lookup(model=WARMUP_MODEL, config=types.GetModelConfig(http_options=http_options(settings["timeout_seconds"])))
+    except Exception as e:
+        print(f"Warning: connection warm-up failed: {str(e)}")
+        return False
+    if profiler:
+        profiler.record_stage("warmup", started)
+        profiler.mark("connection_ready")
+    return True
+
+
+def start_warmup(api_manager, profiler=None):
+    """warm_up() on a daemon thread; returns the thread, or None when warm-up is disabled"""
+    settings = load_warmup_settings(api_manager.base_dir)
+    if not settings.get("enabled", True):
+        return None
+    thread = threading.Thread(target=warm_up, args=(api_manager, settings, profiler), name="promanis-warmup", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,53 @@
+"""Throughput benchmark for the output formatter profiles.
+
+Formats a synthetic "Complex"-sized refined prompt with every profile and
+reports the mean time per call and characters per second.
+
+Usage:
+    python Benchmarks/formatter_benchmark.py --size 20000 --repeat 200
+"""
+import sys
+import timeit
+import argparse
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+from App.formatters import OUTPUT_PROFILES, format_output
+
+SAMPLE_BLOCK = (
+    "Respond entirely in English.\\n\\n"
+    "**Context:** You are designing an onboarding flow for a budgeting app used by first-time earners.\\n"
+    "* Audience: young professionals with little financial experience\\n"
+    "* Goal: set up a monthly budget in under five minutes\\n"
+    "- Constraint: **no jargon**, plain language only\\n\\n"
+    "Expectation: Provide step-by-step screens, copy for each screen and the rationale.\\n"
+    "Assumption: The user has already linked one bank account.\\n\\n\\n"
+)
+
+
+def build_sample(size):
+    repeats = max(1, size // len(SAMPLE_BLOCK))
+    return SAMPLE_BLOCK * repeats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark output formatter profiles")
+    parser.add_argument("--size", type=int, default=20000, help="Approximate sample size in characters")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    sample = build_sample(args.size)
+    print(f"Sample: {len(sample)} chars, {args.repeat} iterations per profile")
+    for profile in OUTPUT_PROFILES:
+        seconds = timeit.timeit(lambda: format_output(sample, profile), number=args.repeat)
+        per_call_ms = seconds / args.repeat * 1000.0
+        throughput = len(sample) * args.repeat / seconds / 1e6
+        print(f"  {profile:<10} {per_call_ms:8.3f} ms/call  {throughput:8.2f} Mchar/s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
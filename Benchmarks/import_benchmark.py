@@ -0,0 +1,97 @@
+"""Import-time benchmark for the Qt-free refinement core.
+
+Imports each module in a fresh interpreter several times and reports the median
+wall time, the slowest imports reported by ``python -X importtime``, and
+whether PySide6, qtawesome or the Gemini SDK were pulled in. The run fails
+(exit code 1) when a core module imports Qt or exceeds --max-ms. The report is
+written to Benchmarks/results/import_latest.json.
+
+Usage:
+    python Benchmarks/import_benchmark.py
+    python Benchmarks/import_benchmark.py --runs 9 --modules App.refiner,App.gemini_worker
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+RESULTS_PATH = BASE_DIR / "Benchmarks" / "results" / "import_latest.json"
+# Modules that scripts, the service and the batch CLI use; none of them may need Qt
+CORE_MODULES = ("App.refiner", "App.packing", "App.job_queue", "App.service")
+HEAVY_PACKAGES = ("PySide6", "qtawesome", "google.genai")
+
+PROBE = """
+import sys, time, json
+started = time.perf_counter()
+import {module}
+elapsed = (time.perf_counter() - started) * 1000.0
+print(json.dumps({{"ms": elapsed, "loaded": [name for name in {heavy!r} if name in sys.modules]}}))
+"""
+
+
+def measure(module):
+    """One fresh interpreter: import time in ms and which heavy packages came along"""
+    result = subprocess.run([sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY_PACKAGES)],
+                            cwd=BASE_DIR, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def slowest_imports(module, top):
+    """Cumulative microseconds per module imported on behalf of `module` (interpreter startup excluded)"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=BASE_DIR, capture_output=True, text=True, check=True)
+    rows, block = [], []
+    for line in result.stderr.splitlines():
+        # "import time:  self [us] | cumulative | imported package", nested imports indented and listed first
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, raw_name = line[len("import time:"):].split("|", 2)
+        block.append((int(cumulative_us), raw_name.strip()))
+        if len(raw_name) - len(raw_name.lstrip()) <= 1:
+            if raw_name.strip() == module.split(".")[0] or raw_name.strip() == module:
+                rows.extend(block)
+            block = []
+    rows.sort(reverse=True)
+    return [{"module": name, "cumulative_ms": round(us / 1000.0, 2)} for us, name in rows[:top]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure import cost of the refinement core")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--modules", default=",".join(CORE_MODULES))
+    parser.add_argument("--top", type=int, default=8, help="Slowest imports to list per module")
+    parser.add_argument("--max-ms", type=float, default=0.0, help="Fail when a module's median exceeds this (0 = no limit)")
+    args = parser.parse_args()
+
+    report = []
+    failures = []
+    for module in [name.strip() for name in args.modules.split(",") if name.strip()]:
+        samples = [measure(module) for _ in range(args.runs)]
+        median = statistics.median(sample["ms"] for sample in samples)
+        loaded = sorted({name for sample in samples for name in sample["loaded"]})
+        entry = {"module": module, "median_ms": round(median, 2), "loaded": loaded,
+                 "slowest": slowest_imports(module, args.top)}
+        report.append(entry)
+        print(f"{module:<22} {median:8.1f} ms   heavy: {', '.join(loaded) or 'none'}")
+        for row in entry["slowest"]:
+            print(f"    {row['cumulative_ms']:8.1f} ms  {row['module']}")
+        if module in CORE_MODULES and ({"PySide6", "qtawesome"} & set(loaded)):
+            failures.append(f"{module} imports {', '.join(loaded)}")
+        if args.max_ms and median > args.max_ms:
+            failures.append(f"{module} takes {median:.1f} ms to import")
+
+    os.makedirs(RESULTS_PATH.parent, exist_ok=True)
+    with open(RESULTS_PATH, "w", encoding="utf-8") as f:
+        json.dump({"runs": args.runs, "modules": report, "failures": failures}, f, indent=2)
+    if failures:
+        print("Import benchmark FAILED: " + "; ".join(failures))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+"""Incremental re-refinement versus a full refinement after a one-sentence edit.
+
+Builds multi-sentence raw prompts from the corpus, refines each once, then swaps
+one sentence and refines the edited prompt twice: from scratch, and as a patch
+request against the first result (App/incremental.py). Reports output tokens
+and latency for both, and how often the patch path fell back to a full
+refinement. The mock backend adds PROMANIS_MOCK_MS_PER_OUTPUT_TOKEN of
+generation time per output token, so latency follows answer length like the
+real API. The report is written to Benchmarks/results/incremental_latest.json.
+
+Usage:
+    python Benchmarks/incremental_benchmark.py
+    python Benchmarks/incremental_benchmark.py --prompts 16 --latency-ms 300 --ms-per-token 5
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+CORPUS_PATH = BASE_DIR / "Benchmarks" / "corpus" / "prompts.json"
+RESULTS_PATH = BASE_DIR / "Benchmarks" / "results" / "incremental_latest.json"
+SENTENCES_PER_PROMPT = 4
+
+
+def edited_prompts(count):
+    """(original, edited) pairs: four corpus sentences, then one of them replaced by another corpus sentence"""
+    with open(CORPUS_PATH, "r", encoding="utf-8") as f:
+        texts = [entry["text"] for entry in json.load(f)["prompts"]]
+    pairs = []
+    for index in range(count):
+        sentences = [texts[(index + offset) % len(texts)].capitalize() + "." for offset in range(SENTENCES_PER_PROMPT)]
+        edited = list(sentences)
+        edited[index % SENTENCES_PER_PROMPT] = texts[(index + SENTENCES_PER_PROMPT) % len(texts)].capitalize() + "."
+        pairs.append((" ".join(sentences), " ".join(edited)))
+    return pairs
+
+
+def measured(base_class):
+    class Measured(base_class):
+        output_tokens = 0
+
+        def report_usage(self, api_key, response, projected_tokens):
+            super().report_usage(api_key, response, projected_tokens)
+            usage = getattr(response, "usage_metadata", None)
+            self.output_tokens += getattr(usage, "candidates_token_count", 0) or 0
+
+    return Measured
+
+
+def timed(refiner):
+    started = time.perf_counter()
+    refiner.refine()
+    return (time.perf_counter() - started) * 1000.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare incremental and full re-refinement after a small edit")
+    parser.add_argument("--prompts", type=int, default=8)
+    parser.add_argument("--detail", default="Detailed")
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    parser.add_argument("--ms-per-token", type=float, default=5.0, help="Mock generation time per output token")
+    args = parser.parse_args()
+
+    if not (BASE_DIR / "api_keys.txt").exists():
+        print("api_keys.txt is required (any placeholder key works with the mock backend)")
+        return 2
+
+    os.environ["PROMANIS_BACKEND"] = "mock"
+    os.environ["PROMANIS_MOCK_LATENCY_MS"] = str(args.latency_ms)
+    os.environ["PROMANIS_MOCK_MS_PER_OUTPUT_TOKEN"] = str(args.ms_per_token)
+    os.environ["PROMANIS_MOCK_ERROR_RATE"] = "0"
+    os.environ["PROMANIS_MOCK_JITTER"] = "0"
+
+    from App.api_manager import APIKeyManager
+    from App.refiner import PromptRefiner
+    from App.incremental import IncrementalRefiner, incremental_base, load_incremental_settings
+
+    api_manager = APIKeyManager(BASE_DIR)
+    settings = load_incremental_settings(BASE_DIR)
+    FullRefiner, PatchRefiner = measured(PromptRefiner), measured(IncrementalRefiner)
+    rows = []
+    stdout = sys.stdout
+    devnull = open(os.devnull, "w")
+    try:
+        for original, edited in edited_prompts(args.prompts):
+            # Refiners log every response; keep the table readable
+            sys.stdout = devnull
+            first = PromptRefiner(api_manager, original, detail_level=args.detail)
+            first.refine()
+            request = {"prompt": original, "detail": args.detail}
+            base = {"request": request, "refined": first.refined_text}
+            previous = incremental_base(base, dict(request, prompt=edited), settings)
+            full = FullRefiner(api_manager, edited, detail_level=args.detail)
+            full_ms = timed(full)
+            row = {"full_tokens": full.output_tokens, "full_ms": full_ms, "patch_tokens": None, "patch_ms": None, "mode": "skipped"}
+            if previous:
+                patch = PatchRefiner(api_manager, edited, *previous, detail_level=args.detail)
+                row["patch_ms"] = timed(patch)
+                row["patch_tokens"] = patch.output_tokens
+                row["mode"] = patch.mode
+            sys.stdout = stdout
+            rows.append(row)
+    finally:
+        sys.stdout = stdout
+        devnull.close()
+
+    patched = [row for row in rows if row["patch_tokens"] is not None]
+    summary = {
+        "prompts": len(rows),
+        "patched": len(patched),
+        "fallbacks": sum(1 for row in patched if row["mode"] != "incremental"),
+        "full_output_tokens": statistics.mean(row["full_tokens"] for row in rows) if rows else 0,
+        "patch_output_tokens": statistics.mean(row["patch_tokens"] for row in patched) if patched else 0,
+        "full_latency_ms": statistics.median(row["full_ms"] for row in rows) if rows else 0,
+        "patch_latency_ms": statistics.median(row["patch_ms"] for row in patched) if patched else 0,
+    }
+    print(f"{summary['prompts']} edited prompts, {summary['patched']} sent as patches, {summary['fallbacks']} fell back")
+    print(f"{'':<12} {'output tokens':>14} {'latency p50':>12}")
+    print(f"{'full':<12} {summary['full_output_tokens']:>14.1f} {summary['full_latency_ms']:>10.1f}ms")
+    print(f"{'incremental':<12} {summary['patch_output_tokens']:>14.1f} {summary['patch_latency_ms']:>10.1f}ms")
+    if patched and summary["full_output_tokens"]:
+        print(f"output tokens {(summary['patch_output_tokens'] / summary['full_output_tokens'] - 1) * 100:+.0f}%, "
+              f"latency {(summary['patch_latency_ms'] / summary['full_latency_ms'] - 1) * 100:+.0f}%")
+
+    os.makedirs(RESULTS_PATH.parent, exist_ok=True)
+    with open(RESULTS_PATH, "w", encoding="utf-8") as f:
+        json.dump({"detail": args.detail, "latency_ms": args.latency_ms, "ms_per_token": args.ms_per_token,
+                   "summary": summary, "runs": rows}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
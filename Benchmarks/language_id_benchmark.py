@@ -0,0 +1,123 @@
+"""Throughput and accuracy of the local output-language check.
+
+Classifies a small labeled set of English and Bahasa Indonesia prompts (short,
+long, and Indonesian full of English technical terms) with the character
+trigram identifier in App/language_check.py and with the older stopword
+purity score, then times both over the whole set repeated --rounds times. It
+also compares the input tokens of a full retry with the targeted language-fix
+request the refiner now sends after a mismatch. The report is written to
+Benchmarks/results/language_id_latest.json.
+
+Usage:
+    python Benchmarks/language_id_benchmark.py
+    python Benchmarks/language_id_benchmark.py --rounds 500
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+RESULTS_PATH = BASE_DIR / "Benchmarks" / "results" / "language_id_latest.json"
+
+SAMPLES = [
+    ("English", "Respond entirely in English. Write a Python script that reads a CSV file and prints the average of every numeric column."),
+    ("English", "Design a landing page for a mobile banking app with a hero section, a feature grid and customer testimonials."),
+    ("English", "Explain how photosynthesis works to a ten year old, using one everyday analogy and a short summary at the end."),
+    ("English", "You are a senior backend engineer. Review the following REST API design and list the security problems you find, "
+                "ordered by severity, with a concrete fix for each one."),
+    ("English", "Create a weekly meal plan for a vegetarian athlete who trains twice a day and needs at least 120 grams of protein."),
+    ("English", "Summarize the attached meeting notes into decisions, open questions and action items with owners."),
+    ("English", "Write a short story about a lighthouse keeper who finds a message in a bottle from her future self."),
+    ("English", "Context: build a todo app with React and Firebase\n* Level: intermediate\n* Expectation: a clear, well-structured answer"),
+    ("Bahasa Indonesia", "Tulis seluruh jawaban dalam Bahasa Indonesia. Buat skrip Python yang membaca file CSV dan menampilkan rata-rata setiap kolom."),
+    ("Bahasa Indonesia", "Rancang halaman utama untuk aplikasi perbankan seluler dengan bagian pembuka, daftar fitur dan testimoni pelanggan."),
+    ("Bahasa Indonesia", "Jelaskan cara kerja fotosintesis kepada anak berusia sepuluh tahun dengan satu analogi sehari-hari dan ringkasan singkat."),
+    ("Bahasa Indonesia", "Kamu adalah backend engineer senior. Tinjau desain REST API berikut dan sebutkan masalah keamanan yang kamu temukan, "
+                         "diurutkan dari yang paling berat, beserta perbaikan konkret untuk masing-masing."),
+    ("Bahasa Indonesia", "Buatlah API REST menggunakan framework FastAPI dengan endpoint untuk login, logout, dan refresh token. Gunakan database PostgreSQL."),
+    ("Bahasa Indonesia", "Ringkas catatan rapat terlampir menjadi keputusan, pertanyaan terbuka dan tindak lanjut beserta penanggung jawabnya."),
+    ("Bahasa Indonesia", "Tulis cerita pendek tentang penjaga mercusuar yang menemukan pesan dalam botol dari dirinya di masa depan."),
+    ("Bahasa Indonesia", "Konteks: build a todo app with React and Firebase\n* Tingkat: menengah\n* Harapan: jawaban terstruktur dan jelas"),
+]
+
+
+def classify_ngram(text):
+    from App.language_check import identify_language
+    return identify_language(text)[0]
+
+
+def classify_stopwords(text):
+    from App.language_check import language_purity
+    purity = language_purity(text, "English")
+    if purity is None or purity == 0.5:
+        return None
+    return "English" if purity > 0.5 else "Bahasa Indonesia"
+
+
+def measure(classify, rounds):
+    correct = sum(1 for language, text in SAMPLES if classify(text) == language)
+    size = sum(len(text.encode("utf-8")) for _, text in SAMPLES)
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for _, text in SAMPLES:
+            classify(text)
+    elapsed = time.perf_counter() - started
+    count = rounds * len(SAMPLES)
+    return {
+        "accuracy": correct / len(SAMPLES),
+        "texts_per_second": count / elapsed,
+        "kb_per_second": size * rounds / 1024.0 / elapsed,
+        "us_per_text": elapsed / count * 1e6,
+    }
+
+
+def retry_tokens():
+    """Input tokens of a full retry versus a language-fix retry for one sample refinement"""
+    os.environ["PROMANIS_BACKEND"] = "mock"
+    from App.api_manager import APIKeyManager
+    from App.refiner import PromptRefiner
+    from App.output_budget import load_output_budget
+    from App.context_pipeline import estimate_tokens
+
+    api_manager = APIKeyManager(BASE_DIR)
+    refiner = PromptRefiner(api_manager, SAMPLES[12][1], language="Bahasa Indonesia")
+    budget = load_output_budget(BASE_DIR)
+    system_instruction, contents = refiner.build_request("", budget)[:2]
+    full = estimate_tokens(system_instruction + contents)
+    refiner.mismatch_text = SAMPLES[0][1]
+    system_instruction, contents = refiner.build_request("", budget)[:2]
+    return {"full_retry": full, "language_fix": estimate_tokens(system_instruction + contents)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the local output-language check")
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    report = {"samples": len(SAMPLES), "rounds": args.rounds,
+              "ngram": measure(classify_ngram, args.rounds), "stopwords": measure(classify_stopwords, args.rounds)}
+    print(f"{len(SAMPLES)} labeled samples x {args.rounds} rounds")
+    print(f"{'':<10} {'accuracy':>9} {'texts/s':>10} {'KB/s':>9} {'us/text':>9}")
+    for name in ("ngram", "stopwords"):
+        row = report[name]
+        print(f"{name:<10} {row['accuracy']:>8.0%} {row['texts_per_second']:>10.0f} {row['kb_per_second']:>9.0f} {row['us_per_text']:>9.1f}")
+
+    if (BASE_DIR / "api_keys.txt").exists():
+        report["retry_input_tokens"] = tokens = retry_tokens()
+        print(f"retry input tokens: full {tokens['full_retry']}, language fix {tokens['language_fix']} "
+              f"({(tokens['language_fix'] / tokens['full_retry'] - 1) * 100:+.0f}%)")
+
+    os.makedirs(RESULTS_PATH.parent, exist_ok=True)
+    with open(RESULTS_PATH, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,218 @@
+"""Load test for the headless refinement service (main.py --serve).
+
+By default it starts the service with the mock Gemini backend on a free port,
+drives it with concurrent keep-alive clients and reports requests/sec and
+latency percentiles. Use --url to target a service that is already running.
+With --disconnects N it then opens N /v1/stream requests that hang up before
+reading anything and checks /v1/health that every queue slot came back.
+
+Usage:
+    python Benchmarks/load_test.py --requests 500 --concurrency 32 --mock-latency-ms 200
+    python Benchmarks/load_test.py --url http://127.0.0.1:8765 --endpoint /v1/batch --batch-size 10
+    python Benchmarks/load_test.py --requests 50 --disconnects 20
+"""
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import subprocess
+from urllib.parse import urlparse
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+async def read_response(reader):
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("Connection closed")
+    status = int(status_line.split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    if headers.get("transfer-encoding", "").lower() == "chunked":
+        body = b""
+        while True:
+            size = int((await reader.readline()).strip(), 16)
+            if size == 0:
+                await reader.readline()
+                break
+            body += await reader.readexactly(size)
+            await reader.readline()
+    else:
+        body = await reader.readexactly(int(headers.get("content-length", "0")))
+    return status, body
+
+
+async def client_loop(host, port, endpoint, next_payload, results):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while True:
+            payload = next_payload()
+            if payload is None:
+                break
+            body = json.dumps(payload).encode("utf-8")
+            request = (
+                f"POST {endpoint} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n\r\n"
+            ).encode("latin-1") + body
+            started = time.perf_counter()
+            writer.write(request)
+            await writer.drain()
+            status, _ = await read_response(reader)
+            results.append((status, (time.perf_counter() - started) * 1000.0))
+    finally:
+        writer.close()
+
+
+async def run_load(host, port, args):
+    counter = {"sent": 0}
+
+    def next_payload():
+        if counter["sent"] >= args.requests:
+            return None
+        counter["sent"] += 1
+        number = counter["sent"]
+        item = {"prompt": f"Write a product description for gadget #{number}", "no_cache": not args.allow_cache}
+        if args.endpoint == "/v1/refine":
+            return item
+        return {"items": [dict(item, prompt=f"{item['prompt']} variant {i}") for i in range(args.batch_size)]}
+
+    results = []
+    started = time.perf_counter()
+    await asyncio.gather(*(client_loop(host, port, args.endpoint, next_payload, results) for _ in range(args.concurrency)))
+    return results, time.perf_counter() - started
+
+
+async def fetch_health(host, port):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(f"GET /v1/health HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n".encode("latin-1"))
+        await writer.drain()
+        _, body = await read_response(reader)
+        return json.loads(body.decode("utf-8"))
+    finally:
+        writer.close()
+
+
+async def run_disconnects(host, port, args):
+    """Stream requests whose client resets the connection right after sending; returns leaked slots"""
+    payload = {"items": [{"prompt": f"Disconnect check {i}", "no_cache": True} for i in range(args.batch_size)]}
+    body = json.dumps(payload).encode("utf-8")
+    request = (
+        f"POST /v1/stream HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n"
+    ).encode("latin-1") + body
+    for _ in range(args.disconnects):
+        _, writer = await asyncio.open_connection(host, port)
+        writer.write(request)
+        await writer.drain()
+        writer.transport.abort()
+    # Refinements already started still run to the end; give them time before counting
+    deadline = time.perf_counter() + 10 + args.mock_latency_ms / 1000.0 * args.disconnects * args.batch_size
+    while True:
+        health = await fetch_health(host, port)
+        leaked = health["queued"] + health["in_flight"]
+        if leaked == 0 or time.perf_counter() > deadline:
+            return leaked
+        await asyncio.sleep(0.2)
+
+
+def wait_for_health(host, port, timeout):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection((host, port), timeout=1):
+                return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the Promanis HTTP service")
+    parser.add_argument("--url", default="", help="Existing service URL; when omitted a mock-backed service is started")
+    parser.add_argument("--endpoint", default="/v1/refine", choices=["/v1/refine", "/v1/batch", "/v1/stream"])
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--batch-size", type=int, default=5)
+    parser.add_argument("--allow-cache", action="store_true")
+    parser.add_argument("--mock-latency-ms", type=float, default=200)
+    parser.add_argument("--mock-error-rate", type=float, default=0.0)
+    parser.add_argument("--max-concurrency", type=int, default=32)
+    parser.add_argument("--max-queue", type=int, default=256)
+    parser.add_argument("--disconnects", type=int, default=0, help="Stream requests to abandon after the load run")
+    args = parser.parse_args()
+
+    process = None
+    if args.url:
+        parsed = urlparse(args.url)
+        host, port = parsed.hostname, parsed.port or 80
+    else:
+        if not (BASE_DIR / "api_keys.txt").exists():
+            print("api_keys.txt is required (any placeholder keys work with the mock backend)")
+            return 2
+        host, port = "127.0.0.1", free_port()
+        env = dict(os.environ)
+        env["PROMANIS_MOCK_LATENCY_MS"] = str(args.mock_latency_ms)
+        env["PROMANIS_MOCK_ERROR_RATE"] = str(args.mock_error_rate)
+        process = subprocess.Popen(
+            [sys.executable, str(BASE_DIR / "main.py"), "--serve", "--mock", "--port", str(port),
+             "--max-concurrency", str(args.max_concurrency), "--max-queue", str(args.max_queue)],
+            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, cwd=str(BASE_DIR)
+        )
+        if not wait_for_health(host, port, 30):
+            process.kill()
+            print("Service did not start")
+            return 1
+
+    try:
+        results, elapsed = asyncio.run(run_load(host, port, args))
+        leaked = asyncio.run(run_disconnects(host, port, args)) if args.disconnects else 0
+    finally:
+        if process:
+            process.terminate()
+            process.wait(timeout=10)
+
+    latencies = [latency for status, latency in results if status == 200]
+    statuses = {}
+    for status, _ in results:
+        statuses[status] = statuses.get(status, 0) + 1
+    prompts_per_request = 1 if args.endpoint == "/v1/refine" else args.batch_size
+    print(f"Endpoint {args.endpoint}, {len(results)} requests, concurrency {args.concurrency}, {elapsed:.2f}s")
+    print(f"  status codes:    {statuses}")
+    print(f"  requests/sec:    {len(results) / elapsed:.1f}")
+    print(f"  prompts/sec:     {len(latencies) * prompts_per_request / elapsed:.1f}")
+    for label, fraction in (("p50", 0.50), ("p90", 0.90), ("p99", 0.99)):
+        value = percentile(latencies, fraction)
+        print(f"  latency {label}:     {value:.1f} ms" if value is not None else f"  latency {label}:     n/a")
+    if args.disconnects:
+        print(f"  disconnects:     {args.disconnects} abandoned streams, {leaked} queue slots leaked")
+        if leaked:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
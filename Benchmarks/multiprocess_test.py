@@ -0,0 +1,134 @@
+"""Several Promanis processes sharing one key pool, against the mock backend.
+
+Starts --processes worker interpreters on a throwaway base directory with
+--keys placeholder keys and a low requests_per_minute limit. Every worker
+sends --requests refinements as fast as it can, giving up instead of queueing
+when no key has headroom. Each worker reports which key it used and how long
+APIKeyManager.acquire_key took. The run is done twice, with
+quota.share_across_processes off (every process keeps its own counts, as
+before) and on (the ledger file coordinates them). It reports requests over
+the per-key limit (the 429s the real API would return), how evenly the keys
+were used, and the coordination cost per call. It fails (exit code 1) when
+the coordinated run goes over the limit. The report is written to
+Benchmarks/results/multiprocess_latest.json.
+
+Usage:
+    python Benchmarks/multiprocess_test.py
+    python Benchmarks/multiprocess_test.py --processes 6 --keys 3 --rpm 5 --requests 8
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+import subprocess
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+RESULTS_PATH = BASE_DIR / "Benchmarks" / "results" / "multiprocess_latest.json"
+
+WORKER = """
+import os, sys, json, time
+sys.path.insert(0, {app_dir!r})
+stdout, sys.stdout = sys.stdout, open(os.devnull, "w")
+from App.api_manager import APIKeyManager
+from App.refiner import PromptRefiner, RefinementError
+manager = APIKeyManager({base_dir!r})
+acquire = manager.acquire_key
+timings = []
+
+def timed_acquire(*args, **kwargs):
+    started = time.perf_counter()
+    try:
+        return acquire(*args, **kwargs)
+    finally:
+        timings.append((time.perf_counter() - started) * 1e6)
+
+manager.acquire_key = timed_acquire
+used, rejected = [], 0
+for index in range({requests}):
+    refiner = PromptRefiner(manager, f"write a haiku about rain, variation {{index}}")
+    refiner.max_retries = 1
+    try:
+        refiner.refine()
+        used.append([manager.last_index, int(time.time() // 60)])
+    except RefinementError:
+        rejected += 1
+print(json.dumps({{"used": used, "rejected": rejected, "acquire_us": timings}}), file=stdout)
+"""
+
+
+def write_base_dir(root, keys, rpm, shared):
+    (root / "App" / "config").mkdir(parents=True, exist_ok=True)
+    (root / "api_keys.txt").write_text("\n".join(f"mock-key-{index}" for index in range(keys)) + "\n", encoding="utf-8")
+    config = {"quota": {"requests_per_minute": rpm, "max_queue_wait_seconds": 0, "share_across_processes": shared}}
+    (root / "App" / "config" / "config.json").write_text(json.dumps(config, indent=4), encoding="utf-8")
+
+
+def run_mode(args, shared):
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        write_base_dir(root, args.keys, args.rpm, shared)
+        env = dict(os.environ, PROMANIS_BACKEND="mock", PROMANIS_MOCK_LATENCY_MS=str(args.latency_ms),
+                   PROMANIS_MOCK_ERROR_RATE="0", PROMANIS_MOCK_LEDGER=str(root / "ledger.sqlite3"))
+        code = WORKER.format(app_dir=str(BASE_DIR), base_dir=str(root), requests=args.requests)
+        workers = [subprocess.Popen([sys.executable, "-c", code], cwd=root, env=env, stdout=subprocess.PIPE, text=True)
+                   for _ in range(args.processes)]
+        reports = []
+        for worker in workers:
+            output, _ = worker.communicate(timeout=300)
+            if worker.returncode != 0:
+                raise RuntimeError(f"worker exited with {worker.returncode}")
+            reports.append(json.loads(output.strip().splitlines()[-1]))
+
+    per_window = {}
+    for report in reports:
+        for key_index, minute in report["used"]:
+            per_window[(key_index, minute)] = per_window.get((key_index, minute), 0) + 1
+    per_key = [sum(count for (key_index, _), count in per_window.items() if key_index == index) for index in range(args.keys)]
+    timings = sorted(sample for report in reports for sample in report["acquire_us"])
+    return {
+        "sent": sum(per_key),
+        "rejected_locally": sum(report["rejected"] for report in reports),
+        "over_limit": sum(max(0, count - args.rpm) for count in per_window.values()),
+        "per_key": per_key,
+        "acquire_p50_us": round(statistics.median(timings), 1) if timings else 0.0,
+        "acquire_p95_us": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 1) if timings else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run several processes against one key pool and count would-be 429s")
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--keys", type=int, default=2)
+    parser.add_argument("--rpm", type=int, default=6, help="requests_per_minute per key")
+    parser.add_argument("--requests", type=int, default=6, help="Refinements per process")
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    args = parser.parse_args()
+
+    # Both runs must fit in one rate window, or the per-minute counts would reset halfway
+    if 60 - time.time() % 60 < 20:
+        time.sleep(60 - time.time() % 60 + 0.5)
+    report = {"separate": run_mode(args, False), "shared": run_mode(args, True)}
+
+    capacity = args.keys * args.rpm
+    print(f"{args.processes} processes x {args.requests} requests, {args.keys} keys x {args.rpm} rpm (capacity {capacity}/min)")
+    print(f"{'':<9} {'sent':>5} {'over limit':>11} {'refused':>8} {'per key':>12} {'acquire p50':>12} {'p95':>9}")
+    for name in ("separate", "shared"):
+        row = report[name]
+        print(f"{name:<9} {row['sent']:>5} {row['over_limit']:>11} {row['rejected_locally']:>8} "
+              f"{'/'.join(str(count) for count in row['per_key']):>12} {row['acquire_p50_us']:>10.0f}us {row['acquire_p95_us']:>7.0f}us")
+
+    os.makedirs(RESULTS_PATH.parent, exist_ok=True)
+    with open(RESULTS_PATH, "w", encoding="utf-8") as f:
+        json.dump(dict(vars(args), **report), f, indent=2)
+    if report["shared"]["over_limit"]:
+        print(f"Multi-process test FAILED: {report['shared']['over_limit']} requests over the per-key limit with a shared ledger")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+"""Packed versus one-per-request batch refinement.
+
+Runs the same batch job through BatchRunner once per pack size against the mock
+backend and reports requests and tokens per refined prompt, plus how many items
+a packed response dropped and had to be retried alone. Token counts come from
+the quota ledger, so they include the full system instruction of every call.
+The report is written to Benchmarks/results/packing_latest.json.
+
+Usage:
+    python Benchmarks/packing_benchmark.py --items 48 --pack-sizes 1,4,8
+    python Benchmarks/packing_benchmark.py --detail Complex --drop-rate 0.1
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+CORPUS_PATH = BASE_DIR / "Benchmarks" / "corpus" / "prompts.json"
+RESULTS_PATH = BASE_DIR / "Benchmarks" / "results" / "packing_latest.json"
+
+
+def corpus_items(count):
+    with open(CORPUS_PATH, "r", encoding="utf-8") as f:
+        prompts = [entry["text"] for entry in json.load(f)["prompts"]]
+    return [{"prompt": f"{prompts[index % len(prompts)]} (variant {index // len(prompts) + 1})"} for index in range(count)]
+
+
+def run_once(items, settings, concurrency):
+    from App.api_manager import APIKeyManager
+    from App.job_queue import JobStore, BatchRunner
+    api_manager = APIKeyManager(BASE_DIR)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = JobStore(Path(tmp) / "jobs.sqlite3")
+        job_id = store.create_job("packing benchmark", items, settings)
+        runner = BatchRunner(api_manager, store, job_id, concurrency)
+        started = time.perf_counter()
+        progress = runner.run()
+        elapsed = time.perf_counter() - started
+        store.close()
+    usage = api_manager.key_usage()
+    requests = sum(entry["day_requests"] for entry in usage)
+    tokens = sum(entry["day_tokens"] for entry in usage)
+    done = progress["done"] or 1
+    return {
+        "pack_size": settings["pack_size"],
+        "effective_pack_size": runner.pack_size,
+        "done": progress["done"],
+        "failed": progress["failed"],
+        "requests": requests,
+        "tokens": tokens,
+        "requests_per_prompt": round(requests / done, 3),
+        "tokens_per_prompt": round(tokens / done, 1),
+        "split_items": runner.stats["split_items"],
+        "elapsed_s": round(elapsed, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare packed and single-prompt batch refinement")
+    parser.add_argument("--items", type=int, default=48)
+    parser.add_argument("--pack-sizes", default="1,4,8")
+    parser.add_argument("--detail", default="Simple")
+    parser.add_argument("--type", default="Text Generation")
+    parser.add_argument("--language", default="English")
+    parser.add_argument("--concurrency", type=int, default=2)
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="Share of items the mock leaves out of packed answers")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    if not (BASE_DIR / "api_keys.txt").exists():
+        print("api_keys.txt is required (any placeholder key works with the mock backend)")
+        return 2
+
+    os.environ["PROMANIS_BACKEND"] = "mock"
+    os.environ["PROMANIS_MOCK_LATENCY_MS"] = str(args.latency_ms)
+    os.environ["PROMANIS_MOCK_PACK_DROP_RATE"] = str(args.drop_rate)
+    os.environ["PROMANIS_MOCK_ERROR_RATE"] = "0"
+
+    items = corpus_items(args.items)
+    rows = []
+    stdout = sys.stdout
+    devnull = open(os.devnull, "w")
+    try:
+        for pack_size in [int(value) for value in args.pack_sizes.split(",") if value.strip()]:
+            settings = {"language": args.language, "detail": args.detail, "type": args.type, "pack_size": pack_size}
+            # Workers log every response; keep the table readable
+            sys.stdout = devnull
+            row = run_once(items, settings, args.concurrency)
+            sys.stdout = stdout
+            rows.append(row)
+    finally:
+        sys.stdout = stdout
+        devnull.close()
+
+    baseline = rows[0] if rows else None
+    print(f"{args.items} prompts, detail {args.detail}, type {args.type}")
+    print(f"{'pack':>5} {'used':>5} {'done':>5} {'failed':>6} {'requests':>9} {'req/prompt':>10} {'tokens/prompt':>13} {'split':>6} {'vs pack 1':>10}")
+    for row in rows:
+        saving = ""
+        if baseline and baseline["tokens_per_prompt"]:
+            saving = f"{(row['tokens_per_prompt'] / baseline['tokens_per_prompt'] - 1) * 100:+.0f}%"
+        print(f"{row['pack_size']:>5} {row['effective_pack_size']:>5} {row['done']:>5} {row['failed']:>6} {row['requests']:>9} "
+              f"{row['requests_per_prompt']:>10} {row['tokens_per_prompt']:>13} {row['split_items']:>6} {saving:>10}")
+
+    os.makedirs(RESULTS_PATH.parent, exist_ok=True)
+    with open(RESULTS_PATH, "w", encoding="utf-8") as f:
+        json.dump({"items": args.items, "detail": args.detail, "type": args.type, "drop_rate": args.drop_rate, "runs": rows}, f, indent=2)
+    return 0 if all(row["failed"] == 0 for row in rows) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
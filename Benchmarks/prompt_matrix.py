@@ -0,0 +1,247 @@
+"""Prompt-engineering regression and cost benchmark.
+
+Runs the fixed corpus in Benchmarks/corpus/prompts.json through combinations of
+language, scope, type and detail with the real PromptRefiner, against
+the mock backend or a recorded cassette. For every combination it records
+latency, input and output tokens summed over every call (retries included),
+strict JSON parse success, retries, output-language purity and, for cassette
+runs, whether each answer was an exact replay or a loose one (recorded under
+an older instruction text, with its input tokens adjusted by size). Each run is saved under the current commit in
+Benchmarks/results/prompt_matrix/ so edits to the instruction text in
+App/refiner.py can be compared on cost and speed.
+
+Usage:
+    python Benchmarks/prompt_matrix.py --backend mock
+    python Benchmarks/prompt_matrix.py --backend cassette --record      (calls the real API once per prompt)
+    python Benchmarks/prompt_matrix.py --backend cassette --compare-to 1a2b3c4
+    python Benchmarks/prompt_matrix.py --compare 1a2b3c4 5d6e7f8
+"""
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import itertools
+import statistics
+import subprocess
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+CORPUS_PATH = BASE_DIR / "Benchmarks" / "corpus" / "prompts.json"
+RESULTS_DIR = BASE_DIR / "Benchmarks" / "results" / "prompt_matrix"
+DEFAULT_CASSETTE = BASE_DIR / "Benchmarks" / "cassettes" / "prompt_matrix.json"
+
+CODE_FENCE = re.compile(r"^```(?:json)?\s*|\s*```$")
+SUMMARY_METRICS = ("latency_p50_ms", "input_tokens", "output_tokens", "json_ok_rate", "retries", "purity", "errors", "loose_replays")
+
+
+def strict_json_ok(text):
+    try:
+        parsed = json.loads(CODE_FENCE.sub("", text.strip()))
+    except (TypeError, ValueError):
+        return False
+    return isinstance(parsed, dict) and isinstance(parsed.get("refined_prompt"), str)
+
+
+def current_commit():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=str(BASE_DIR), check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--", "App"], capture_output=True, text=True,
+                               cwd=str(BASE_DIR)).stdout.strip()
+        return commit + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def split_list(value):
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def run_matrix(args, corpus):
+    from App.api_manager import APIKeyManager
+    from App.refiner import PromptRefiner, RefinementError
+    from App.language_check import language_purity
+
+    class CountingKeyManager(APIKeyManager):
+        def __init__(self, base_dir):
+            super().__init__(base_dir)
+            self.acquisitions = 0
+
+        def acquire_key(self, projected_tokens=0, **options):
+            self.acquisitions += 1
+            return super().acquire_key(projected_tokens, **options)
+
+    class MeasuredRefiner(PromptRefiner):
+        def __init__(self, *refiner_args, **kwargs):
+            super().__init__(*refiner_args, **kwargs)
+            self.responses = []
+
+        def report_usage(self, api_key, response, projected_tokens):
+            self.responses.append(response)
+            super().report_usage(api_key, response, projected_tokens)
+
+    api_manager = CountingKeyManager(BASE_DIR)
+    combos = list(itertools.product(split_list(args.languages), split_list(args.scopes),
+                                    split_list(args.types), split_list(args.details)))
+    runs = []
+    for language, scope, prompt_type, detail in combos:
+        for prompt in corpus:
+            refiner = MeasuredRefiner(api_manager, prompt["text"], language, "", scope, detail, prompt_type)
+            refiner.retry_delay = args.retry_delay
+            before = api_manager.acquisitions
+            started = time.perf_counter()
+            error, output = None, ""
+            try:
+                output = refiner.refine()
+            except RefinementError as e:
+                error = str(e)
+            latency = (time.perf_counter() - started) * 1000.0
+            last = refiner.responses[-1] if refiner.responses else None
+            usages = [getattr(response, "usage_metadata", None) for response in refiner.responses]
+            replays = [getattr(response, "cassette_exact", None) for response in refiner.responses]
+            replay = None
+            if any(exact is not None for exact in replays):
+                replay = "exact" if all(replays) else "loose"
+            runs.append({
+                "combo": "|".join((language, scope, prompt_type, detail)),
+                "prompt_id": prompt["id"],
+                "latency_ms": round(latency, 3),
+                "input_tokens": sum(getattr(usage, "prompt_token_count", 0) or 0 for usage in usages),
+                "output_tokens": sum(getattr(usage, "candidates_token_count", 0) or 0 for usage in usages),
+                "json_ok": bool(last is not None and strict_json_ok(last.text or "")),
+                "retries": max(0, api_manager.acquisitions - before - 1),
+                "purity": language_purity(output, language) if output else None,
+                "replay": replay,
+                "error": error,
+            })
+    return runs
+
+
+def summarize(runs):
+    def mean(values):
+        values = [value for value in values if value is not None]
+        return round(statistics.mean(values), 3) if values else None
+
+    return {
+        "runs": len(runs),
+        "errors": sum(1 for run in runs if run["error"]),
+        "latency_p50_ms": round(statistics.median(run["latency_ms"] for run in runs), 3) if runs else None,
+        "input_tokens": mean([run["input_tokens"] for run in runs]),
+        "output_tokens": mean([run["output_tokens"] for run in runs]),
+        "json_ok_rate": mean([1.0 if run["json_ok"] else 0.0 for run in runs]),
+        "retries": sum(run["retries"] for run in runs),
+        "purity": mean([run["purity"] for run in runs]),
+        "loose_replays": sum(1 for run in runs if run.get("replay") == "loose"),
+    }
+
+
+def build_report(args, runs):
+    by_combo = {}
+    for run in runs:
+        by_combo.setdefault(run["combo"], []).append(run)
+    return {
+        "commit": current_commit(),
+        "backend": args.backend,
+        "cassette": str(args.cassette) if args.backend == "cassette" else None,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "overall": summarize(runs),
+        "combos": {combo: summarize(items) for combo, items in sorted(by_combo.items())},
+        "runs": runs,
+    }
+
+
+def load_report(reference):
+    path = Path(reference)
+    if not path.exists():
+        path = RESULTS_DIR / f"{reference}.json"
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def format_delta(current, reference):
+    if current is None or reference is None:
+        return f"{current}"
+    if isinstance(reference, (int, float)) and reference:
+        return f"{current} ({(current - reference) / reference * 100.0:+.1f}%)"
+    return f"{current} (was {reference})"
+
+
+def print_comparison(current, reference):
+    print(f"Comparing {current['commit']} against {reference['commit']}")
+    rows = [("overall", current["overall"], reference["overall"])]
+    rows += [(combo, summary, reference["combos"].get(combo)) for combo, summary in current["combos"].items()]
+    for name, summary, base in rows:
+        if base is None:
+            print(f"  {name}: not in reference run")
+            continue
+        print(f"  {name}")
+        for metric in SUMMARY_METRICS:
+            print(f"      {metric:<15} {format_delta(summary.get(metric), base.get(metric))}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark refinement cost and quality across settings")
+    parser.add_argument("--backend", default="mock", choices=["mock", "cassette"])
+    parser.add_argument("--cassette", default=str(DEFAULT_CASSETTE))
+    parser.add_argument("--record", action="store_true", help="Call the real API and record into the cassette")
+    parser.add_argument("--languages", default="English,Bahasa Indonesia")
+    parser.add_argument("--scopes", default="General,Programming")
+    parser.add_argument("--types", default="Text Generation,Image Generation")
+    parser.add_argument("--details", default="Simple,Detailed,Complex,Template")
+    parser.add_argument("--limit", type=int, default=0, help="Use only the first N corpus prompts")
+    parser.add_argument("--retry-delay", type=float, default=0.0)
+    parser.add_argument("--mock-latency-ms", type=float, default=0.0)
+    parser.add_argument("--compare-to", default="", help="Commit or report path to compare this run with")
+    parser.add_argument("--compare", nargs=2, metavar=("CURRENT", "REFERENCE"), help="Compare two saved runs and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        print_comparison(load_report(args.compare[0]), load_report(args.compare[1]))
+        return 0
+    if not (BASE_DIR / "api_keys.txt").exists():
+        print("api_keys.txt is required (any placeholder keys work with the mock backend and replayed cassettes)")
+        return 2
+
+    os.environ["PROMANIS_BACKEND"] = args.backend
+    os.environ["PROMANIS_MOCK_LATENCY_MS"] = str(args.mock_latency_ms)
+    os.environ["PROMANIS_CASSETTE"] = str(args.cassette)
+    os.environ["PROMANIS_CASSETTE_MODE"] = "record" if args.record else "replay"
+
+    with open(CORPUS_PATH, "r", encoding="utf-8") as f:
+        corpus = json.load(f)["prompts"]
+    if args.limit:
+        corpus = corpus[:args.limit]
+
+    # Worker logging is very chatty; keep the report readable
+    stdout = sys.stdout
+    with open(os.devnull, "w") as devnull:
+        sys.stdout = devnull
+        try:
+            runs = run_matrix(args, corpus)
+        finally:
+            sys.stdout = stdout
+
+    report = build_report(args, runs)
+    overall = report["overall"]
+    print(f"{report['commit']} [{args.backend}] {overall['runs']} runs over {len(report['combos'])} combinations")
+    for metric in SUMMARY_METRICS:
+        print(f"  {metric:<15} {overall[metric]}")
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    report_path = RESULTS_DIR / f"{report['commit']}.json"
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"Report written to {report_path}")
+
+    if args.compare_to:
+        print_comparison(report, load_report(args.compare_to))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
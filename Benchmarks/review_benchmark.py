@@ -0,0 +1,113 @@
+"""Generate-check-revise pipeline: API calls per accepted result.
+
+Refines the corpus in English and Bahasa Indonesia with the review pipeline on
+(App/rubric.py) and off, several prompts at a time on a thread pool sized to
+the key pool, so one prompt's revision runs next to another prompt's first
+call. The mock backend answers PROMANIS_MOCK_WEAK_RATE of the first calls with
+a prompt that misses CLEAR elements. Reports calls per accepted result, how
+often more than one call was needed, the rubric pass rate of what was returned, and
+wall time. The report is written to Benchmarks/results/review_latest.json.
+
+Usage:
+    python Benchmarks/review_benchmark.py
+    python Benchmarks/review_benchmark.py --weak-rate 0.5 --repeat 4 --detail Complex
+"""
+import os
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+CORPUS_PATH = BASE_DIR / "Benchmarks" / "corpus" / "prompts.json"
+RESULTS_PATH = BASE_DIR / "Benchmarks" / "results" / "review_latest.json"
+LANGUAGES = ("English", "Bahasa Indonesia")
+
+
+def run(api_manager, jobs, detail, review):
+    from App.refiner import PromptRefiner, RefinementError
+    from App.rubric import check_refined, load_review_settings
+
+    settings = load_review_settings(BASE_DIR)
+
+    def refine(job):
+        prompt, language = job
+        refiner = PromptRefiner(api_manager, prompt, language=language, detail_level=detail, review=review)
+        refiner.retry_delay = 0
+        try:
+            refiner.refine()
+        except RefinementError:
+            return {"calls": refiner.calls, "accepted": False, "passed": False, "retried": False}
+        output_limit = refiner.last_request[2]
+        passed = not check_refined(refiner.refined_text, language, detail, output_limit, settings)
+        return {"calls": refiner.calls, "accepted": True, "passed": passed, "retried": refiner.calls > 1}
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, api_manager.get_total_keys())) as executor:
+        rows = list(executor.map(refine, jobs))
+    wall_ms = (time.perf_counter() - started) * 1000.0
+    accepted = [row for row in rows if row["accepted"]]
+    return {
+        "prompts": len(rows),
+        "accepted": len(accepted),
+        "calls_per_accepted": sum(row["calls"] for row in rows) / len(accepted) if accepted else 0.0,
+        "retried_share": sum(1 for row in accepted if row["retried"]) / len(accepted) if accepted else 0.0,
+        "rubric_pass_rate": sum(1 for row in accepted if row["passed"]) / len(accepted) if accepted else 0.0,
+        "wall_ms": wall_ms,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure calls per accepted result with and without the review pipeline")
+    parser.add_argument("--weak-rate", type=float, default=0.3, help="Share of first answers that miss CLEAR elements")
+    parser.add_argument("--repeat", type=int, default=2, help="Passes over the corpus per language")
+    parser.add_argument("--detail", default="Detailed")
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    args = parser.parse_args()
+
+    if not (BASE_DIR / "api_keys.txt").exists():
+        print("api_keys.txt is required (any placeholder key works with the mock backend)")
+        return 2
+
+    os.environ["PROMANIS_BACKEND"] = "mock"
+    os.environ["PROMANIS_MOCK_LATENCY_MS"] = str(args.latency_ms)
+    os.environ["PROMANIS_MOCK_WEAK_RATE"] = str(args.weak_rate)
+    os.environ["PROMANIS_MOCK_ERROR_RATE"] = "0"
+
+    from App.api_manager import APIKeyManager
+
+    with open(CORPUS_PATH, "r", encoding="utf-8") as f:
+        prompts = [entry["text"] for entry in json.load(f)["prompts"]]
+    jobs = [(prompt, language) for _ in range(args.repeat) for language in LANGUAGES for prompt in prompts]
+    api_manager = APIKeyManager(BASE_DIR)
+    stdout = sys.stdout
+    report = {}
+    with open(os.devnull, "w") as devnull:
+        try:
+            # Refiners log every response; keep the table readable
+            sys.stdout = devnull
+            for name, review in (("single", False), ("review", True)):
+                report[name] = run(api_manager, jobs, args.detail, review)
+        finally:
+            sys.stdout = stdout
+
+    print(f"{len(jobs)} refinements, {args.weak_rate:.0%} weak first answers, detail {args.detail}")
+    print(f"{'':<8} {'calls/accepted':>15} {'retried':>8} {'rubric pass':>12} {'wall':>9}")
+    for name in ("single", "review"):
+        row = report[name]
+        print(f"{name:<8} {row['calls_per_accepted']:>15.2f} {row['retried_share']:>8.0%} "
+              f"{row['rubric_pass_rate']:>12.0%} {row['wall_ms']:>7.0f}ms")
+
+    os.makedirs(RESULTS_PATH.parent, exist_ok=True)
+    with open(RESULTS_PATH, "w", encoding="utf-8") as f:
+        json.dump({"weak_rate": args.weak_rate, "detail": args.detail, "latency_ms": args.latency_ms, **report}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,167 @@
+"""Long-session soak test for the Promanis window.
+
+Drives thousands of refinements through the real main window against the mock
+backend (and periodically opens the settings dialog and runs its key test),
+sampling tracemalloc, live worker objects and thread counts along the way.
+Traced memory growth is fitted over the samples after warm-up; the run fails
+(exit code 1) when memory keeps growing, threads accumulate or finished
+workers stay alive. The report is written to Benchmarks/results/soak_latest.json.
+
+Usage:
+    python Benchmarks/soak_test.py --iterations 3000
+    python Benchmarks/soak_test.py --iterations 500 --settings-every 100 --top 15
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+RESULTS_PATH = BASE_DIR / "Benchmarks" / "results" / "soak_latest.json"
+# Well-formed placeholders so the settings dialog actually starts its test workers (mock backend only)
+FAKE_KEYS = "\n".join("AIzaSy" + str(n) * 33 for n in range(1, 3))
+
+
+def slope_per_1000(points):
+    """Least-squares slope of (iteration, bytes) samples, in bytes per 1000 iterations"""
+    if len(points) < 2:
+        return 0.0
+    n = len(points)
+    mean_x = sum(x for x, _ in points) / n
+    mean_y = sum(y for _, y in points) / n
+    denominator = sum((x - mean_x) ** 2 for x, _ in points)
+    if not denominator:
+        return 0.0
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / denominator * 1000.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Soak-test the Promanis window for leaks")
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--warmup", type=int, default=100)
+    parser.add_argument("--sample-every", type=int, default=100)
+    parser.add_argument("--settings-every", type=int, default=250, help="Open the settings dialog and test keys (0 = never)")
+    parser.add_argument("--max-growth-kb", type=float, default=256.0, help="Allowed traced growth per 1000 refinements")
+    parser.add_argument("--top", type=int, default=10, help="Allocation sites to list from the snapshot diff")
+    args = parser.parse_args()
+
+    if not (BASE_DIR / "api_keys.txt").exists():
+        print("api_keys.txt is required (any placeholder key works with the mock backend)")
+        return 2
+
+    os.environ["PROMANIS_BACKEND"] = "mock"
+    os.environ["PROMANIS_MOCK_LATENCY_MS"] = "0"
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    tracemalloc.start(10)
+
+    from PySide6.QtWidgets import QApplication
+    from PySide6.QtCore import QEvent
+    app = QApplication(sys.argv)
+    from App.main_window import PromanisMainWindow
+    from App.settings_dialog import SettingsDialog
+    import gc
+
+    window = PromanisMainWindow(BASE_DIR)
+    window.speculative.enabled = False
+
+    def wait_until(condition, timeout=30.0):
+        deadline = time.time() + timeout
+        while not condition():
+            if time.time() > deadline:
+                raise RuntimeError("Timed out waiting for the window")
+            app.processEvents()
+            time.sleep(0.001)
+
+    def exercise_settings():
+        dialog = SettingsDialog(window.api_manager, window, ai_platforms=window.ai_platforms)
+        dialog.api_keys_edit.setPlainText(FAKE_KEYS)
+        dialog.test_api_keys()
+        wait_until(lambda: dialog.pending_tests <= 0)
+        dialog.close()
+        dialog.deleteLater()
+
+    samples = []
+    baseline_snapshot = None
+    stdout = sys.stdout
+    devnull = open(os.devnull, "w")
+    started = time.perf_counter()
+    try:
+        for iteration in range(1, args.iterations + 1):
+            # The worker logs every response; keep the console readable
+            sys.stdout = devnull
+            window.input_text.setPlainText(f"Write a product description for gadget #{iteration}")
+            window.refine_prompt()
+            wait_until(lambda: window.worker is None)
+            # processEvents() alone never runs deleteLater; a real event loop would
+            app.sendPostedEvents(None, QEvent.DeferredDelete)
+            if args.settings_every and iteration % args.settings_every == 0:
+                exercise_settings()
+            sys.stdout = stdout
+
+            if iteration % args.sample_every == 0 or iteration == args.warmup:
+                app.sendPostedEvents(None, QEvent.DeferredDelete)
+                gc.collect()
+                report = window.diagnostics()
+                samples.append({
+                    "iteration": iteration,
+                    "traced_bytes": report["tracemalloc"]["current_bytes"],
+                    "rss_bytes": report["rss_bytes"],
+                    "threads": report["threads"],
+                    "objects": report["objects"],
+                    "gc_objects": report["gc_objects"],
+                })
+                if iteration == args.warmup:
+                    baseline_snapshot = tracemalloc.take_snapshot()
+                print(f"[{iteration:>6}] traced {report['tracemalloc']['current_bytes'] / 1024:.0f} KiB, "
+                      f"threads {report['threads']}, workers {report['objects']['PromptRefinementWorker']}, "
+                      f"test workers {report['objects']['APITestWorker']}")
+    finally:
+        sys.stdout = stdout
+        devnull.close()
+    elapsed = time.perf_counter() - started
+
+    steady = [sample for sample in samples if sample["iteration"] >= args.warmup]
+    growth = slope_per_1000([(s["iteration"], s["traced_bytes"]) for s in steady]) / 1024.0
+    first, last = steady[0], steady[-1]
+    top = []
+    if baseline_snapshot is not None:
+        diff = tracemalloc.take_snapshot().compare_to(baseline_snapshot, "lineno")
+        top = [str(stat) for stat in diff[:args.top]]
+
+    failures = []
+    if growth > args.max_growth_kb:
+        failures.append(f"traced memory grows {growth:.1f} KiB per 1000 refinements")
+    if last["threads"] > first["threads"]:
+        failures.append(f"threads grew from {first['threads']} to {last['threads']}")
+    for name in ("PromptRefinementWorker", "APITestWorker"):
+        if last["objects"][name] > 0:
+            failures.append(f"{last['objects'][name]} {name} objects still alive")
+
+    print(f"{args.iterations} refinements in {elapsed:.1f}s ({args.iterations / elapsed:.0f}/s)")
+    print(f"Traced memory slope: {growth:.1f} KiB per 1000 refinements")
+    if top:
+        print("Largest allocation changes since warm-up:")
+        for line in top:
+            print(f"  {line}")
+
+    os.makedirs(RESULTS_PATH.parent, exist_ok=True)
+    with open(RESULTS_PATH, "w", encoding="utf-8") as f:
+        json.dump({"iterations": args.iterations, "elapsed_s": round(elapsed, 3), "growth_kib_per_1000": round(growth, 3),
+                   "samples": samples, "top_allocations": top, "failures": failures}, f, indent=2)
+
+    window.close()
+    if failures:
+        print("Soak test FAILED: " + "; ".join(failures))
+        return 1
+    print("Soak test passed")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
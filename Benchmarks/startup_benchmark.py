@@ -0,0 +1,176 @@
+"""Startup benchmark for Promanis.
+
+Launches main.py several times in each startup mode, records the time from
+process start to first paint and to first interaction, and breaks import cost
+down by module using ``python -X importtime``. The median of each metric is
+compared against Benchmarks/results/startup_baseline.json so regressions fail
+the run (exit code 1). Record the baseline with the interpreter the app targets
+(Python 3.12+); a run on another Python version prints a warning, since import
+times differ between interpreter versions.
+
+Usage:
+    python Benchmarks/startup_benchmark.py
+    python Benchmarks/startup_benchmark.py --runs 7 --update-baseline
+"""
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import statistics
+import subprocess
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+RESULTS_DIR = BASE_DIR / "Benchmarks" / "results"
+BASELINE_PATH = RESULTS_DIR / "startup_baseline.json"
+LATEST_PATH = RESULTS_DIR / "startup_latest.json"
+TRACKED_MODULES = ("PySide6", "qtawesome", "google", "App")
+
+
+def parse_import_times(stderr_text):
+    """Sum self-time (ms) of every imported module under each tracked top-level package"""
+    totals = {name: 0.0 for name in TRACKED_MODULES}
+    per_module = {}
+    for line in stderr_text.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3:
+            continue
+        try:
+            self_us = int(parts[0].strip())
+        except ValueError:
+            continue
+        module = parts[2].strip()
+        top_level = module.split(".")[0]
+        if top_level in totals:
+            totals[top_level] += self_us / 1000.0
+        if module.startswith("App."):
+            per_module[module] = per_module.get(module, 0.0) + self_us / 1000.0
+    totals = {name: round(value, 3) for name, value in totals.items()}
+    per_module = {name: round(value, 3) for name, value in per_module.items()}
+    return totals, per_module
+
+
+def run_once(mode, timeout):
+    with tempfile.TemporaryDirectory() as tmp:
+        report_path = Path(tmp) / "startup.json"
+        env = dict(os.environ)
+        env["PROMANIS_STARTUP_PROFILE"] = str(report_path)
+        env["PROMANIS_STARTUP_EXIT"] = "1"
+        env.setdefault("QT_QPA_PLATFORM", "offscreen")
+        args = [sys.executable, "-X", "importtime", str(BASE_DIR / "main.py")]
+        if mode == "eager":
+            args.append("--eager-startup")
+        spawned = time.perf_counter()
+        proc = subprocess.run(args, env=env, capture_output=True, text=True, timeout=timeout, cwd=str(BASE_DIR))
+        total_ms = (time.perf_counter() - spawned) * 1000.0
+        if not report_path.exists():
+            raise RuntimeError(f"Startup report missing (exit code {proc.returncode}):\n{proc.stderr[-2000:]}")
+        with open(report_path, "r", encoding="utf-8") as f:
+            report = json.load(f)
+    packages, app_modules = parse_import_times(proc.stderr)
+    report["import_ms"] = packages
+    report["app_import_ms"] = app_modules
+    report["process_total_ms"] = round(total_ms, 3)
+    return report
+
+
+def summarize(runs):
+    def median_of(getter):
+        values = [getter(run) for run in runs]
+        values = [value for value in values if value is not None]
+        return round(statistics.median(values), 3) if values else None
+
+    summary = {
+        "first_paint_ms": median_of(lambda r: r["marks_ms"].get("first_paint")),
+        "first_interaction_ms": median_of(lambda r: r["marks_ms"].get("first_interaction")),
+        "window_built_ms": median_of(lambda r: r["marks_ms"].get("window_built")),
+        "import_ms": {},
+        "stages_ms": {},
+    }
+    for name in TRACKED_MODULES:
+        summary["import_ms"][name] = median_of(lambda r, n=name: r["import_ms"].get(n))
+    stage_names = sorted({stage for run in runs for stage in run["stages_ms"]})
+    for stage in stage_names:
+        summary["stages_ms"][stage] = median_of(lambda r, s=stage: r["stages_ms"].get(s))
+    return summary
+
+
+def compare(latest, baseline, tolerance):
+    failures = []
+    for mode, metrics in latest["modes"].items():
+        base_metrics = baseline.get("modes", {}).get(mode)
+        if not base_metrics:
+            continue
+        for key in ("first_paint_ms", "first_interaction_ms"):
+            current, reference = metrics.get(key), base_metrics.get(key)
+            if current is None or not reference:
+                continue
+            ratio = current / reference
+            status = "REGRESSION" if ratio > 1.0 + tolerance else "ok"
+            print(f"  [{mode}] {key}: {current:.1f} ms (baseline {reference:.1f} ms, x{ratio:.2f}) {status}")
+            if status != "ok":
+                failures.append(f"{mode}.{key}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure Promanis cold-start latency")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--modes", default="deferred,eager")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown vs baseline (0.25 = 25%%)")
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args()
+
+    if not (BASE_DIR / "api_keys.txt").exists():
+        print("api_keys.txt is required to launch the window (any placeholder key works for this benchmark)")
+        return 2
+
+    latest = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "runs": args.runs,
+        "modes": {},
+    }
+    for mode in [m.strip() for m in args.modes.split(",") if m.strip()]:
+        # First launch only warms the OS file cache
+        run_once(mode, args.timeout)
+        runs = [run_once(mode, args.timeout) for _ in range(args.runs)]
+        latest["modes"][mode] = summarize(runs)
+        summary = latest["modes"][mode]
+        print(f"{mode}: first paint {summary['first_paint_ms']} ms, first interaction {summary['first_interaction_ms']} ms")
+        for name, value in summary["import_ms"].items():
+            print(f"    import {name:<10} {value} ms")
+        for name, value in summary["stages_ms"].items():
+            print(f"    stage  {name:<28} {value} ms")
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    with open(LATEST_PATH, "w", encoding="utf-8") as f:
+        json.dump(latest, f, indent=4)
+
+    if args.update_baseline or not BASELINE_PATH.exists():
+        with open(BASELINE_PATH, "w", encoding="utf-8") as f:
+            json.dump(latest, f, indent=4)
+        print(f"Baseline written to {BASELINE_PATH}")
+        return 0
+
+    with open(BASELINE_PATH, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline.get("python", "").rsplit(".", 1)[0] != latest["python"].rsplit(".", 1)[0]:
+        print(f"Warning: baseline was recorded on Python {baseline.get('python')}, this run uses {latest['python']}; "
+              f"compare on the same version or re-record with --update-baseline")
+    print("Comparison with baseline:")
+    failures = compare(latest, baseline, args.tolerance)
+    if failures:
+        print(f"Startup regression detected: {', '.join(failures)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+"""First-request latency with and without the launch warm-up.
+
+Each run is a fresh interpreter, like a fresh launch: it builds the key
+manager, optionally starts the background warm-up (App/warmup.py), waits
+--idle-ms as if the user were typing the first prompt, then times the first
+refinement and a second one for reference (the second goes to the next key in
+rotation, whose client is still cold in both modes). The mock backend charges
+PROMANIS_MOCK_CONNECT_MS the first time each client is used, standing in for
+DNS and TLS setup; the Gemini SDK import is real. The report is written to
+Benchmarks/results/warmup_latest.json.
+
+Usage:
+    python Benchmarks/warmup_benchmark.py
+    python Benchmarks/warmup_benchmark.py --runs 7 --connect-ms 400 --idle-ms 2000
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+RESULTS_PATH = BASE_DIR / "Benchmarks" / "results" / "warmup_latest.json"
+
+PROBE = """
+import os, sys, json, time
+stdout, sys.stdout = sys.stdout, open(os.devnull, "w")
+from App.api_manager import APIKeyManager
+from App.refiner import PromptRefiner
+from App.warmup import start_warmup
+manager = APIKeyManager(".")
+if {warm!r}:
+    start_warmup(manager)
+time.sleep({idle_ms} / 1000.0)
+timings = []
+for _ in range(2):
+    started = time.perf_counter()
+    PromptRefiner(manager, "write a python script that reads a csv and shows the average of each column").refine()
+    timings.append((time.perf_counter() - started) * 1000.0)
+print(json.dumps({{"first_ms": timings[0], "second_ms": timings[1]}}), file=stdout)
+"""
+
+
+def measure(warm, idle_ms, env):
+    result = subprocess.run([sys.executable, "-c", PROBE.format(warm=warm, idle_ms=idle_ms)],
+                            cwd=BASE_DIR, env=env, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure first-request latency with and without connection warm-up")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--connect-ms", type=float, default=300.0, help="Mock connection setup cost per client")
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    parser.add_argument("--idle-ms", type=float, default=1500.0, help="Time between launch and the first click")
+    args = parser.parse_args()
+
+    if not (BASE_DIR / "api_keys.txt").exists():
+        print("api_keys.txt is required (any placeholder key works with the mock backend)")
+        return 2
+
+    env = dict(os.environ)
+    env.update({
+        "PROMANIS_BACKEND": "mock",
+        "PROMANIS_MOCK_CONNECT_MS": str(args.connect_ms),
+        "PROMANIS_MOCK_LATENCY_MS": str(args.latency_ms),
+        "PROMANIS_MOCK_JITTER": "0",
+        "PROMANIS_MOCK_ERROR_RATE": "0",
+    })
+    report = {}
+    for name, warm in (("cold", False), ("warm", True)):
+        samples = [measure(warm, args.idle_ms, env) for _ in range(args.runs)]
+        report[name] = {
+            "first_ms": round(statistics.median(sample["first_ms"] for sample in samples), 1),
+            "second_ms": round(statistics.median(sample["second_ms"] for sample in samples), 1),
+            "runs": samples,
+        }
+    print(f"{'':<6} {'first request':>14} {'second request':>15}")
+    for name in ("cold", "warm"):
+        print(f"{name:<6} {report[name]['first_ms']:>12.1f}ms {report[name]['second_ms']:>13.1f}ms")
+    print(f"first request {(report['warm']['first_ms'] / report['cold']['first_ms'] - 1) * 100:+.0f}% with warm-up")
+
+    os.makedirs(RESULTS_PATH.parent, exist_ok=True)
+    with open(RESULTS_PATH, "w", encoding="utf-8") as f:
+        json.dump({"connect_ms": args.connect_ms, "latency_ms": args.latency_ms, "idle_ms": args.idle_ms, **report}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,11 @@
+import time
+
+# Captured before any heavy import so the startup benchmark can measure the whole launch
+PROCESS_START = time.perf_counter()
+
 import sys
 import os
+import argparse
 from pathlib import Path
 
 # Set BASE_DIR sebagai direktori utama proyek
@@ -9,15 +15,56 @@ BASE_DIR = Path(__file__).parent.absolute()
 if str(BASE_DIR) not in sys.path:
     sys.path.insert(0, str(BASE_DIR))
 
-from App.application import PromanisApp
+
+def parse_args():
+    # --help after --batch belongs to the batch command line
+    parser = argparse.ArgumentParser(description="Promanis - AI Prompt Refiner", add_help="--batch" not in sys.argv[1:])
+    parser.add_argument("--eager-startup", action="store_true",
+                        help="Build the whole window (icons, platforms, SDK) before the first paint")
+    parser.add_argument("--serve", action="store_true", help="Run the headless local HTTP refinement service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--max-concurrency", type=int, default=None)
+    parser.add_argument("--max-queue", type=int, default=64)
+    parser.add_argument("--tray", action="store_true",
+                        help="Stay in the system tray and refine the clipboard with a global hotkey")
+    parser.add_argument("--mock", action="store_true", help="Use the mock Gemini backend (no network, no quota)")
+    parser.add_argument("--batch", action="store_true",
+                        help="Manage durable batch jobs; see python main.py --batch --help")
+    # Unknown arguments are left for Qt (or the batch command line)
+    args, rest = parser.parse_known_args()
+    return args, rest
 
 
 def main():
     """Entry point untuk aplikasi Promanis"""
-    app = PromanisApp(BASE_DIR)
+    args, rest = parse_args()
+    if args.mock:
+        os.environ["PROMANIS_BACKEND"] = "mock"
+
+    if args.batch:
+        from App.batch_cli import run_cli
+        sys.exit(run_cli(BASE_DIR, rest))
+
+    if args.serve:
+        from App.service import RefinementService
+        try:
+            service = RefinementService(BASE_DIR, args.host, args.port, args.max_concurrency, args.max_queue)
+        except (FileNotFoundError, ValueError) as e:
+            print(f"Error: {str(e)}")
+            sys.exit(1)
+        sys.exit(service.run())
+
+    if args.tray:
+        from App.tray import run_tray
+        sys.exit(run_tray(BASE_DIR))
+
+    from App.application import PromanisApp
+    startup_mode = "eager" if args.eager_startup else "deferred"
+    app = PromanisApp(BASE_DIR, startup_mode=startup_mode, process_start=PROCESS_START)
     exit_code = app.run()
     sys.exit(exit_code)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()